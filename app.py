@@ -1,23 +1,50 @@
 import os
 import joblib
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 from datetime import datetime
-import psycopg2
-from psycopg2.extras import RealDictCursor
 import logging
-from prometheus_client import Counter, Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST
-from werkzeug.middleware.dispatcher import DispatcherMiddleware
-from prometheus_client import make_wsgi_app
+from prometheus_client import Counter, Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST, REGISTRY
+from prometheus_client.openmetrics.exposition import (
+    generate_latest as generate_openmetrics, CONTENT_TYPE_LATEST as OPENMETRICS_CONTENT_TYPE
+)
+import sys
 import time
+import hmac
 import threading
+import atexit
+from explain import TermExplainer
+from similarity_index import SimilarityIndex, SimilaritySyncJob
+from near_duplicates import NearDuplicateIndex
+from topic_clusters import TopicClusterer, TopicClusteringJob, read_snapshot
+from logging_pipeline import setup_logging, access_log_fields
+from json_provider import init_json, parse_payload, make_payload_response
+from stats_stream import LiveStats, StatsBroadcaster
+from export_predictions import EXPORT_FORMATS, export_chunks, parse_timestamp
+from storage import create_storage
+from idempotency import IdempotencyStore, fingerprint, MAX_KEY_LENGTH
+from long_text import classify_long_text, iter_chunks
+from vocab_drift import DriftMonitor
+from shadow import ShadowScorer
+from model_registry import ModelRegistry, ModelNotFound
+from traffic_capture import TrafficRecorder
+from warmup import Warmup, load_texts
+from tracing import Tracer, SlowTraceStore, OTLPExporter, span, exemplar
+from memory_tracking import AllocationTracker, metric_series
+from junk_filter import JunkFilter
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging (queue-based JSON pipeline, see logging_pipeline.py)
+LOGGING_PIPELINE = setup_logging()
 logger = logging.getLogger(__name__)
+access_logger = logging.getLogger('access')
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend
+JSON_PROVIDER = init_json(app)  # orjson when installed, stdlib otherwise
+
+# Lean startup: defer optional subsystems (DB driver, psutil, CPU monitor)
+# until they are first needed, to keep cold starts short on autoscaling hosts
+LEAN_STARTUP = os.environ.get('LEAN_STARTUP', '').lower() in ('1', 'true', 'yes')
 
 # Prometheus metrics
 REQUEST_COUNT = Counter(
@@ -102,9 +129,6 @@ DB_OPERATIONS = Counter(
 )
 
 # Resource Metrics
-import psutil
-import sys
-
 PROCESS_MEMORY_BYTES = Gauge(
     'app_process_memory_bytes',
     'Memory used by the application process'
@@ -119,6 +143,20 @@ PYTHON_INFO = Gauge(
     ['version', 'implementation']
 )
 
+# Logging pipeline health (read at scrape time)
+Gauge(
+    'app_log_records_dropped',
+    'Log records dropped because the logging queue was full'
+).set_function(lambda: LOGGING_PIPELINE.dropped)
+Gauge(
+    'app_log_records_sampled_out',
+    'Sampled INFO log records that were not emitted'
+).set_function(lambda: LOGGING_PIPELINE.sampled_out)
+Gauge(
+    'app_log_queue_depth',
+    'Log records waiting to be written'
+).set_function(lambda: LOGGING_PIPELINE.queue_depth)
+
 # Set Python info once
 PYTHON_INFO.labels(
     version=f"{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}",
@@ -128,15 +166,24 @@ PYTHON_INFO.labels(
 # Track confidence scores for averaging
 confidence_tracker = {category: [] for category in ['Bug Report', 'Feature Request', 'Pricing Complaint', 'Positive Feedback', 'Negative Experience']}
 
-# Initialize process object once
-_process = psutil.Process()
+# psutil is imported lazily on first use (see _get_process)
+_process = None
+
+def _get_process():
+    """Return the psutil handle for this process, importing psutil on demand"""
+    global _process
+    if _process is None or _process.pid != os.getpid():
+        import psutil
+        _process = psutil.Process()
+    return _process
 
 def update_resource_metrics():
     """Update resource usage metrics"""
     try:
-        PROCESS_MEMORY_BYTES.set(_process.memory_info().rss)
+        process = _get_process()
+        PROCESS_MEMORY_BYTES.set(process.memory_info().rss)
         # Use non-blocking cpu_percent (interval=None uses previous call)
-        cpu = _process.cpu_percent(interval=None)
+        cpu = process.cpu_percent(interval=None)
         if cpu > 0:  # Only update if we get a valid reading
             PROCESS_CPU_PERCENT.set(cpu)
     except Exception as e:
@@ -148,29 +195,380 @@ def cpu_monitor_thread():
     logger.info("Starting CPU monitoring thread...")
     while True:
         try:
-            cpu = _process.cpu_percent(interval=1)  # Measure over 1 second
+            process = _get_process()
+            cpu = process.cpu_percent(interval=1)  # Measure over 1 second
             PROCESS_CPU_PERCENT.set(cpu)
-            PROCESS_MEMORY_BYTES.set(_process.memory_info().rss)
+            PROCESS_MEMORY_BYTES.set(process.memory_info().rss)
         except Exception as e:
             logger.warning(f"CPU monitor error: {e}")
         time.sleep(2)  # Update every 2 seconds
 
-# Start CPU monitoring in background
-cpu_thread = threading.Thread(target=cpu_monitor_thread, daemon=True)
-cpu_thread.start()
+# Threads do not survive fork(), so the monitor is tracked per PID. With
+# gunicorn --preload the master imports this module and each worker starts
+# its own monitor on its first request.
+_cpu_monitor_pid = None
+_cpu_monitor_lock = threading.Lock()
+
+def ensure_cpu_monitor():
+    """Start the CPU monitoring thread once per process"""
+    global _cpu_monitor_pid
+    if _cpu_monitor_pid == os.getpid():
+        return
+    with _cpu_monitor_lock:
+        if _cpu_monitor_pid == os.getpid():
+            return
+        threading.Thread(target=cpu_monitor_thread, daemon=True).start()
+        _cpu_monitor_pid = os.getpid()
+
+# Start CPU monitoring in background (deferred to first /metrics scrape in lean mode)
+if not LEAN_STARTUP:
+    ensure_cpu_monitor()
+
+# Similarity search metrics
+SIMILARITY_QUERY_LATENCY = Histogram(
+    'app_similarity_query_seconds',
+    'Similar-feedback query latency (index lookup only)'
+)
+Gauge(
+    'app_similarity_index_documents',
+    'Number of predictions in the similarity index'
+).set_function(lambda: len(SIMILARITY_INDEX) if SIMILARITY_INDEX is not None else 0)
+
+# Near-duplicate detection metrics
+NEAR_DUPLICATE_LOOKUP_LATENCY = Histogram(
+    'app_near_duplicate_lookup_seconds',
+    'Time to compute the MinHash signature and query the LSH index',
+    buckets=[0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01]
+)
+NEAR_DUPLICATE_LOOKUPS = Counter(
+    'app_near_duplicate_lookups_total',
+    'Near-duplicate lookups by result (hit reuses a stored classification)',
+    ['result']  # hit/miss
+)
+NEAR_DUPLICATE_INDEX_SIZE = Gauge(
+    'app_near_duplicate_index_entries',
+    'Signatures held in the near-duplicate index'
+)
+
+# Near-duplicate short-circuit: reuse a stored classification when the
+# estimated Jaccard similarity of the normalized text reaches the threshold.
+# NEAR_DUPLICATE_MAX_ENTRIES=0 disables it.
+NEAR_DUPLICATES = NearDuplicateIndex(
+    threshold=float(os.environ.get('NEAR_DUPLICATE_THRESHOLD', 0.9)),
+    max_entries=int(os.environ.get('NEAR_DUPLICATE_MAX_ENTRIES', 10000))
+)
+
+# Idempotency keys: retried /predict requests (Idempotency-Key header) and
+# batch items (idempotency_keys) get the first result back instead of
+# being classified and stored again
+IDEMPOTENCY = IdempotencyStore(
+    max_entries=int(os.environ.get('IDEMPOTENCY_MAX_ENTRIES', 10000)),
+    ttl=int(os.environ.get('IDEMPOTENCY_TTL', 86400))
+)
+IDEMPOTENT_REPLAYS = Counter(
+    'app_idempotent_replays_total',
+    'Requests answered with a previous result instead of recomputing (memory, in-flight join or storage)',
+    ['endpoint', 'source']
+)
+IDEMPOTENCY_KEY_CONFLICTS = Counter(
+    'app_idempotency_key_conflicts_total',
+    'Idempotency keys reused with a different text, or still in progress',
+    ['endpoint', 'reason']
+)
+Gauge(
+    'app_idempotency_keys',
+    'Idempotency keys held in memory by this process'
+).set_function(lambda: len(IDEMPOTENCY))
+
+# Vocabulary drift: how much live text falls outside the training vocabulary
+VOCABULARY_TOKENS = Counter(
+    'app_vocabulary_tokens_total',
+    'Analyzed tokens of classified texts by whether the training vocabulary has them',
+    ['in_vocabulary']  # true/false
+)
+EMPTY_VECTORS = Counter(
+    'app_empty_vectors_total',
+    'Texts with no training-vocabulary term (classified anyway unless JUNK_REQUIRE_VOCABULARY=1)',
+    ['endpoint']
+)
+REQUEST_OOV_RATIO = Histogram(
+    'app_request_oov_ratio',
+    'Fraction of a text\'s tokens missing from the training vocabulary',
+    buckets=[0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0]
+)
+DRIFT_MONITORING = os.environ.get('DRIFT_MONITORING', '1').lower() not in ('0', 'false', 'no')
+
+# Junk pre-filter: symbol soup and repeated characters/words are rejected
+# (422) before vectorization, storage and metrics; texts with no known word
+# only with JUNK_REQUIRE_VOCABULARY=1 (otherwise app_empty_vectors_total
+# counts them)
+JUNK_FILTER_ENABLED = os.environ.get('JUNK_FILTER', '1').lower() not in ('0', 'false', 'no')
+
+# Shadow scoring: a candidate model (SHADOW_MODEL_PATH) scores a sample of
+# /predict traffic in a background thread for comparison with the primary
+SHADOW_MODEL_PATH = os.environ.get('SHADOW_MODEL_PATH')
+SHADOW_VECTORIZER_PATH = os.environ.get('SHADOW_VECTORIZER_PATH')  # default: the primary vectorizer
+SHADOW_PREDICTIONS = Counter(
+    'app_shadow_predictions_total',
+    'Shadow-scored requests by primary and candidate prediction',
+    ['primary', 'shadow']
+)
+SHADOW_INFERENCE_TIME = Histogram(
+    'app_shadow_inference_seconds',
+    'Inference latency of shadow-scored requests by model',
+    ['model'],  # primary/shadow
+    buckets=[0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1]
+)
+Gauge(
+    'app_shadow_dropped',
+    'Shadow samples dropped because the shadow scorer was behind its CPU budget'
+).set_function(lambda: SHADOW.dropped if SHADOW is not None else 0)
+Gauge(
+    'app_shadow_queue_depth',
+    'Requests waiting to be shadow-scored in this process'
+).set_function(lambda: SHADOW.snapshot()['queued'] if SHADOW is not None else 0)
+
+# Named models: requests may pick another taxonomy with "model": "name" or
+# "name@version", loaded on demand from MODELS_DIR into a size-bounded LRU
+MODELS_DIR = os.environ.get('MODELS_DIR')
+MODEL_PREWARM = [ref.strip() for ref in os.environ.get('MODEL_PREWARM', '').split(',') if ref.strip()]
+NAMED_MODEL_PREDICTIONS = Counter(
+    'app_named_model_predictions_total',
+    'Predictions served by named models',
+    ['model', 'category']
+)
+NAMED_MODEL_INFERENCE_TIME = Histogram(
+    'app_named_model_inference_seconds',
+    'Per-text inference time of named models',
+    ['model']
+)
+MODEL_LOAD_TIME = Histogram(
+    'app_model_load_seconds',
+    'Time to load a named model from MODELS_DIR',
+    ['model'],
+    buckets=[0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+)
+MODEL_REGISTRY = ModelRegistry(
+    MODELS_DIR,
+    max_bytes=int(float(os.environ.get('MODEL_CACHE_MAX_MB', 512)) * 1024 * 1024),
+    on_load=lambda entry, seconds: MODEL_LOAD_TIME.labels(model=entry.key).observe(seconds)
+) if MODELS_DIR else None
+Gauge(
+    'app_model_cache_bytes',
+    'Pickled size of the named models held in memory'
+).set_function(lambda: MODEL_REGISTRY.cached_bytes if MODEL_REGISTRY is not None else 0)
+Gauge(
+    'app_model_cache_models',
+    'Named models held in memory'
+).set_function(lambda: len(MODEL_REGISTRY) if MODEL_REGISTRY is not None else 0)
+Gauge(
+    'app_model_cache_hits',
+    'Named model lookups served from memory'
+).set_function(lambda: MODEL_REGISTRY.hits if MODEL_REGISTRY is not None else 0)
+Gauge(
+    'app_model_cache_misses',
+    'Named model lookups that loaded from disk'
+).set_function(lambda: MODEL_REGISTRY.misses if MODEL_REGISTRY is not None else 0)
+Gauge(
+    'app_model_cache_evictions',
+    'Named models evicted to stay under MODEL_CACHE_MAX_MB'
+).set_function(lambda: MODEL_REGISTRY.evictions if MODEL_REGISTRY is not None else 0)
+
+# Opt-in capture of sanitized /predict traffic for scripts/replay_traffic.py
+TRAFFIC_CAPTURE_DIR = os.environ.get('TRAFFIC_CAPTURE_DIR')
+TRAFFIC_CAPTURE = TrafficRecorder(
+    TRAFFIC_CAPTURE_DIR,
+    sample_rate=float(os.environ.get('TRAFFIC_CAPTURE_SAMPLE_RATE', 1.0)),
+    max_bytes=int(float(os.environ.get('TRAFFIC_CAPTURE_MAX_MB', 100)) * 1024 * 1024)
+) if TRAFFIC_CAPTURE_DIR else None
+CAPTURED_ENDPOINTS = ('predict', 'predict_batch')
+Gauge(
+    'app_traffic_capture_records',
+    'Requests written to the traffic capture log by this process'
+).set_function(lambda: TRAFFIC_CAPTURE.recorded if TRAFFIC_CAPTURE is not None else 0)
+Gauge(
+    'app_traffic_capture_dropped',
+    'Sampled requests not captured (queue full or size cap reached)'
+).set_function(lambda: TRAFFIC_CAPTURE.dropped if TRAFFIC_CAPTURE is not None else 0)
+
+# Warmup: representative inferences (and, in each worker, the first storage
+# connection) run before a process reports ready on /ready; see warmup.py
+WARMUP_ENABLED = os.environ.get('WARMUP', '1').lower() not in ('0', 'false', 'no')
+WARMUP = Warmup(
+    load_texts(os.environ.get('WARMUP_TEXTS', 'customer_feedback.csv'),
+               limit=int(os.environ.get('WARMUP_REQUESTS', 64))),
+    timeout=float(os.environ.get('WARMUP_TIMEOUT', 10))
+)
+Gauge(
+    'app_ready',
+    'Whether this process has finished warmup and reports ready'
+).set_function(lambda: WARMUP.ready or not WARMUP_ENABLED)
+Gauge(
+    'app_warmup_seconds',
+    'Duration of the last warmup run in this process'
+).set_function(lambda: WARMUP.snapshot().get('seconds', 0))
+WARMUP_TIMEOUTS = Counter(
+    'app_warmup_timeouts_total',
+    'Warmups that outlived WARMUP_TIMEOUT (the process served while not ready)'
+)
+
+# Request tracing: span timings per request, the slowest recent traces on
+# /traces, exemplars on the latency histograms and optional OTLP export
+TRACING_ENABLED = os.environ.get('TRACING', '1').lower() not in ('0', 'false', 'no')
+OTLP_ENDPOINT = os.environ.get('OTLP_ENDPOINT')  # e.g. http://localhost:4318/v1/traces
+TRACER = Tracer(
+    SlowTraceStore(
+        max_traces=int(os.environ.get('TRACE_STORE_SIZE', 100)),
+        window=float(os.environ.get('TRACE_STORE_WINDOW', 300))
+    ),
+    OTLPExporter(
+        OTLP_ENDPOINT,
+        service_name=os.environ.get('OTLP_SERVICE_NAME', 'textcat-api')
+    ) if OTLP_ENDPOINT else None,
+    export_sample_rate=float(os.environ.get('OTLP_SAMPLE_RATE', 0.1))
+) if TRACING_ENABLED else None
+UNTRACED_ENDPOINTS = (
+    None, 'static', 'metrics', 'ready', 'health', 'list_traces', 'get_trace', 'memory_report', 'memory_baseline'
+)
+Gauge(
+    'app_traces_kept',
+    'Slow traces held in this process for /traces'
+).set_function(lambda: len(TRACER.store) if TRACER is not None else 0)
+Gauge(
+    'app_traces_exported',
+    'Traces sent to the OTLP endpoint by this process'
+).set_function(lambda: TRACER.exporter.exported if TRACER is not None and TRACER.exporter else 0)
+Gauge(
+    'app_traces_export_dropped',
+    'Traces not exported (queue full or collector unreachable)'
+).set_function(lambda: TRACER.exporter.dropped if TRACER is not None and TRACER.exporter else 0)
+
+# Opt-in tracemalloc allocation tracking for /debug/memory (slows the app
+# down; enable while hunting a leak, not permanently)
+MEMORY_TRACKING = os.environ.get('MEMORY_TRACKING', '').lower() in ('1', 'true', 'yes')
+MEMORY_TRACKER = AllocationTracker(frames=int(os.environ.get('MEMORY_TRACKING_FRAMES', 10))) if MEMORY_TRACKING else None
+if MEMORY_TRACKER is not None:
+    MEMORY_TRACKER.start()
+
+# Live statistics pushed over Server-Sent Events from in-process counters
+LIVE_STATS = LiveStats()
+STATS_BROADCASTER = StatsBroadcaster(
+    LIVE_STATS,
+    interval=float(os.environ.get('STATS_STREAM_INTERVAL', 5)),
+    max_subscribers=int(os.environ.get('STATS_STREAM_MAX_SUBSCRIBERS', 8))
+)
+STREAM_THREAD_SHARE = 4  # at most one in this many worker threads may hold a stream
+
+def limit_stream_subscribers(threads):
+    """Cap /stats/stream subscribers for a gunicorn worker with `threads` threads
+
+    Called by gunicorn.conf.py's post_worker_init. Each open stream holds a
+    worker thread for as long as it lasts, so a quarter of them at most
+    (none for a single-threaded worker) may stream; beyond that /stats/stream
+    answers 503 before the stream starts.
+    """
+    STATS_BROADCASTER.max_subscribers = min(STATS_BROADCASTER.max_subscribers, threads // STREAM_THREAD_SHARE)
+Gauge(
+    'app_stats_stream_subscribers',
+    'Open /stats/stream connections in this process'
+).set_function(lambda: STATS_BROADCASTER.subscriber_count)
+Gauge(
+    'app_stats_stream_dropped_events',
+    'Stats events replaced because a subscriber was not keeping up'
+).set_function(lambda: STATS_BROADCASTER.dropped_events)
+Gauge(
+    'app_stats_stream_slow_disconnects',
+    'Subscribers disconnected for falling too far behind'
+).set_function(lambda: STATS_BROADCASTER.disconnected_slow)
+
+# Optional on-disk copy of the similarity index, reloaded at startup
+SIMILARITY_INDEX_PATH = os.environ.get('SIMILARITY_INDEX_PATH')
+SIMILARITY_SAVE_INTERVAL = 60  # seconds between persisted snapshots
+# Rows saved by other workers are indexed by a background thread per worker
+SIMILARITY_SYNC_INTERVAL = float(os.environ.get('SIMILARITY_SYNC_INTERVAL', 2))  # seconds
+SIMILARITY_SYNC_CPU_BUDGET = float(os.environ.get('SIMILARITY_SYNC_CPU_BUDGET', 0.5))  # fraction of one core
+
+# Background topic clustering: one worker per host clusters new predictions
+# and writes a snapshot that every worker serves from /stats/clusters. The
+# default directory sits next to the SQLite file (the data volume) and is
+# created 0700, since the leader's resumable state is a pickle
+TOPIC_CLUSTERS_PATH = os.environ.get(
+    'TOPIC_CLUSTERS_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(os.environ.get('SQLITE_PATH', 'predictions.db'))),
+                 'topic_cluster_state', 'snapshot.json')
+)
+TOPIC_CLUSTERS_INTERVAL = int(os.environ.get('TOPIC_CLUSTERS_INTERVAL', 300))  # seconds
+TOPIC_CLUSTERS_CPU_BUDGET = float(os.environ.get('TOPIC_CLUSTERS_CPU_BUDGET', 0.1))  # fraction of one core
+TOPIC_CLUSTERS_K = int(os.environ.get('TOPIC_CLUSTERS_K', 5))
 
 # Load ML models globally (cached)
 MODEL = None
 VECTORIZER = None
+EXPLAINER = None
+SIMILARITY_INDEX = None
+SIMILARITY_SYNC = None
+TOPIC_CLUSTERING = None
+DRIFT = None
+SHADOW = None
+JUNK_FILTER = None
 
 def load_models():
     """Load ML models once on startup"""
-    global MODEL, VECTORIZER
+    global MODEL, VECTORIZER, EXPLAINER, SIMILARITY_INDEX, SIMILARITY_SYNC, TOPIC_CLUSTERING, DRIFT, SHADOW, JUNK_FILTER
     if MODEL is None:
         logger.info("Loading ML models...")
         try:
             MODEL = joblib.load('textcat_model.pkl')
             VECTORIZER = joblib.load('tfidf_vectorizer.pkl')
+            EXPLAINER = TermExplainer(MODEL, VECTORIZER)
+            SIMILARITY_INDEX = load_similarity_index(len(VECTORIZER.vocabulary_))
+            SIMILARITY_SYNC = SimilaritySyncJob(
+                SIMILARITY_INDEX,
+                lambda after_id, limit: fetch_prediction_rows(after_id, limit),
+                VECTORIZER.transform,
+                interval=SIMILARITY_SYNC_INTERVAL,
+                cpu_budget=SIMILARITY_SYNC_CPU_BUDGET,
+                on_sync=lambda added: save_similarity_index()
+            )
+            TOPIC_CLUSTERING = TopicClusteringJob(
+                TopicClusterer(EXPLAINER.terms, n_clusters=TOPIC_CLUSTERS_K),
+                lambda after_id, limit: fetch_prediction_rows(after_id, limit),
+                VECTORIZER.transform,
+                TOPIC_CLUSTERS_PATH,
+                interval=TOPIC_CLUSTERS_INTERVAL,
+                cpu_budget=TOPIC_CLUSTERS_CPU_BUDGET
+            )
+            if JUNK_FILTER_ENABLED:
+                JUNK_FILTER = JunkFilter.from_vectorizer(
+                    VECTORIZER,
+                    min_letter_ratio=float(os.environ.get('JUNK_MIN_LETTER_RATIO', 0.5)),
+                    max_run_ratio=float(os.environ.get('JUNK_MAX_RUN_RATIO', 0.5)),
+                    min_unique_ratio=float(os.environ.get('JUNK_MIN_UNIQUE_RATIO', 0.25)),
+                    require_vocabulary=os.environ.get('JUNK_REQUIRE_VOCABULARY', '').lower() in ('1', 'true', 'yes')
+                )
+            if DRIFT_MONITORING:
+                DRIFT = DriftMonitor(
+                    VECTORIZER,
+                    width=int(os.environ.get('DRIFT_SKETCH_WIDTH', 2048)),
+                    depth=int(os.environ.get('DRIFT_SKETCH_DEPTH', 4)),
+                    top_k=int(os.environ.get('DRIFT_TOP_K', 50)),
+                    window_tokens=int(os.environ.get('DRIFT_WINDOW_TOKENS', 1_000_000))
+                )
+            if SHADOW_MODEL_PATH:
+                SHADOW = ShadowScorer(
+                    joblib.load(SHADOW_MODEL_PATH),
+                    joblib.load(SHADOW_VECTORIZER_PATH) if SHADOW_VECTORIZER_PATH else VECTORIZER,
+                    sample_rate=float(os.environ.get('SHADOW_SAMPLE_RATE', 0.1)),
+                    max_queue=int(os.environ.get('SHADOW_QUEUE_SIZE', 256)),
+                    cpu_budget=float(os.environ.get('SHADOW_CPU_BUDGET', 0.1)),
+                    on_result=record_shadow_result
+                )
+                logger.info(f"✅ Shadow model loaded from {SHADOW_MODEL_PATH}")
+            if MODEL_REGISTRY is not None and MODEL_PREWARM:
+                failures = MODEL_REGISTRY.prewarm(MODEL_PREWARM)
+                for ref, error in failures.items():
+                    logger.warning(f"⚠️ Could not pre-warm model {ref}: {error}")
+                logger.info(f"✅ Pre-warmed {len(MODEL_PREWARM) - len(failures)} named models")
             MODEL_LOADED.set(1)
             logger.info("✅ Models loaded successfully")
         except Exception as e:
@@ -178,7 +576,45 @@ def load_models():
             logger.error(f"❌ Failed to load models: {e}")
             raise
 
-# Load models on startup
+def record_shadow_result(primary, shadow, primary_seconds, shadow_seconds):
+    """Prometheus side of ShadowScorer results (runs on the shadow thread)"""
+    SHADOW_PREDICTIONS.labels(primary=primary, shadow=shadow).inc()
+    SHADOW_INFERENCE_TIME.labels(model='shadow').observe(shadow_seconds)
+    if primary_seconds is not None:
+        SHADOW_INFERENCE_TIME.labels(model='primary').observe(primary_seconds)
+
+def load_similarity_index(n_features):
+    """Reload the persisted similarity index if present, else start empty"""
+    if SIMILARITY_INDEX_PATH and os.path.exists(SIMILARITY_INDEX_PATH):
+        try:
+            index = SimilarityIndex.load(SIMILARITY_INDEX_PATH, n_features)
+            if index is not None:
+                logger.info(f"✅ Loaded similarity index with {len(index)} documents")
+                return index
+            logger.warning("Similarity index does not match the vocabulary - rebuilding")
+        except Exception as e:
+            logger.warning(f"Failed to load similarity index: {e}")
+    return SimilarityIndex(n_features)
+
+_similarity_saved_at = time.monotonic()
+
+def save_similarity_index(force=False):
+    """Persist the similarity index if configured (rate limited unless forced)"""
+    global _similarity_saved_at
+    if not SIMILARITY_INDEX_PATH or SIMILARITY_INDEX is None:
+        return
+    if not force and time.monotonic() - _similarity_saved_at < SIMILARITY_SAVE_INTERVAL:
+        return
+    _similarity_saved_at = time.monotonic()
+    try:
+        SIMILARITY_INDEX.save(SIMILARITY_INDEX_PATH)
+    except Exception as e:
+        logger.warning(f"Failed to save similarity index: {e}")
+
+atexit.register(save_similarity_index, force=True)
+
+# Load models on startup. Under gunicorn --preload this runs once in the
+# master before forking, so workers share the model pages copy-on-write.
 load_models()
 
 # Middleware to track metrics
@@ -187,12 +623,33 @@ def before_request():
     """Track request start time and increment active requests"""
     request.start_time = time.time()
     ACTIVE_REQUESTS.inc()
+    if TRACER is not None and request.endpoint not in UNTRACED_ENDPOINTS:
+        g.trace = TRACER.start(request.endpoint, request.headers.get('traceparent'))
+    if not LEAN_STARTUP:
+        ensure_cpu_monitor()
+    start_background_jobs()
+    if WARMUP_ENABLED and not WARMUP.started:
+        # A worker whose server ran no post_worker_init hook warms up in the background
+        WARMUP.start(WORKER_WARMUP_STEPS)
 
 @app.after_request
 def after_request(response):
     """Track request metrics after processing"""
     request_latency = time.time() - request.start_time
     
+    # Exemplars only point at traces /traces can still return
+    trace = g.pop('trace', None)
+    latency_exemplar = None
+    if trace is not None:
+        kept = TRACER.finish(trace, **{
+            'http.method': request.method,
+            'http.route': request.url_rule.rule if request.url_rule else request.path,
+            'http.status_code': response.status_code
+        })
+        response.headers['X-Trace-Id'] = trace.trace_id
+        if kept:
+            latency_exemplar = {'trace_id': trace.trace_id}
+    
     REQUEST_COUNT.labels(
         method=request.method,
         endpoint=request.endpoint or 'unknown',
@@ -202,35 +659,48 @@ def after_request(response):
     REQUEST_LATENCY.labels(
         method=request.method,
         endpoint=request.endpoint or 'unknown'
-    ).observe(request_latency)
+    ).observe(request_latency, exemplar=latency_exemplar)
     
     ACTIVE_REQUESTS.dec()
     
-    # Update resource metrics periodically
-    update_resource_metrics()
+    if (TRAFFIC_CAPTURE is not None and request.endpoint in CAPTURED_ENDPOINTS
+            and response.status_code == 200 and g.get('payload')):
+        TRAFFIC_CAPTURE.record(
+            request.endpoint, request.start_time, g.payload, request_latency * 1000,
+            response.get_data(), response.mimetype
+        )
+    
+    access_logger.info(
+        '%s %s %s', request.method, request.path, response.status_code,
+        extra={'fields': access_log_fields(
+            request.method, request.path, response.status_code, request_latency,
+            endpoint=request.endpoint
+        )}
+    )
+    
+    # Update resource metrics periodically (lean mode only pays for psutil once scraped)
+    if not LEAN_STARTUP or _cpu_monitor_pid == os.getpid():
+        update_resource_metrics()
     
     return response
 
-def get_db():
-    """Get PostgreSQL database connection"""
-    try:
-        database_url = os.environ.get('DATABASE_URL')
-        if not database_url:
-            logger.warning("DATABASE_URL not set - running without database")
-            return None
-        
-        # Render uses postgres:// but psycopg2 needs postgresql://
-        if database_url.startswith('postgres://'):
-            database_url = database_url.replace('postgres://', 'postgresql://', 1)
-        
-        return psycopg2.connect(database_url, cursor_factory=RealDictCursor)
-    except Exception as e:
-        logger.error(f"Database connection error: {e}")
-        return None
+# Prediction storage: PostgreSQL when DATABASE_URL is set, embedded SQLite
+# otherwise (STORAGE_BACKEND overrides; see storage.py)
+STORAGE = create_storage()
+
+def start_background_jobs():
+    """Start this process's threads that read stored predictions (once per PID)"""
+    if STORAGE is not None:
+        TOPIC_CLUSTERING.ensure_started()
+        SIMILARITY_SYNC.ensure_started()
 
 @app.route('/metrics')
 def metrics():
-    """Prometheus metrics endpoint"""
+    """Prometheus metrics endpoint (OpenMetrics, with exemplars, when the scraper asks for it)"""
+    ensure_cpu_monitor()
+    update_resource_metrics()
+    if 'application/openmetrics-text' in request.headers.get('Accept', ''):
+        return generate_openmetrics(REGISTRY), 200, {'Content-Type': OPENMETRICS_CONTENT_TYPE}
     return generate_latest(), 200, {'Content-Type': CONTENT_TYPE_LATEST}
 
 @app.route('/')
@@ -243,12 +713,34 @@ def home():
         'model_loaded': MODEL is not None,
         'endpoints': {
             'health': '/',
+            'ready': '/ready',
             'predict': '/predict',
+            'predict_batch': '/predict/batch',
+            'explain': '/explain',
+            'explain_batch': '/explain/batch',
+            'similar': '/similar',
             'stats': '/stats',
+            'topic_clusters': '/stats/clusters',
+            'models': '/models',
+            'vocabulary_drift': '/stats/drift',
+            'shadow_stats': '/stats/shadow',
+            'traces': '/traces',
+            'memory': '/debug/memory',
+            'stats_stream': '/stats/stream',
             'metrics': '/metrics'
         }
     }), 200
 
+@app.route('/ready')
+def ready():
+    """Readiness probe: 503 until the model is loaded and this process has warmed up"""
+    is_ready = MODEL is not None and (WARMUP.ready or not WARMUP_ENABLED)
+    return jsonify({
+        'status': 'ready' if is_ready else 'warming_up',
+        'model_loaded': MODEL is not None,
+        'warmup': WARMUP.snapshot() if WARMUP_ENABLED else 'disabled'
+    }), 200 if is_ready else 503
+
 @app.route('/health')
 def health():
     """Health check endpoint"""
@@ -259,208 +751,1253 @@ def health():
         'model_loaded': MODEL is not None
     }), 200
 
-@app.route('/predict', methods=['POST'])
-def predict():
-    """Main prediction endpoint"""
+# Endpoints that expose stored customer text or internals (/export, /traces,
+# /debug/memory) answer only requests with "Authorization: Bearer $ADMIN_TOKEN"; without
+# ADMIN_TOKEN they are off (CORS alone would let any origin read them)
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+def require_admin(endpoint):
+    """Error response unless the request carries the admin token, else None"""
+    if not ADMIN_TOKEN:
+        ERROR_TYPES.labels(error_type='admin_disabled', endpoint=endpoint).inc()
+        return jsonify({'error': 'This endpoint is disabled (set ADMIN_TOKEN to enable it)'}), 403
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(token.strip().encode(), ADMIN_TOKEN.encode()):
+        ERROR_TYPES.labels(error_type='unauthorized', endpoint=endpoint).inc()
+        return jsonify({'error': 'Missing or invalid admin token'}), 401, {'WWW-Authenticate': 'Bearer'}
+    return None
+
+MAX_TEXT_LENGTH = 5000
+MAX_BATCH_SIZE = 100
+MAX_PREDICT_BATCH_SIZE = int(os.environ.get('MAX_PREDICT_BATCH_SIZE', 2000))
+MAX_TOP_K = 50
+# /predict/long: documents up to MAX_LONG_TEXT_LENGTH characters, classified
+# in chunks of LONG_TEXT_CHUNK_CHARS
+MAX_LONG_TEXT_LENGTH = int(os.environ.get('MAX_LONG_TEXT_LENGTH', 1_000_000))
+LONG_TEXT_CHUNK_CHARS = int(os.environ.get('LONG_TEXT_CHUNK_CHARS', 2000))
+
+def validate_text(text):
+    """Return (error_type, message) if text is not acceptable, else None"""
+    if not text:
+        return 'empty_text', 'Text field is required'
+    if len(text) < 3:
+        return 'text_too_short', 'Text must be at least 3 characters long'
+    if len(text) > MAX_TEXT_LENGTH:
+        return 'text_too_long', f'Text must be less than {MAX_TEXT_LENGTH} characters'
+    return None
+
+def check_junk(text, endpoint, check_vocabulary=True):
+    """(error_type, message) if the junk filter rejects text, counted in ERROR_TYPES
+
+    Pass check_vocabulary=False for named models, whose vocabulary differs.
+    """
+    if JUNK_FILTER is None:
+        return None
+    with span('junk_filter'):
+        junk = JUNK_FILTER.check(text, check_vocabulary)
+    if junk:
+        ERROR_TYPES.labels(error_type=junk[0], endpoint=endpoint).inc()
+        if junk[0] == 'junk_no_vocabulary':
+            observe_drift(text, endpoint)  # unknown words are exactly what drift monitoring looks for
+    return junk
+
+def track_prediction(prediction, confidence):
+    """Update the per-prediction ML metrics"""
+    LIVE_STATS.record(prediction, confidence)
+    PREDICTION_CONFIDENCE.labels(category=prediction).observe(confidence)
+    PREDICTIONS_COUNT.labels(category=prediction).inc()
+    
+    # Track confidence levels
+    if confidence < 0.5:
+        confidence_level = 'low'
+        LOW_CONFIDENCE_PREDICTIONS.labels(category=prediction).inc()
+    elif confidence < 0.7:
+        confidence_level = 'medium'
+    else:
+        confidence_level = 'high'
+    
+    PREDICTIONS_BY_CONFIDENCE_LEVEL.labels(level=confidence_level, category=prediction).inc()
+    
+    # Update rolling average confidence
+    if prediction not in confidence_tracker:
+        confidence_tracker[prediction] = []
+    confidence_tracker[prediction].append(confidence)
+    # Keep last 100 predictions for rolling average
+    confidence_tracker[prediction] = confidence_tracker[prediction][-100:]
+    AVG_CONFIDENCE.labels(category=prediction).set(sum(confidence_tracker[prediction]) / len(confidence_tracker[prediction]))
+
+def format_probabilities(proba):
+    """Map class names to percentage scores"""
+    return {
+        category: round(float(score) * 100, 2)
+        for category, score in zip(MODEL.classes_, proba)
+    }
+
+def classify_text(text):
+    """Classify one text, reusing a near-duplicate's result when possible
+
+    Returns (classification, duplicate): classification holds the
+    prediction, proba, the TF-IDF terms (indices, weights) for the
+    similarity index and the drift analysis, so a near-duplicate hit reuses
+    all of them and neither vectorizes nor tokenizes the text. duplicate is
+    None unless the classification was reused.
+    """
+    # Reuse the classification of a near-duplicate seen recently
+    duplicate = None
+    signature = None
+    if NEAR_DUPLICATES.max_entries > 0:
+        lookup_start = time.time()
+        with span('near_duplicate_lookup'):
+            signature = NEAR_DUPLICATES.signature(text)
+            duplicate = NEAR_DUPLICATES.lookup(signature)
+        NEAR_DUPLICATE_LOOKUP_LATENCY.observe(time.time() - lookup_start)
+        NEAR_DUPLICATE_LOOKUPS.labels(result='hit' if duplicate else 'miss').inc()
+    
+    if duplicate:
+        return duplicate[0], duplicate
+    
+    # Make prediction with timing
+    inference_start = time.time()
+    with span('inference'):
+        text_vec = VECTORIZER.transform([text])
+        prediction = MODEL.predict(text_vec)[0]
+        proba = MODEL.predict_proba(text_vec)[0]
+    inference_time = time.time() - inference_start
+    MODEL_INFERENCE_TIME.labels(category=prediction).observe(inference_time, exemplar=exemplar(inference_time))
+    classification = {
+        'prediction': prediction,
+        'proba': proba,
+        'terms': (text_vec.indices, text_vec.data),
+        'drift': DRIFT.analyze(text) if DRIFT is not None else None
+    }
+    if signature is not None:
+        NEAR_DUPLICATES.insert(signature, classification, text[:100] + '...' if len(text) > 100 else text)
+    NEAR_DUPLICATE_INDEX_SIZE.set(len(NEAR_DUPLICATES))
+    return classification, None
+
+def observe_drift(text, endpoint, analyzed=None):
+    """Record a text's out-of-vocabulary tokens with the drift monitor
+
+    analyzed is DRIFT.analyze() output to count instead of tokenizing text
+    again (classify_text() keeps it with each classification).
+    """
+    if DRIFT is None:
+        return
+    n_tokens, unseen = analyzed if analyzed is not None else DRIFT.analyze(text)
+    DRIFT.record(n_tokens, unseen)
+    n_oov = len(unseen)
+    VOCABULARY_TOKENS.labels(in_vocabulary='true').inc(n_tokens - n_oov)
+    VOCABULARY_TOKENS.labels(in_vocabulary='false').inc(n_oov)
+    if n_tokens == n_oov:
+        EMPTY_VECTORS.labels(endpoint=endpoint).inc()
+    if n_tokens:
+        REQUEST_OOV_RATIO.observe(n_oov / n_tokens)
+
+def get_named_model(ref, endpoint):
+    """Resolve a "model" field; returns (entry, None) or (None, (error body, status))"""
+    if MODEL_REGISTRY is None:
+        ERROR_TYPES.labels(error_type='named_models_disabled', endpoint=endpoint).inc()
+        return None, ({'error': 'Named models are not enabled (set MODELS_DIR)'}, 400)
+    if not isinstance(ref, str):
+        ERROR_TYPES.labels(error_type='invalid_model', endpoint=endpoint).inc()
+        return None, ({'error': 'model must be a string like "name" or "name@version"'}, 400)
+    try:
+        return MODEL_REGISTRY.get(ref), None
+    except ValueError as e:
+        ERROR_TYPES.labels(error_type='invalid_model', endpoint=endpoint).inc()
+        return None, ({'error': str(e)}, 400)
+    except ModelNotFound as e:
+        ERROR_TYPES.labels(error_type='unknown_model', endpoint=endpoint).inc()
+        return None, ({'error': str(e)}, 404)
+
+def classify_with_named_model(entry, texts):
+    """Vectorized inference with a named model; returns one result per text
+
+    Named-model predictions are not stored: the predictions table, /stats
+    and the similarity indexes all belong to the default model's taxonomy.
+    """
+    inference_start = time.time()
+    with span('inference', model=entry.key, items=len(texts)):
+        proba = entry.model.predict_proba(entry.vectorizer.transform(texts))
+        predictions = entry.model.classes_[proba.argmax(axis=1)]
+    per_item_time = (time.time() - inference_start) / len(texts)
+    
+    timestamp = datetime.utcnow().isoformat()
+    results = []
+    for text, prediction, row_proba in zip(texts, predictions, proba):
+        NAMED_MODEL_PREDICTIONS.labels(model=entry.key, category=prediction).inc()
+        NAMED_MODEL_INFERENCE_TIME.labels(model=entry.key).observe(per_item_time)
+        results.append({
+            'success': True,
+            'prediction': prediction,
+            'confidence': round(float(row_proba.max()) * 100, 2),
+            'all_probabilities': {
+                category: round(float(score) * 100, 2)
+                for category, score in zip(entry.model.classes_, row_proba)
+            },
+            'feedback': text[:100] + '...' if len(text) > 100 else text,
+            'model': entry.key,
+            'timestamp': timestamp
+        })
+    return results
+
+def build_prediction_result(text, prediction, proba, duplicate=None):
+    """Response body for one prediction"""
+    result = {
+        'success': True,
+        'prediction': prediction,
+        'confidence': round(float(max(proba)) * 100, 2),
+        'all_probabilities': format_probabilities(proba),
+        'feedback': text[:100] + '...' if len(text) > 100 else text,
+        'processing_time_ms': 0,
+        'timestamp': datetime.utcnow().isoformat()
+    }
+    if duplicate:
+        _, similarity, cluster_size = duplicate
+        result['near_duplicate'] = {
+            'similarity': round(similarity, 4),
+            'cluster_size': cluster_size
+        }
+    return result
+
+def claim_idempotency_key(endpoint, key, text):
+    """Look up a namespaced key; returns (status, cached result) as IdempotencyStore.acquire"""
+    with span('idempotency'):
+        status, cached = IDEMPOTENCY.acquire(key, fingerprint(text))
+    if status in ('replay', 'joined'):
+        IDEMPOTENT_REPLAYS.labels(endpoint=endpoint, source='memory' if status == 'replay' else 'in_flight').inc()
+    elif status in ('conflict', 'busy'):
+        IDEMPOTENCY_KEY_CONFLICTS.labels(endpoint=endpoint, reason=status).inc()
+    return status, cached
+
+def claim_request_key(endpoint, idempotency_key, text):
+    """Validate and claim the Idempotency-Key header of a single-text request
+
+    Returns (namespaced key, None) when the request should go ahead, or
+    (None, (body, status, headers)) when it is answered here: an invalid
+    key, a replay, a conflict or a request with the key still in flight.
+    """
+    if not 0 < len(idempotency_key) <= MAX_KEY_LENGTH:
+        ERROR_TYPES.labels(error_type='invalid_idempotency_key', endpoint=endpoint).inc()
+        return None, ({'error': f'Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters'}, 400, {})
+    idempotency_key = f'{endpoint}:{idempotency_key}'
+    
+    status, cached = claim_idempotency_key(endpoint, idempotency_key, text)
+    if cached is not None:
+        return None, (cached, 200, {'Idempotent-Replayed': 'true'})
+    if status == 'conflict':
+        return None, ({'error': 'Idempotency-Key was already used with a different text'}, 422, {})
+    if status == 'busy':
+        return None, ({'error': 'A request with this Idempotency-Key is still being processed'}, 409, {})
+    return idempotency_key, None
+
+def prepare_prediction(text, idempotency_key=None):
+    """Classify one text; returns the pending prediction complete_prediction() stores"""
+    classify_start = time.perf_counter()
+    classification, duplicate = classify_text(text)
+    prediction, proba = classification['prediction'], classification['proba']
+    if SHADOW is not None:
+        # Primary latency only when the model ran (not a near-duplicate reuse)
+        SHADOW.submit(text, prediction, time.perf_counter() - classify_start if duplicate is None else None)
+    with span('drift'):
+        observe_drift(text, 'predict', classification['drift'])
+    confidence = float(max(proba))
+    return {
+        'endpoint': 'predict',
+        'rows': [(text, prediction, confidence)],
+        'keys': [idempotency_key] if idempotency_key else None,
+        'idempotency_key': idempotency_key,
+        'terms': classification['terms'],
+        'result': build_prediction_result(text, prediction, proba, duplicate)
+    }
+
+def complete_prediction(pending, saved):
+    """Apply a save_predictions() outcome to a pending prediction; returns the response body
+
+    A pending prediction is a dict: the endpoint, the row (text, category,
+    confidence) to store with its idempotency key, the TF-IDF terms for the
+    similarity index and the response body. saved is None when the save
+    failed or there is no storage.
+    """
+    _, prediction, confidence = pending['rows'][0]
+    result = pending['result']
+    created = True
+    if STORAGE is not None:
+        if saved is None:
+            result['warning'] = 'Prediction succeeded but database save failed'
+        else:
+            row_id, created = saved[0]
+            result['firestore_id'] = str(row_id)  # Keep same field name for compatibility
+            if created:
+                with span('similarity_index.add'):
+                    # A near-duplicate is indexed with the terms of the text it matched
+                    SIMILARITY_INDEX.add_terms(row_id, *pending['terms'], prediction)
+                logger.info("✅ Saved prediction %s", row_id, extra={'sample': True})
+            else:
+                # Retry of a request another worker already stored
+                IDEMPOTENT_REPLAYS.labels(endpoint=pending['endpoint'], source='storage').inc()
+    
+    if created:
+        track_prediction(prediction, confidence)
+    logger.info("Prediction: %s (%.2f%%)", prediction, confidence * 100, extra={'sample': True})
+    return result
+
+def predict_error(e, endpoint='predict'):
+    """(body, status, headers) of a prediction request that raised"""
+    ERROR_TYPES.labels(error_type=type(e).__name__, endpoint=endpoint).inc()
+    logger.error(f"Prediction error: {e}", exc_info=True)
+    return {
+        'success': False,
+        'error': 'Internal server error',
+        'details': str(e)
+    }, 500, {}
+
+def begin_predict(data, idempotency_key=None):
+    """First half of the /predict request core, shared by app.py and app_async.py
+
+    Takes the decoded body and the Idempotency-Key header. Validation, the
+    junk filter, named models, the idempotency claim and inference happen
+    here; storage does not, so each server saves with its own driver.
+    Returns (response, None) when the request is answered without a save,
+    or (None, pending) when pending['rows'] (with pending['keys']) still
+    have to be saved and the outcome passed to finish_predict().
+    """
     try:
-        # Validate request
-        data = request.get_json()
         if not data:
             ERROR_TYPES.labels(error_type='no_json_data', endpoint='predict').inc()
-            return jsonify({'error': 'No JSON data provided'}), 400
+            return ({'error': 'No JSON data provided'}, 400, {}), None
         
         # Extract text (support both 'text' and 'feedback' fields)
-        text = data.get('text') or data.get('feedback', '')
-        text = text.strip()
+        text = (data.get('text') or data.get('feedback', '')).strip()
         
         # Validate text
-        if not text:
-            ERROR_TYPES.labels(error_type='empty_text', endpoint='predict').inc()
-            return jsonify({'error': 'Text field is required'}), 400
+        error = validate_text(text)
+        if error:
+            ERROR_TYPES.labels(error_type=error[0], endpoint='predict').inc()
+            return ({'error': error[1]}, 400, {}), None
         
-        if len(text) < 3:
-            ERROR_TYPES.labels(error_type='text_too_short', endpoint='predict').inc()
-            return jsonify({'error': 'Text must be at least 3 characters long'}), 400
-        
-        if len(text) > 5000:
-            ERROR_TYPES.labels(error_type='text_too_long', endpoint='predict').inc()
-            return jsonify({'error': 'Text must be less than 5000 characters'}), 400
+        junk = check_junk(text, 'predict', check_vocabulary=data.get('model') is None)
+        if junk:
+            return ({'success': False, 'error': junk[1], 'error_type': junk[0]}, 422, {}), None
         
         # Track text length
         TEXT_LENGTH.observe(len(text))
         
-        # Make prediction with timing
-        inference_start = time.time()
-        text_vec = VECTORIZER.transform([text])
-        prediction = MODEL.predict(text_vec)[0]
-        proba = MODEL.predict_proba(text_vec)[0]
-        inference_time = time.time() - inference_start
+        if data.get('model') is not None:
+            entry, error = get_named_model(data['model'], 'predict')
+            if error:
+                return (error[0], error[1], {}), None
+            return (classify_with_named_model(entry, [text])[0], 200, {}), None
         
-        confidence = float(max(proba))
+        if idempotency_key is None:
+            return None, prepare_prediction(text)
         
-        # Track ML performance metrics
-        MODEL_INFERENCE_TIME.labels(category=prediction).observe(inference_time)
-        PREDICTION_CONFIDENCE.labels(category=prediction).observe(confidence)
-        PREDICTIONS_COUNT.labels(category=prediction).inc()
+        idempotency_key, answered = claim_request_key('predict', idempotency_key, text)
+        if answered:
+            return answered, None
+        try:
+            return None, prepare_prediction(text, idempotency_key)
+        except Exception:
+            IDEMPOTENCY.release(idempotency_key)
+            raise
         
-        # Track confidence levels
-        if confidence < 0.5:
-            confidence_level = 'low'
-            LOW_CONFIDENCE_PREDICTIONS.labels(category=prediction).inc()
-        elif confidence < 0.7:
-            confidence_level = 'medium'
+    except Exception as e:
+        return predict_error(e), None
+
+def finish_predict(pending, saved):
+    """Second half of the /predict request core (and /predict/long's): (body, status, headers)
+
+    saved is what save_predictions() (or app_async.py's async twin)
+    returned for pending['rows'].
+    """
+    key = pending['idempotency_key']
+    if saved is not None and saved[0][0] is None:
+        # Another worker stored this key for a different text
+        IDEMPOTENCY_KEY_CONFLICTS.labels(endpoint=pending['endpoint'], reason='conflict').inc()
+        IDEMPOTENCY.release(key)
+        return {'error': 'Idempotency-Key was already used with a different text'}, 422, {}
+    try:
+        result = complete_prediction(pending, saved)
+    except Exception as e:
+        if key is not None:
+            IDEMPOTENCY.release(key)
+        return predict_error(e, pending['endpoint'])
+    if key is not None:
+        if 'warning' in result:
+            IDEMPOTENCY.release(key)  # let a retry attempt the save again
         else:
-            confidence_level = 'high'
-        
-        PREDICTIONS_BY_CONFIDENCE_LEVEL.labels(level=confidence_level, category=prediction).inc()
-        
-        # Update rolling average confidence
-        if prediction not in confidence_tracker:
-            confidence_tracker[prediction] = []
-        confidence_tracker[prediction].append(confidence)
-        # Keep last 100 predictions for rolling average
-        confidence_tracker[prediction] = confidence_tracker[prediction][-100:]
-        AVG_CONFIDENCE.labels(category=prediction).set(sum(confidence_tracker[prediction]) / len(confidence_tracker[prediction]))
-        
-        # Create all scores
-        all_probabilities = {
-            category: round(float(score) * 100, 2)
-            for category, score in zip(MODEL.classes_, proba)
-        }
+            IDEMPOTENCY.complete(key, result)
+    return result, 200, {}
+
+def handle_predict(data, idempotency_key=None):
+    """The /predict request core for app.py: begin, save synchronously, finish"""
+    response, pending = begin_predict(data, idempotency_key)
+    if pending is None:
+        return response
+    return finish_predict(pending, save_predictions(pending['rows'], operation='save', keys=pending['keys']))
+
+def prediction_response(body, status, headers):
+    """Predictions (and replays of them) follow the Accept header; errors are JSON"""
+    response = make_payload_response(app, body) if status == 200 else app.json.response(body)
+    response.status_code = status
+    response.headers.update(headers)
+    return response
+
+@app.route('/predict', methods=['POST'])
+def predict():
+    """Main prediction endpoint (JSON or MessagePack)"""
+    return prediction_response(*handle_predict(parse_payload(), request.headers.get('Idempotency-Key')))
+
+def record_db_operation(operation, db_start, error=None):
+    """Latency and outcome metrics of one storage call started at db_start"""
+    db_time = time.time() - db_start
+    if error is None:
+        DB_QUERY_LATENCY.labels(operation=operation).observe(db_time, exemplar=exemplar(db_time))
+        DB_OPERATIONS.labels(operation=operation, status='success').inc()
+    else:
+        DB_QUERY_LATENCY.labels(operation=operation).observe(db_time)
+        DB_OPERATIONS.labels(operation=operation, status='failure').inc()
+        DB_ERRORS.labels(operation=operation, error_type=type(error).__name__).inc()
+
+def save_predictions(rows, operation='save_batch', keys=None):
+    """Store (text, category, confidence) rows in one transaction
+
+    Returns [(id, created), ...] or None; created is False for rows whose
+    idempotency key was already stored.
+    """
+    if STORAGE is None:
+        return None
+    db_start = time.time()
+    try:
+        with span('storage.save', rows=len(rows)):
+            ids = STORAGE.save(rows, keys)
+    except Exception as e:
+        record_db_operation(operation, db_start, e)
+        logger.error(f"Database save error: {e}")
+        return None
+    record_db_operation(operation, db_start)
+    return ids
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """Classify many texts in one vectorized pass (JSON or MessagePack)"""
+    try:
+        data = parse_payload()
+        if not data:
+            ERROR_TYPES.labels(error_type='no_json_data', endpoint='predict_batch').inc()
+            return jsonify({'error': 'No JSON data provided'}), 400
+        
+        texts = data.get('texts')
+        if not isinstance(texts, list) or not texts:
+            ERROR_TYPES.labels(error_type='empty_batch', endpoint='predict_batch').inc()
+            return jsonify({'error': 'texts must be a non-empty list'}), 400
+        
+        if len(texts) > MAX_PREDICT_BATCH_SIZE:
+            ERROR_TYPES.labels(error_type='batch_too_large', endpoint='predict_batch').inc()
+            return jsonify({'error': f'At most {MAX_PREDICT_BATCH_SIZE} texts per batch'}), 400
+        
+        if data.get('model') is not None:
+            return predict_batch_named(texts, data['model'], data.get('idempotency_keys'))
         
-        # Prepare result
-        result = {
+        # Optional per-item idempotency keys, parallel to texts (null = no key)
+        item_keys = data.get('idempotency_keys')
+        if item_keys is not None and (not isinstance(item_keys, list) or len(item_keys) != len(texts)):
+            ERROR_TYPES.labels(error_type='invalid_idempotency_key', endpoint='predict_batch').inc()
+            return jsonify({'error': 'idempotency_keys must be a list with one key (or null) per text'}), 400
+        
+        # Invalid items get an error entry; the rest are classified together
+        results = [None] * len(texts)
+        valid, valid_texts, valid_keys = [], [], []
+        claimed = {}  # key -> (index, fingerprint) of its first use in this batch
+        repeated = []  # (index, key) of later items reusing a key from this batch
+        for index, text in enumerate(texts):
+            text = text.strip() if isinstance(text, str) else ''
+            error = validate_text(text)
+            if error:
+                ERROR_TYPES.labels(error_type=error[0], endpoint='predict_batch').inc()
+                results[index] = {'success': False, 'error': error[1]}
+                continue
+            junk = check_junk(text, 'predict_batch')
+            if junk:
+                results[index] = {'success': False, 'error': junk[1], 'error_type': junk[0]}
+                continue
+            TEXT_LENGTH.observe(len(text))
+            
+            key = item_keys[index] if item_keys else None
+            if key is not None:
+                if not isinstance(key, str) or not 0 < len(key) <= MAX_KEY_LENGTH:
+                    ERROR_TYPES.labels(error_type='invalid_idempotency_key', endpoint='predict_batch').inc()
+                    results[index] = {'success': False, 'error': f'Idempotency key must be 1 to {MAX_KEY_LENGTH} characters'}
+                    continue
+                key = f'batch:{key}'
+                if key in claimed:
+                    repeated.append((index, key, fingerprint(text)))
+                    continue
+                status, cached = claim_idempotency_key('predict_batch', key, text)
+                if cached is not None:
+                    results[index] = cached
+                    continue
+                if status == 'conflict':
+                    results[index] = {'success': False, 'error': 'Idempotency key was already used with a different text'}
+                    continue
+                if status == 'busy':
+                    results[index] = {'success': False, 'error': 'An item with this idempotency key is still being processed'}
+                    continue
+                claimed[key] = (index, fingerprint(text))
+            valid.append(index)
+            valid_texts.append(text)
+            valid_keys.append(key)
+        
+        try:
+            if valid:
+                classify_batch(valid, valid_texts, valid_keys, results)
+        except Exception:
+            for key in claimed:
+                IDEMPOTENCY.release(key)
+            raise
+        
+        for key, (index, _) in claimed.items():
+            if 'warning' in results[index] or not results[index]['success']:
+                IDEMPOTENCY.release(key)  # nothing stored to replay: a retry starts over
+            else:
+                IDEMPOTENCY.complete(key, results[index])
+        for index, key, text_fingerprint in repeated:
+            first_index, first_fingerprint = claimed[key]
+            if text_fingerprint == first_fingerprint:
+                IDEMPOTENT_REPLAYS.labels(endpoint='predict_batch', source='memory').inc()
+                results[index] = results[first_index]
+            else:
+                IDEMPOTENCY_KEY_CONFLICTS.labels(endpoint='predict_batch', reason='conflict').inc()
+                results[index] = {'success': False, 'error': 'Idempotency key was already used with a different text'}
+        
+        return make_payload_response(app, {
+            'success': True,
+            'count': len(results),
+            'results': results
+        })
+        
+    except Exception as e:
+        ERROR_TYPES.labels(error_type=type(e).__name__, endpoint='predict_batch').inc()
+        logger.error(f"Batch prediction error: {e}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error',
+            'details': str(e)
+        }), 500
+
+def predict_batch_named(texts, model_ref, item_keys):
+    """/predict/batch with a named model: classify only, nothing is stored"""
+    if item_keys is not None:
+        ERROR_TYPES.labels(error_type='invalid_idempotency_key', endpoint='predict_batch').inc()
+        return jsonify({'error': 'idempotency_keys are not used with a named model (its predictions are not stored)'}), 400
+    entry, error = get_named_model(model_ref, 'predict_batch')
+    if error:
+        return jsonify(error[0]), error[1]
+    
+    results = [None] * len(texts)
+    valid, valid_texts = [], []
+    for index, text in enumerate(texts):
+        text = text.strip() if isinstance(text, str) else ''
+        error = validate_text(text)
+        if error:
+            ERROR_TYPES.labels(error_type=error[0], endpoint='predict_batch').inc()
+            results[index] = {'success': False, 'error': error[1]}
+            continue
+        junk = check_junk(text, 'predict_batch', check_vocabulary=False)
+        if junk:
+            results[index] = {'success': False, 'error': junk[1], 'error_type': junk[0]}
+            continue
+        TEXT_LENGTH.observe(len(text))
+        valid.append(index)
+        valid_texts.append(text)
+    
+    if valid_texts:
+        for index, result in zip(valid, classify_with_named_model(entry, valid_texts)):
+            results[index] = result
+    return make_payload_response(app, {
+        'success': True,
+        'count': len(results),
+        'model': entry.key,
+        'results': results
+    })
+
+def classify_batch(indexes, texts, keys, results):
+    """Vectorized inference and one storage transaction for the valid batch items"""
+    inference_start = time.time()
+    with span('inference', items=len(texts)):
+        text_vecs = VECTORIZER.transform(texts)
+        proba = MODEL.predict_proba(text_vecs)
+        predictions = MODEL.classes_[proba.argmax(axis=1)]
+    per_item_time = (time.time() - inference_start) / len(texts)
+    with span('drift', items=len(texts)):
+        for text in texts:
+            observe_drift(text, 'predict_batch')
+    
+    # One timestamp for the whole batch
+    timestamp = datetime.utcnow().isoformat()
+    saved_rows = []
+    for index, text, prediction, row_proba in zip(indexes, texts, predictions, proba):
+        confidence = float(row_proba.max())
+        MODEL_INFERENCE_TIME.labels(category=prediction).observe(per_item_time)
+        results[index] = {
             'success': True,
             'prediction': prediction,
             'confidence': round(confidence * 100, 2),
-            'all_probabilities': all_probabilities,
+            'all_probabilities': format_probabilities(row_proba),
             'feedback': text[:100] + '...' if len(text) > 100 else text,
-            'processing_time_ms': 0,
-            'timestamp': datetime.utcnow().isoformat()
+            'timestamp': timestamp
         }
+        saved_rows.append((text, prediction, confidence))
+    
+    created = [True] * len(indexes)
+    if STORAGE is not None:
+        saved = save_predictions(saved_rows, keys=keys if any(keys) else None)
+        if saved is None:
+            for index in indexes:
+                results[index]['warning'] = 'Prediction succeeded but database save failed'
+        else:
+            for position, (index, (row_id, row_created)) in enumerate(zip(indexes, saved)):
+                created[position] = row_created
+                if row_id is None:
+                    # Another worker stored this key for a different text
+                    IDEMPOTENCY_KEY_CONFLICTS.labels(endpoint='predict_batch', reason='conflict').inc()
+                    results[index] = {'success': False, 'error': 'Idempotency key was already used with a different text'}
+                    continue
+                results[index]['firestore_id'] = str(row_id)
+                if not row_created:
+                    IDEMPOTENT_REPLAYS.labels(endpoint='predict_batch', source='storage').inc()
+            new_rows = [position for position, row_created in enumerate(created) if row_created]
+            if new_rows:
+                with span('similarity_index.add', items=len(new_rows)):
+                    SIMILARITY_INDEX.add_batch(
+                        [saved[position][0] for position in new_rows],
+                        text_vecs[new_rows],
+                        predictions[new_rows]
+                    )
+    
+    for (_, prediction, confidence), row_created in zip(saved_rows, created):
+        if row_created:
+            track_prediction(prediction, confidence)
+
+@app.route('/predict/long', methods=['POST'])
+def predict_long():
+    """Classify a document longer than /predict allows, chunk by chunk"""
+    try:
+        data = parse_payload()
+        if not data:
+            ERROR_TYPES.labels(error_type='no_json_data', endpoint='predict_long').inc()
+            return jsonify({'error': 'No JSON data provided'}), 400
         
-        # Save to database (if available)
-        conn = get_db()
-        if conn:
-            db_start = time.time()
-            try:
-                with conn.cursor() as cur:
-                    cur.execute("""
-                        INSERT INTO predictions (text, category, confidence, created_at)
-                        VALUES (%s, %s, %s, %s)
-                        RETURNING id
-                    """, (text, prediction, confidence, datetime.utcnow()))
-                    
-                    row = cur.fetchone()
-                    result['firestore_id'] = str(row['id'])  # Keep same field name for compatibility
-                    conn.commit()
-                    
-                    db_latency = time.time() - db_start
-                    DB_QUERY_LATENCY.labels(operation='save').observe(db_latency)
-                    DB_OPERATIONS.labels(operation='save', status='success').inc()
-                    logger.info(f"✅ Saved prediction {row['id']}")
-            except Exception as e:
-                db_latency = time.time() - db_start
-                DB_QUERY_LATENCY.labels(operation='save').observe(db_latency)
-                DB_OPERATIONS.labels(operation='save', status='failure').inc()
-                DB_ERRORS.labels(operation='save', error_type=type(e).__name__).inc()
-                logger.error(f"Database save error: {e}")
-                result['warning'] = 'Prediction succeeded but database save failed'
-            finally:
-                conn.close()
-        
-        logger.info(f"Prediction: {prediction} ({confidence:.2%})")
-        return jsonify(result), 200
+        text = data.get('text') or data.get('feedback', '')
+        text = text.strip() if isinstance(text, str) else ''
+        if len(text) < 3:
+            ERROR_TYPES.labels(error_type='text_too_short', endpoint='predict_long').inc()
+            return jsonify({'error': 'Text must be at least 3 characters long'}), 400
+        if len(text) > MAX_LONG_TEXT_LENGTH:
+            ERROR_TYPES.labels(error_type='text_too_long', endpoint='predict_long').inc()
+            return jsonify({'error': f'Text must be less than {MAX_LONG_TEXT_LENGTH} characters'}), 400
+        
+        try:
+            chunk_chars = int(data.get('chunk_chars', LONG_TEXT_CHUNK_CHARS))
+        except (TypeError, ValueError):
+            chunk_chars = 0
+        if not 200 <= chunk_chars <= MAX_TEXT_LENGTH:
+            ERROR_TYPES.labels(error_type='invalid_chunk_chars', endpoint='predict_long').inc()
+            return jsonify({'error': f'chunk_chars must be between 200 and {MAX_TEXT_LENGTH}'}), 400
+        
+        junk = check_junk(text, 'predict_long')
+        if junk:
+            return jsonify({'success': False, 'error': junk[1], 'error_type': junk[0]}), 422
+        
+        TEXT_LENGTH.observe(len(text))
+        
+        idempotency_key = request.headers.get('Idempotency-Key')
+        if idempotency_key is not None:
+            idempotency_key, answered = claim_request_key('predict_long', idempotency_key, text)
+            if answered:
+                return prediction_response(*answered)
+        try:
+            pending = prepare_long_prediction(text, chunk_chars, idempotency_key)
+        except Exception:
+            if idempotency_key is not None:
+                IDEMPOTENCY.release(idempotency_key)
+            raise
+        
+        saved = save_predictions(pending['rows'], operation='save', keys=pending['keys'])
+        return prediction_response(*finish_predict(pending, saved))
         
     except Exception as e:
-        ERROR_TYPES.labels(error_type=type(e).__name__, endpoint='predict').inc()
-        logger.error(f"Prediction error: {e}", exc_info=True)
+        ERROR_TYPES.labels(error_type=type(e).__name__, endpoint='predict_long').inc()
+        logger.error(f"Long prediction error: {e}", exc_info=True)
         return jsonify({
             'success': False,
             'error': 'Internal server error',
             'details': str(e)
         }), 500
 
+def prepare_long_prediction(text, chunk_chars, idempotency_key=None):
+    """Classify a long text in chunks; returns a pending prediction like prepare_prediction()
+
+    The stored row, the drift counts and the similarity index entry use the
+    document's first chunk of at most MAX_TEXT_LENGTH characters, not the
+    whole document.
+    """
+    inference_start = time.time()
+    proba, n_chunks, chunk_votes = classify_long_text(text, VECTORIZER, MODEL, chunk_chars)
+    prediction = MODEL.classes_[proba.argmax()]
+    inference_time = time.time() - inference_start
+    MODEL_INFERENCE_TIME.labels(category=prediction).observe(inference_time)
+    
+    excerpt = next(iter_chunks(text, MAX_TEXT_LENGTH))
+    with span('drift'):
+        observe_drift(excerpt, 'predict_long')
+    excerpt_vec = VECTORIZER.transform([excerpt])
+    
+    confidence = float(proba.max())
+    result = build_prediction_result(text, prediction, proba)
+    result['processing_time_ms'] = round(inference_time * 1000, 2)
+    result['chunks'] = {
+        'count': n_chunks,
+        'chunk_chars': chunk_chars,
+        'votes': chunk_votes
+    }
+    logger.info("Long prediction: %s (%.2f%%, %d chunks)", prediction, confidence * 100, n_chunks,
+                extra={'sample': True})
+    return {
+        'endpoint': 'predict_long',
+        'rows': [(excerpt, prediction, confidence)],
+        'keys': [idempotency_key] if idempotency_key else None,
+        'idempotency_key': idempotency_key,
+        'terms': (excerpt_vec.indices, excerpt_vec.data),
+        'result': result
+    }
+
+def _parse_top_k(data):
+    """Read and clamp the top_k request field"""
+    try:
+        top_k = int(data.get('top_k', 5))
+    except (TypeError, ValueError):
+        return None
+    return max(1, min(top_k, MAX_TOP_K))
+
+def _explain_texts(texts, top_k):
+    """Classify texts and attach the top contributing terms per class"""
+    text_vecs = VECTORIZER.transform(texts)
+    proba = MODEL.predict_proba(text_vecs)
+    explanations = EXPLAINER.explain(text_vecs, top_k)
+    results = []
+    for text, row_proba, explanation in zip(texts, proba, explanations):
+        best = int(row_proba.argmax())
+        results.append({
+            'prediction': EXPLAINER.classes[best],
+            'confidence': round(float(row_proba[best]) * 100, 2),
+            'feedback': text[:100] + '...' if len(text) > 100 else text,
+            'top_terms': explanation
+        })
+    return results
+
+@app.route('/explain', methods=['POST'])
+def explain():
+    """Explain a prediction with the terms contributing most to each class (JSON or MessagePack)"""
+    try:
+        data = parse_payload()
+        if not data:
+            ERROR_TYPES.labels(error_type='no_json_data', endpoint='explain').inc()
+            return jsonify({'error': 'No JSON data provided'}), 400
+        
+        text = (data.get('text') or data.get('feedback', '')).strip()
+        error = validate_text(text)
+        if error:
+            ERROR_TYPES.labels(error_type=error[0], endpoint='explain').inc()
+            return jsonify({'error': error[1]}), 400
+        
+        top_k = _parse_top_k(data)
+        if top_k is None:
+            ERROR_TYPES.labels(error_type='invalid_top_k', endpoint='explain').inc()
+            return jsonify({'error': 'top_k must be an integer'}), 400
+        
+        result = _explain_texts([text], top_k)[0]
+        return make_payload_response(app, {'success': True, 'top_k': top_k, **result})
+        
+    except Exception as e:
+        ERROR_TYPES.labels(error_type=type(e).__name__, endpoint='explain').inc()
+        logger.error(f"Explain error: {e}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error',
+            'details': str(e)
+        }), 500
+
+@app.route('/explain/batch', methods=['POST'])
+def explain_batch():
+    """Explain up to MAX_BATCH_SIZE texts in one vectorized pass (JSON or MessagePack)"""
+    try:
+        data = parse_payload()
+        if not data:
+            ERROR_TYPES.labels(error_type='no_json_data', endpoint='explain_batch').inc()
+            return jsonify({'error': 'No JSON data provided'}), 400
+        
+        texts = data.get('texts')
+        if not isinstance(texts, list) or not texts:
+            ERROR_TYPES.labels(error_type='empty_batch', endpoint='explain_batch').inc()
+            return jsonify({'error': 'texts must be a non-empty list'}), 400
+        
+        if len(texts) > MAX_BATCH_SIZE:
+            ERROR_TYPES.labels(error_type='batch_too_large', endpoint='explain_batch').inc()
+            return jsonify({'error': f'At most {MAX_BATCH_SIZE} texts per batch'}), 400
+        
+        texts = [str(t).strip() for t in texts]
+        for index, text in enumerate(texts):
+            error = validate_text(text)
+            if error:
+                ERROR_TYPES.labels(error_type=error[0], endpoint='explain_batch').inc()
+                return jsonify({'error': f'Item {index}: {error[1]}'}), 400
+        
+        top_k = _parse_top_k(data)
+        if top_k is None:
+            ERROR_TYPES.labels(error_type='invalid_top_k', endpoint='explain_batch').inc()
+            return jsonify({'error': 'top_k must be an integer'}), 400
+        
+        return make_payload_response(app, {
+            'success': True,
+            'top_k': top_k,
+            'results': _explain_texts(texts, top_k)
+        })
+        
+    except Exception as e:
+        ERROR_TYPES.labels(error_type=type(e).__name__, endpoint='explain_batch').inc()
+        logger.error(f"Explain batch error: {e}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error',
+            'details': str(e)
+        }), 500
+
+def fetch_prediction_rows(after_id, limit):
+    """Stored predictions with id > after_id, oldest first, as (id, text, category)"""
+    if STORAGE is None:
+        return []
+    db_start = time.time()
+    try:
+        rows = STORAGE.fetch_rows(after_id, limit)
+        DB_QUERY_LATENCY.labels(operation='similar_sync').observe(time.time() - db_start)
+        DB_OPERATIONS.labels(operation='similar_sync', status='success').inc()
+        return rows
+    except Exception as e:
+        DB_OPERATIONS.labels(operation='similar_sync', status='failure').inc()
+        DB_ERRORS.labels(operation='similar_sync', error_type=type(e).__name__).inc()
+        logger.error(f"Similarity sync error: {e}")
+        return []
+
+def fetch_prediction_texts(ids):
+    """Map stored prediction ids to their text"""
+    if STORAGE is None or not ids:
+        return {}
+    try:
+        return STORAGE.fetch_texts(ids)
+    except Exception as e:
+        DB_ERRORS.labels(operation='similar_texts', error_type=type(e).__name__).inc()
+        logger.error(f"Similarity text lookup error: {e}")
+        return {}
+
+@app.route('/similar', methods=['POST'])
+def similar():
+    """Find stored feedback most similar to the given text (JSON or MessagePack)"""
+    try:
+        data = parse_payload()
+        if not data:
+            ERROR_TYPES.labels(error_type='no_json_data', endpoint='similar').inc()
+            return jsonify({'error': 'No JSON data provided'}), 400
+        
+        text = (data.get('text') or data.get('feedback', '')).strip()
+        error = validate_text(text)
+        if error:
+            ERROR_TYPES.labels(error_type=error[0], endpoint='similar').inc()
+            return jsonify({'error': error[1]}), 400
+        
+        top_k = _parse_top_k(data)
+        if top_k is None:
+            ERROR_TYPES.labels(error_type='invalid_top_k', endpoint='similar').inc()
+            return jsonify({'error': 'top_k must be an integer'}), 400
+        category = data.get('category') or None
+        
+        # Read-only: rows saved by other workers are indexed by SIMILARITY_SYNC
+        query_start = time.time()
+        matches = SIMILARITY_INDEX.query(VECTORIZER.transform([text]), top_k, category)
+        SIMILARITY_QUERY_LATENCY.observe(time.time() - query_start)
+        
+        texts = fetch_prediction_texts([match[0] for match in matches])
+        return make_payload_response(app, {
+            'success': True,
+            'query': text[:100] + '...' if len(text) > 100 else text,
+            'category': category,
+            'indexed_documents': len(SIMILARITY_INDEX),
+            'results': [
+                {
+                    'id': str(row_id),
+                    'category': row_category,
+                    'similarity': round(score, 4),
+                    'text': texts.get(row_id)
+                }
+                for row_id, row_category, score in matches
+            ]
+        })
+        
+    except Exception as e:
+        ERROR_TYPES.labels(error_type=type(e).__name__, endpoint='similar').inc()
+        logger.error(f"Similar search error: {e}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error',
+            'details': str(e)
+        }), 500
+
+def stats_body():
+    """The /stats core: (body, status)
+
+    app_async.py fetches the summary with its async storage and builds the
+    same bodies with stats_unavailable(), stats_summary() and stats_error().
+    """
+    if STORAGE is None:
+        return stats_unavailable()
+    db_start = time.time()
+    try:
+        summary = STORAGE.stats()
+    except Exception as e:
+        return stats_error(e, db_start)
+    return stats_summary(summary, db_start)
+
+def stats_unavailable():
+    """/stats body without storage"""
+    ERROR_TYPES.labels(error_type='db_unavailable', endpoint='stats').inc()
+    return {'error': 'Database not available'}, 503
+
+def stats_summary(summary, db_start):
+    """/stats body of a storage stats() result fetched since db_start"""
+    record_db_operation('stats', db_start)
+    total, categories = summary
+    return {
+        'total_predictions': total,
+        'categories': [
+            {
+                'name': category,
+                'count': count,
+                'avg_confidence': round(float(avg_conf), 2)
+            }
+            for category, count, avg_conf in categories
+        ],
+        'near_duplicates': NEAR_DUPLICATES.cluster_summary(),
+        'storage': STORAGE.name,
+        'timestamp': datetime.utcnow().isoformat()
+    }, 200
+
+def stats_error(e, db_start):
+    """/stats body of a storage stats() call that raised"""
+    record_db_operation('stats', db_start, e)
+    ERROR_TYPES.labels(error_type=type(e).__name__, endpoint='stats').inc()
+    logger.error(f"Stats error: {e}")
+    return {'error': str(e)}, 500
+
 @app.route('/stats', methods=['GET'])
 def stats():
     """Get prediction statistics"""
-    conn = get_db()
-    if not conn:
-        ERROR_TYPES.labels(error_type='db_unavailable', endpoint='stats').inc()
-        return jsonify({'error': 'Database not available'}), 503
+    body, status = stats_body()
+    return jsonify(body), status
+
+@app.route('/stats/stream', methods=['GET'])
+def stats_stream():
+    """Server-Sent Events stream of live prediction statistics"""
+    subscription = STATS_BROADCASTER.subscribe()
+    if subscription is None:
+        ERROR_TYPES.labels(error_type='too_many_subscribers', endpoint='stats_stream').inc()
+        return jsonify({'error': 'Too many live statistics subscribers, poll /stats instead'}), 503
+    
+    return Response(
+        STATS_BROADCASTER.stream(subscription),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/stats/clusters', methods=['GET'])
+def topic_clusters():
+    """Sub-topic clusters per category from the background clustering job"""
+    snapshot = read_snapshot(TOPIC_CLUSTERS_PATH)
+    if snapshot is None:
+        ERROR_TYPES.labels(error_type='clusters_unavailable', endpoint='topic_clusters').inc()
+        return jsonify({'error': 'Topic clusters have not been computed yet'}), 503
+    
+    category = request.args.get('category')
+    categories = snapshot['categories']
+    if category:
+        categories = {category: categories.get(category, [])}
+    
+    return jsonify({
+        'n_clusters': snapshot['n_clusters'],
+        'rows_processed_through_id': snapshot['last_id'],
+        'updated_at': datetime.utcfromtimestamp(snapshot['updated_at']).isoformat(),
+        'categories': categories,
+        'timestamp': datetime.utcnow().isoformat()
+    }), 200
+
+@app.route('/models', methods=['GET'])
+def list_models():
+    """Named models on disk and the ones loaded in this worker's cache"""
+    if MODEL_REGISTRY is None:
+        ERROR_TYPES.labels(error_type='named_models_disabled', endpoint='list_models').inc()
+        return jsonify({'error': 'Named models are not enabled (set MODELS_DIR)'}), 400
+    
+    result = MODEL_REGISTRY.snapshot()
+    result['available'] = MODEL_REGISTRY.available()
+    result['pid'] = os.getpid()
+    result['timestamp'] = datetime.utcnow().isoformat()
+    return jsonify(result), 200
+
+@app.route('/stats/drift', methods=['GET'])
+def vocabulary_drift():
+    """Out-of-vocabulary rate, empty vectors and the most frequent unseen tokens"""
+    if DRIFT is None:
+        ERROR_TYPES.labels(error_type='drift_disabled', endpoint='vocabulary_drift').inc()
+        return jsonify({'error': 'Drift monitoring is disabled (DRIFT_MONITORING=0)'}), 503
     
-    db_start = time.time()
     try:
-        with conn.cursor() as cur:
-            # Total predictions
-            cur.execute("SELECT COUNT(*) as total FROM predictions")
-            total = cur.fetchone()['total']
-            
-            # Category breakdown
-            cur.execute("""
-                SELECT category, COUNT(*) as count, AVG(confidence) as avg_conf
-                FROM predictions
-                GROUP BY category
-                ORDER BY count DESC
-            """)
-            categories = cur.fetchall()
-            
-            db_latency = time.time() - db_start
-            DB_QUERY_LATENCY.labels(operation='stats').observe(db_latency)
-            DB_OPERATIONS.labels(operation='stats', status='success').inc()
-            
-            return jsonify({
-                'total_predictions': total,
-                'categories': [
-                    {
-                        'name': row['category'],
-                        'count': row['count'],
-                        'avg_confidence': round(float(row['avg_conf']), 2)
-                    }
-                    for row in categories
-                ],
-                'timestamp': datetime.utcnow().isoformat()
-            }), 200
-            
-    except Exception as e:
-        db_latency = time.time() - db_start
-        DB_QUERY_LATENCY.labels(operation='stats').observe(db_latency)
-        DB_OPERATIONS.labels(operation='stats', status='failure').inc()
-        DB_ERRORS.labels(operation='stats', error_type=type(e).__name__).inc()
-        ERROR_TYPES.labels(error_type=type(e).__name__, endpoint='stats').inc()
-        logger.error(f"Stats error: {e}")
-        return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
-
-# Initialize database table on first run
+        limit = int(request.args.get('limit', DRIFT.top_k))
+    except ValueError:
+        ERROR_TYPES.labels(error_type='invalid_limit', endpoint='vocabulary_drift').inc()
+        return jsonify({'error': 'limit must be an integer'}), 400
+    
+    result = DRIFT.snapshot(limit=max(0, min(limit, DRIFT.top_k)))
+    result['vocabulary_size'] = len(VECTORIZER.vocabulary_)
+    result['pid'] = os.getpid()
+    result['timestamp'] = datetime.utcnow().isoformat()
+    return jsonify(result), 200
+
+@app.route('/stats/shadow', methods=['GET'])
+def shadow_stats():
+    """Agreement of the shadow (candidate) model with the primary on sampled traffic"""
+    if SHADOW is None:
+        ERROR_TYPES.labels(error_type='shadow_disabled', endpoint='shadow_stats').inc()
+        return jsonify({'error': 'No shadow model configured (set SHADOW_MODEL_PATH)'}), 503
+    
+    result = SHADOW.snapshot()
+    result['shadow_model'] = SHADOW_MODEL_PATH
+    result['pid'] = os.getpid()
+    result['timestamp'] = datetime.utcnow().isoformat()
+    return jsonify(result), 200
+
+@app.route('/traces', methods=['GET'])
+def list_traces():
+    """Slowest recent traces kept by this worker (?limit=, ?endpoint=; admin only)"""
+    denied = require_admin('list_traces')
+    if denied:
+        return denied
+    if TRACER is None:
+        ERROR_TYPES.labels(error_type='tracing_disabled', endpoint='list_traces').inc()
+        return jsonify({'error': 'Tracing is disabled (TRACING=0)'}), 503
+    
+    try:
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        ERROR_TYPES.labels(error_type='invalid_limit', endpoint='list_traces').inc()
+        return jsonify({'error': 'limit must be an integer'}), 400
+    
+    store = TRACER.store
+    traces = store.slowest(max(1, min(limit, store.max_traces)), request.args.get('endpoint'))
+    return jsonify({
+        'kept': len(store),
+        'max_traces': store.max_traces,
+        'window_seconds': store.window,
+        'finished': TRACER.finished,
+        'traces': [trace.to_dict() for trace in traces],
+        'pid': os.getpid(),
+        'timestamp': datetime.utcnow().isoformat()
+    }), 200
+
+@app.route('/traces/<trace_id>', methods=['GET'])
+def get_trace(trace_id):
+    """One kept trace by id (e.g. from an exemplar or an X-Trace-Id header; admin only)"""
+    denied = require_admin('get_trace')
+    if denied:
+        return denied
+    if TRACER is None:
+        ERROR_TYPES.labels(error_type='tracing_disabled', endpoint='get_trace').inc()
+        return jsonify({'error': 'Tracing is disabled (TRACING=0)'}), 503
+    
+    trace = TRACER.store.get(trace_id.lower())
+    if trace is None:
+        # Each worker keeps its own traces; another worker may hold this one
+        return jsonify({
+            'error': 'Trace not kept by this worker (expired, not among the slowest, or held by another worker)',
+            'pid': os.getpid()
+        }), 404
+    return jsonify(dict(trace.to_dict(), pid=os.getpid())), 200
+
+def memory_inventory():
+    """Sizes of the in-process structures that grow with traffic"""
+    return {
+        'confidence_tracker': {category: len(values) for category, values in confidence_tracker.items()},
+        'near_duplicates': len(NEAR_DUPLICATES),
+        'idempotency_keys': len(IDEMPOTENCY),
+        'similarity_index_documents': len(SIMILARITY_INDEX) if SIMILARITY_INDEX is not None else 0,
+        'traces_kept': len(TRACER.store) if TRACER is not None else 0,
+        'named_model_cache_bytes': MODEL_REGISTRY.cached_bytes if MODEL_REGISTRY is not None else 0,
+        'prometheus': metric_series(REGISTRY)
+    }
+
+@app.route('/debug/memory', methods=['GET'])
+def memory_report():
+    """Allocation sites that grew since this worker's baseline (?top=, ?group_by=lineno|filename|traceback; admin only)"""
+    denied = require_admin('memory_report')
+    if denied:
+        return denied
+    if MEMORY_TRACKER is None:
+        ERROR_TYPES.labels(error_type='memory_tracking_disabled', endpoint='memory_report').inc()
+        return jsonify({'error': 'Memory tracking is disabled (set MEMORY_TRACKING=1)'}), 503
+    
+    try:
+        top = max(1, min(int(request.args.get('top', 20)), 200))
+        result = MEMORY_TRACKER.diff(top=top, group_by=request.args.get('group_by', 'lineno'))
+    except ValueError as e:
+        ERROR_TYPES.labels(error_type='invalid_parameter', endpoint='memory_report').inc()
+        return jsonify({'error': str(e)}), 400
+    
+    result['rss_bytes'] = _get_process().memory_info().rss
+    result['inventory'] = memory_inventory()
+    result['timestamp'] = datetime.utcnow().isoformat()
+    return jsonify(result), 200
+
+@app.route('/debug/memory/baseline', methods=['POST'])
+def memory_baseline():
+    """Take a new baseline snapshot in this worker (admin only)"""
+    denied = require_admin('memory_baseline')
+    if denied:
+        return denied
+    if MEMORY_TRACKER is None:
+        ERROR_TYPES.labels(error_type='memory_tracking_disabled', endpoint='memory_baseline').inc()
+        return jsonify({'error': 'Memory tracking is disabled (set MEMORY_TRACKING=1)'}), 503
+    
+    return jsonify({
+        'baseline_at': MEMORY_TRACKER.reset_baseline(),
+        'rss_bytes': _get_process().memory_info().rss,
+        'inventory': memory_inventory(),
+        'pid': os.getpid()
+    }), 200
+
+EXPORT_FETCH_SIZE = int(os.environ.get('EXPORT_FETCH_SIZE', 5000))
+MAX_EXPORT_FETCH_SIZE = 50000
+
+@app.route('/export', methods=['GET'])
+def export():
+    """Stream prediction history as CSV or NDJSON, constant memory per request (admin only)"""
+    denied = require_admin('export')
+    if denied:
+        return denied
+    
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        ERROR_TYPES.labels(error_type='invalid_format', endpoint='export').inc()
+        return jsonify({'error': f"format must be one of: {', '.join(sorted(EXPORT_FORMATS))}"}), 400
+    try:
+        start = parse_timestamp(request.args.get('start'))
+        end = parse_timestamp(request.args.get('end'))
+        fetch_size = int(request.args.get('fetch_size', EXPORT_FETCH_SIZE))
+    except ValueError as e:
+        ERROR_TYPES.labels(error_type='invalid_parameter', endpoint='export').inc()
+        return jsonify({'error': f'Invalid parameter: {e}'}), 400
+    fetch_size = min(max(fetch_size, 1), MAX_EXPORT_FETCH_SIZE)
+    category = request.args.get('category')
+    
+    if STORAGE is None:
+        ERROR_TYPES.labels(error_type='db_unavailable', endpoint='export').inc()
+        return jsonify({'error': 'Database not available'}), 503
+    
+    def generate():
+        db_start = time.time()
+        batches = STORAGE.export_batches(start, end, category, fetch_size)
+        try:
+            yield from export_chunks(batches, fmt)
+            DB_OPERATIONS.labels(operation='export', status='success').inc()
+        except GeneratorExit:
+            raise  # client went away mid-download
+        except Exception as e:
+            DB_OPERATIONS.labels(operation='export', status='failure').inc()
+            DB_ERRORS.labels(operation='export', error_type=type(e).__name__).inc()
+            logger.error(f"Export error: {e}")
+        finally:
+            DB_QUERY_LATENCY.labels(operation='export').observe(time.time() - db_start)
+            batches.close()
+    
+    timestamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+    return Response(
+        generate(),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={
+            'Content-Disposition': f'attachment; filename=predictions-{timestamp}.{fmt}',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+# Schema migrations run once at startup (in the gunicorn master with --preload),
+# never from a request; see migrations.py
+AUTO_MIGRATE = os.environ.get('AUTO_MIGRATE', '1').lower() not in ('0', 'false', 'no')
+
 def init_db():
-    """Create predictions table if it doesn't exist"""
-    if not hasattr(app, 'db_initialized'):
-        conn = get_db()
-        if conn:
-            try:
-                with conn.cursor() as cur:
-                    cur.execute("""
-                        CREATE TABLE IF NOT EXISTS predictions (
-                            id SERIAL PRIMARY KEY,
-                            text TEXT NOT NULL,
-                            category VARCHAR(50) NOT NULL,
-                            confidence FLOAT NOT NULL,
-                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                        )
-                    """)
-                    conn.commit()
-                    logger.info("✅ Database table ready")
-                    app.db_initialized = True
-            except Exception as e:
-                logger.error(f"Table creation error: {e}")
-            finally:
-                conn.close()
+    """Create or migrate the prediction storage schema"""
+    if not hasattr(app, 'db_initialized') and STORAGE is not None:
+        try:
+            applied = STORAGE.init()
+            logger.info(f"✅ {STORAGE.name} storage ready (applied migrations: {applied or 'none pending'})")
+            app.db_initialized = True
+        except Exception as e:
+            logger.error(f"Database migration error: {e}")
 
 # Call init_db once on startup
-with app.app_context():
-    init_db()
+if AUTO_MIGRATE:
+    with app.app_context():
+        init_db()
+
+def warm_model(texts):
+    """Exercise the single, batch, explain and similarity paths without touching metrics or caches"""
+    for text in texts[:8]:
+        NEAR_DUPLICATES.signature(text)
+        text_vec = VECTORIZER.transform([text])
+        MODEL.predict(text_vec)
+        MODEL.predict_proba(text_vec)
+    text_vecs = VECTORIZER.transform(texts)
+    MODEL.predict_proba(text_vecs)
+    EXPLAINER.explain(text_vecs[:8])
+    if SIMILARITY_INDEX is not None:
+        SIMILARITY_INDEX.query(text_vecs[0], top_k=5)
+
+def warm_storage(texts):
+    if STORAGE is not None:
+        STORAGE.warm()
+
+def warm_up(steps):
+    """Warm this process up, waiting at most WARMUP_TIMEOUT"""
+    if not WARMUP.start(steps):
+        return
+    if not WARMUP.wait():
+        WARMUP_TIMEOUTS.inc()
+        return
+    report = WARMUP.snapshot()
+    timings = ', '.join(f"{name} {step['seconds'] * 1000:.0f} ms" for name, step in report['steps'].items())
+    logger.info(f"✅ Warmup of {report['texts']} texts finished in {report['seconds'] * 1000:.0f} ms ({timings})")
+
+WORKER_WARMUP_STEPS = [('model', warm_model), ('storage', warm_storage)]
+
+def warm_up_worker():
+    """Called by gunicorn's post_worker_init hook (gunicorn.conf.py) before a worker accepts connections"""
+    if WARMUP_ENABLED:
+        warm_up(WORKER_WARMUP_STEPS)
+
+# Under gunicorn --preload the master warms the shared model pages and lazy
+# imports once; each worker then repeats the (cheap) model step to take its
+# copy-on-write faults and opens its own storage connection, from the
+# post_worker_init hook in gunicorn.conf.py. Storage is not warmed in the
+# master: connections must not cross a fork. Elsewhere the process warms up
+# on import, and /ready reports 503 until it has.
+if WARMUP_ENABLED:
+    warm_up([('model', warm_model)])
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
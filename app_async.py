@@ -0,0 +1,175 @@
+"""
+ASGI serving variant of the Text Categorization API
+
+Serves the same /predict, /stats, /health and /metrics routes (and response
+bodies) as app.py. It does not reimplement them: /predict calls the halves
+of the request core app.py's own route uses (`begin_predict`,
+`finish_predict`) and /stats builds its bodies with app.py's helpers, so
+validation, the junk filter, named models, Idempotency-Key replays and the
+stored rows behave identically. MessagePack bodies and Accept negotiation
+work as in app.py.
+
+The difference is the concurrency model: requests run on an event loop and
+only CPU-bound work (validation and inference) runs in a bounded thread
+pool. Storage is awaited on the loop through the async twin of the
+configured backend (asyncpg for PostgreSQL, aiosqlite for the SQLite
+fallback, see storage.create_async_storage), so a request waiting on the
+database holds neither an inference thread nor a worker. A slow client
+only parks a coroutine, and beyond INFERENCE_QUEUE_LIMIT requests in
+inference new ones get a 503 instead of queueing without bound.
+
+Run with:
+    uvicorn app_async:app --host 0.0.0.0 --port 5000 --workers 2
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from quart import Quart, Response, request, jsonify
+from quart_cors import cors
+
+import app as core
+from json_provider import decode_payload, pack_msgpack, prefers_msgpack
+from storage import create_async_storage
+
+logger = logging.getLogger('app_async')
+
+app = cors(Quart(__name__), allow_origin='*')
+
+# Requests run in at most INFERENCE_THREADS threads; beyond
+# INFERENCE_QUEUE_LIMIT in-flight requests new ones get a 503 instead of
+# queueing without bound
+INFERENCE_THREADS = int(os.environ.get('INFERENCE_THREADS', os.cpu_count() or 2))
+INFERENCE_QUEUE_LIMIT = int(os.environ.get('INFERENCE_QUEUE_LIMIT', 64))
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))  # asyncpg connections per process
+
+_executor = ThreadPoolExecutor(max_workers=INFERENCE_THREADS, thread_name_prefix='inference')
+_inference_slots = None
+STORAGE = None  # async twin of core.STORAGE, opened on the serving loop
+
+
+@app.before_serving
+async def startup():
+    """Create the inference semaphore and async storage on the serving loop, start the background jobs"""
+    global _inference_slots, STORAGE
+    _inference_slots = asyncio.Semaphore(INFERENCE_QUEUE_LIMIT)
+    STORAGE = create_async_storage(core.STORAGE, pool_size=DB_POOL_SIZE)
+    if STORAGE is not None:
+        await STORAGE.open()
+    core.start_background_jobs()
+
+
+@app.after_serving
+async def shutdown():
+    _executor.shutdown(wait=False)
+    if STORAGE is not None:
+        await STORAGE.close()
+
+
+@app.before_request
+async def before_request():
+    request.start_time = time.time()
+    core.ACTIVE_REQUESTS.inc()
+
+
+@app.after_request
+async def after_request(response):
+    request_latency = time.time() - request.start_time
+    endpoint = request.endpoint or 'unknown'
+    core.REQUEST_COUNT.labels(method=request.method, endpoint=endpoint, status=response.status_code).inc()
+    core.REQUEST_LATENCY.labels(method=request.method, endpoint=endpoint).observe(request_latency)
+    core.ACTIVE_REQUESTS.dec()
+    return response
+
+
+async def run_inference(fn, *args):
+    """Run CPU-bound work in the bounded executor, or return None if saturated"""
+    if _inference_slots.locked():
+        return None
+    async with _inference_slots:
+        return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+
+
+async def save_predictions(rows, operation='save', keys=None):
+    """core.save_predictions() awaited on the async storage; [(id, created), ...] or None"""
+    if STORAGE is None:
+        return None
+    db_start = time.time()
+    try:
+        ids = await STORAGE.save(rows, keys)
+    except Exception as e:
+        core.record_db_operation(operation, db_start, e)
+        logger.error(f"Database save error: {e}")
+        return None
+    core.record_db_operation(operation, db_start)
+    return ids
+
+
+@app.route('/metrics')
+async def metrics():
+    """Prometheus metrics endpoint"""
+    core.update_resource_metrics()
+    return generate_latest(), 200, {'Content-Type': CONTENT_TYPE_LATEST}
+
+
+@app.route('/health')
+async def health():
+    """Health check endpoint"""
+    return jsonify({
+        'status': 'healthy',
+        'service': 'Text Categorization API',
+        'version': '1.0.0',
+        'model_loaded': core.MODEL is not None
+    }), 200
+
+
+def payload_response(body, status, headers=None):
+    """Serialize like app.py: predictions follow the Accept header, errors are JSON"""
+    if status == 200 and prefers_msgpack(request.accept_mimetypes):
+        return Response(pack_msgpack(body), status, headers, mimetype='application/msgpack')
+    response = jsonify(body)
+    response.status_code = status
+    response.headers.update(headers or {})
+    return response
+
+
+@app.route('/predict', methods=['POST'])
+async def predict():
+    """Main prediction endpoint (JSON or MessagePack)"""
+    data = decode_payload(request.mimetype, await request.get_data(), json.loads)
+    begun = await run_inference(core.begin_predict, data, request.headers.get('Idempotency-Key'))
+    if begun is None:
+        core.ERROR_TYPES.labels(error_type='inference_saturated', endpoint='predict').inc()
+        return jsonify({'error': 'Server busy, retry shortly'}), 503
+    response, pending = begun
+    if pending is not None:
+        # The inference slot is free again while the save is awaited
+        saved = await save_predictions(pending['rows'], keys=pending['keys'])
+        response = core.finish_predict(pending, saved)
+    return payload_response(*response)
+
+
+@app.route('/stats', methods=['GET'])
+async def stats():
+    """Get prediction statistics"""
+    if STORAGE is None:
+        body, status = core.stats_unavailable()
+    else:
+        db_start = time.time()
+        try:
+            summary = await STORAGE.stats()
+        except Exception as e:
+            body, status = core.stats_error(e, db_start)
+        else:
+            body, status = core.stats_summary(summary, db_start)
+    return jsonify(body), status
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
@@ -6,6 +6,7 @@ from datetime import datetime
 import psycopg2
 from psycopg2.extras import RealDictCursor
 import logging
+from migrations import migrate
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -197,31 +198,20 @@ def stats():
     finally:
         conn.close()
 
-# Initialize database table on first run
-@app.before_request
+# Apply schema migrations once at startup instead of from a request hook
 def init_db():
-    """Create predictions table if it doesn't exist"""
-    if not hasattr(app, 'db_initialized'):
-        conn = get_db()
-        if conn:
-            try:
-                with conn.cursor() as cur:
-                    cur.execute("""
-                        CREATE TABLE IF NOT EXISTS predictions (
-                            id SERIAL PRIMARY KEY,
-                            text TEXT NOT NULL,
-                            category VARCHAR(50) NOT NULL,
-                            confidence FLOAT NOT NULL,
-                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                        )
-                    """)
-                    conn.commit()
-                    logger.info("✅ Database table ready")
-                    app.db_initialized = True
-            except Exception as e:
-                logger.error(f"Table creation error: {e}")
-            finally:
-                conn.close()
+    """Apply pending schema migrations (see migrations.py)"""
+    conn = get_db()
+    if conn:
+        try:
+            migrate(conn)
+            logger.info("✅ Database schema ready")
+        except Exception as e:
+            logger.error(f"Database migration error: {e}")
+        finally:
+            conn.close()
+
+init_db()
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
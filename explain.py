@@ -0,0 +1,64 @@
+"""
+Term-level explanations for the Naive Bayes text classifier
+
+For MultinomialNB the class score is log P(c) + sum_j x_j * log P(term_j | c),
+so every term present in the input contributes x_j * log P(term_j | c) to class c.
+Raw log-probabilities are negative for every class, so weights are centered
+on the per-term mean across classes: a positive weight means the term pushes
+the document towards that class relative to the others.
+
+Only the non-zero entries of the sparse TF-IDF row are touched; the full
+vocabulary is never densified.
+"""
+
+import numpy as np
+
+
+class TermExplainer:
+    """Precomputed lookup tables for explaining predictions of one model"""
+
+    def __init__(self, model, vectorizer):
+        self.classes = [str(c) for c in model.classes_]
+
+        # Inverse vocabulary: column index -> term, built once at load
+        vocabulary = vectorizer.vocabulary_
+        self.terms = np.empty(len(vocabulary), dtype=object)
+        for term, index in vocabulary.items():
+            self.terms[index] = term
+
+        # Transposed so a row slice by term index is contiguous: (n_features, n_classes)
+        log_prob = model.feature_log_prob_
+        self.centered_log_prob = np.ascontiguousarray(
+            (log_prob - log_prob.mean(axis=0, keepdims=True)).T
+        )
+
+    def _top_terms(self, indices, contributions, top_k):
+        """Top-k terms per class from an (nnz, n_classes) contribution slab"""
+        if len(indices) == 0:
+            return {category: [] for category in self.classes}
+
+        k = min(top_k, len(indices))
+        if k < len(indices):
+            candidates = np.argpartition(-contributions, k - 1, axis=0)[:k]
+            order = np.take_along_axis(contributions, candidates, axis=0)
+            top = np.take_along_axis(candidates, np.argsort(-order, axis=0, kind='stable'), axis=0)
+        else:
+            top = np.argsort(-contributions, axis=0, kind='stable')
+
+        terms = self.terms[indices[top]].T.tolist()
+        weights = np.round(np.take_along_axis(contributions, top, axis=0), 4).T.tolist()
+        return {
+            category: [{'term': t, 'weight': w} for t, w in zip(terms[c], weights[c])]
+            for c, category in enumerate(self.classes)
+        }
+
+    def explain(self, matrix, top_k=5):
+        """Explain every row of a CSR TF-IDF matrix"""
+        matrix = matrix.tocsr()
+        indptr, indices = matrix.indptr, matrix.indices
+        # One gather + multiply over all non-zeros of the batch: (nnz, n_classes)
+        contributions = self.centered_log_prob[indices] * matrix.data[:, None]
+        return [
+            self._top_terms(indices[start:end], contributions[start:end], top_k)
+            for start, end in zip(indptr[:-1], indptr[1:])
+        ]
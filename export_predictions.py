@@ -0,0 +1,140 @@
+"""
+Streaming export of the predictions table
+
+On PostgreSQL, rows are read through a named (server-side) psycopg2
+cursor, so the server keeps the result set and the client only holds
+`fetch_size` rows at a time (the SQLite backend steps its cursor the same
+way, see storage.py). Each batch is encoded to CSV or NDJSON and handed on
+as one text chunk, which keeps memory constant no matter how many rows are
+exported.
+
+Used by the /export endpoint in app.py and as a command-line tool:
+
+    python export_predictions.py --format csv --start 2025-01-01 \\
+        --category "Bug Report" --output predictions.csv
+"""
+
+import argparse
+import csv
+import io
+import json
+import sys
+from datetime import datetime
+
+EXPORT_COLUMNS = ('id', 'text', 'category', 'confidence', 'created_at')
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+DEFAULT_FETCH_SIZE = 5000
+
+
+def parse_timestamp(value):
+    """ISO-8601 date or datetime, or None; raises ValueError on bad input"""
+    if not value:
+        return None
+    return datetime.fromisoformat(value)
+
+
+def build_query(start=None, end=None, category=None):
+    """SELECT over predictions with optional [start, end) and category filters"""
+    clauses, params = [], []
+    if start is not None:
+        clauses.append("created_at >= %s")
+        params.append(start)
+    if end is not None:
+        clauses.append("created_at < %s")
+        params.append(end)
+    if category:
+        clauses.append("category = %s")
+        params.append(category)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return f"SELECT {', '.join(EXPORT_COLUMNS)} FROM predictions{where} ORDER BY id", params
+
+
+def iter_row_batches(conn, start=None, end=None, category=None, fetch_size=DEFAULT_FETCH_SIZE):
+    """Yield lists of row tuples from a server-side cursor, fetch_size at a time"""
+    import psycopg2.extensions
+
+    query, params = build_query(start, end, category)
+    # A named cursor is declared server-side; a plain tuple cursor avoids
+    # building a dict per row on large exports
+    with conn.cursor(name='predictions_export', cursor_factory=psycopg2.extensions.cursor) as cur:
+        cur.itersize = fetch_size
+        cur.execute(query, params)
+        while True:
+            rows = cur.fetchmany(fetch_size)
+            if not rows:
+                return
+            yield rows
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+def encode_csv(batches):
+    """CSV text chunks (header first), one chunk per batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+    for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            (row_id, text, category, confidence, _isoformat(created_at))
+            for row_id, text, category, confidence, created_at in rows
+        )
+        yield buffer.getvalue()
+
+
+def encode_ndjson(batches):
+    """Newline-delimited JSON chunks, one chunk per batch"""
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    for rows in batches:
+        yield ''.join(
+            dumps({
+                'id': row_id,
+                'text': text,
+                'category': category,
+                'confidence': confidence,
+                'created_at': _isoformat(created_at)
+            }) + '\n'
+            for row_id, text, category, confidence, created_at in rows
+        )
+
+
+def export_chunks(batches, fmt='csv'):
+    """Encoded export of row batches as an iterator of text chunks"""
+    return encode_csv(batches) if fmt == 'csv' else encode_ndjson(batches)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the predictions table as CSV or NDJSON')
+    parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+    parser.add_argument('--start', type=parse_timestamp, help='include rows created at or after (ISO-8601)')
+    parser.add_argument('--end', type=parse_timestamp, help='include rows created before (ISO-8601)')
+    parser.add_argument('--category', help='only this category')
+    parser.add_argument('--fetch-size', type=int, default=DEFAULT_FETCH_SIZE, help='rows per server round trip')
+    parser.add_argument('--output', '-o', help='output file (default: stdout)')
+    args = parser.parse_args()
+
+    from storage import create_storage
+    storage = create_storage()
+    if storage is None:
+        parser.error('no storage configured (set DATABASE_URL or STORAGE_BACKEND/SQLITE_PATH)')
+
+    batches = storage.export_batches(args.start, args.end, args.category, args.fetch_size)
+    out = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    try:
+        for chunk in export_chunks(batches, args.format):
+            out.write(chunk)
+    finally:
+        batches.close()
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+"""
+gunicorn settings for app:app
+
+gunicorn reads this file from the working directory (start.sh, Procfile and
+render.yaml also pass it with -c). Command-line flags override it.
+
+Workers are threaded (gthread): an open /stats/stream holds one thread
+rather than a whole worker, and gthread workers are not killed after
+--timeout while a request thread is still busy, as sync workers are. Each
+worker caps its stream subscribers well below `threads` (see
+app.limit_stream_subscribers) so streams never starve /predict.
+"""
+
+import os
+
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+
+def post_worker_init(worker):
+    """Warm each worker up after it is fully initialized, before it accepts connections"""
+    from gunicorn.workers.gthread import ThreadWorker
+    from gunicorn.workers.sync import SyncWorker
+    from app import limit_stream_subscribers, warm_up_worker
+    if isinstance(worker, ThreadWorker):
+        limit_stream_subscribers(worker.cfg.threads)
+    elif isinstance(worker, SyncWorker):
+        limit_stream_subscribers(1)  # -k sync: a stream would hold the only thread
+    warm_up_worker()
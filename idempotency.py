@@ -0,0 +1,127 @@
+"""
+Idempotency keys for prediction requests
+
+A client that retries a request (for example after a timeout) sends the
+same `Idempotency-Key`; the API then answers with the result of the first
+attempt instead of classifying and storing the text again.
+
+IdempotencyStore keeps completed results in process memory, bounded to
+`max_entries` (least recently used evicted first) and expiring after
+`ttl` seconds. A retry that arrives while the original is still running
+waits for it rather than starting a second computation. Reusing a key for
+a different text is reported as a conflict.
+
+The store is per process, so a retry routed to another gunicorn worker
+misses it; the storage backends record the keys with the same text
+fingerprint as well (see storage.py), which still prevents a second row
+from being inserted, or a different text from reusing the key, in that case.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+MAX_KEY_LENGTH = 255
+
+
+def fingerprint(text):
+    """Short digest identifying the payload a key was first used with"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class _Entry:
+    __slots__ = ('fingerprint', 'result', 'done', 'expires_at')
+
+    def __init__(self, fingerprint, expires_at):
+        self.fingerprint = fingerprint
+        self.result = None
+        self.done = threading.Event()
+        self.expires_at = expires_at
+
+
+class IdempotencyStore:
+    """Bounded, TTL-evicted map of idempotency key -> first result"""
+
+    def __init__(self, max_entries=10000, ttl=86400, wait_timeout=30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def acquire(self, key, payload_fingerprint):
+        """
+        Claim a key for a request. Returns (status, result):
+          ('new', None)       caller computes, then complete() or release()
+          ('replay', result)  a previous request already finished
+          ('joined', result)  waited for a concurrent request with the same key
+          ('conflict', None)  key was used with a different payload
+          ('busy', None)      the original is still running after wait_timeout
+        """
+        waited = False
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._evict_expired(now)
+                entry = self._entries.get(key)
+                if entry is not None and entry.result is not None and entry.expires_at <= now:
+                    del self._entries[key]
+                    self.evictions += 1
+                    entry = None
+                if entry is None:
+                    self._entries[key] = _Entry(payload_fingerprint, now + self.ttl)
+                    self._evict_overflow()
+                    return 'new', None
+                if entry.fingerprint != payload_fingerprint:
+                    return 'conflict', None
+                if entry.result is not None:
+                    self._entries.move_to_end(key)
+                    return ('joined' if waited else 'replay'), entry.result
+                done = entry.done
+            # In flight elsewhere: wait, then look again (the owner may have
+            # released the key after a failure, in which case we claim it)
+            if not done.wait(self.wait_timeout):
+                return 'busy', None
+            waited = True
+
+    def complete(self, key, result):
+        """Store the result for a key claimed with acquire()"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.result = result
+            entry.done.set()
+
+    def release(self, key):
+        """Forget a claimed key without a result, so a retry recomputes"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.result is None:
+                del self._entries[key]
+                entry.done.set()
+
+    def _evict_expired(self, now):
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.expires_at > now or entry.result is None:
+                break
+            del self._entries[key]
+            self.evictions += 1
+
+    def _evict_overflow(self):
+        # Oldest completed entries go first; in-flight claims are never dropped
+        victims = []
+        for key, entry in self._entries.items():
+            if len(self._entries) - len(victims) <= self.max_entries:
+                break
+            if entry.result is not None:
+                victims.append(key)
+        for key in victims:
+            del self._entries[key]
+        self.evictions += len(victims)
@@ -0,0 +1,126 @@
+"""
+Fast JSON and MessagePack serialization for the Flask app
+
+OrjsonProvider plugs orjson into Flask's JSON provider interface, so
+`request.get_json()` and `jsonify()` go through it. When orjson is not
+installed (or JSON_PROVIDER=stdlib), Flask's default provider is used.
+
+For hot endpoints, `parse_payload()` and `make_payload_response()` add
+MessagePack negotiation on top: a request body sent as application/msgpack
+is decoded with msgpack, and a response is msgpack-encoded when the client
+sends `Accept: application/msgpack`. msgpack is imported on first use.
+"""
+
+import os
+
+from flask import g, request
+from flask.json.provider import DefaultJSONProvider
+
+from tracing import span
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+
+_msgpack = None
+
+
+def _get_msgpack():
+    global _msgpack
+    if _msgpack is None:
+        import msgpack
+        _msgpack = msgpack
+    return _msgpack
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson (numpy scalars/arrays supported)"""
+
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        option = self.option
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            option |= orjson.OPT_INDENT_2
+        body = orjson.dumps(obj, default=self.default, option=option | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_json(app):
+    """Install the fastest available JSON provider; returns its name"""
+    if orjson is not None and os.environ.get('JSON_PROVIDER', 'orjson') != 'stdlib':
+        app.json_provider_class = OrjsonProvider
+        app.json = OrjsonProvider(app)
+        return 'orjson'
+    return 'stdlib'
+
+
+def decode_payload(mimetype, body, loads):
+    """Framework-agnostic body decoding: MessagePack or `loads` (JSON), None if invalid"""
+    try:
+        if mimetype in MSGPACK_MIMETYPES:
+            return _get_msgpack().unpackb(body, raw=False)
+        return loads(body) if body else None
+    except Exception:
+        return None
+
+
+def parse_payload():
+    """Request body as a dict from JSON or MessagePack, or None if absent/invalid
+
+    The result is also kept in `g.payload` (e.g. for traffic capture, since
+    MessagePack bodies are read without caching).
+    """
+    with span('parse_payload'):
+        if request.mimetype in MSGPACK_MIMETYPES:
+            payload = decode_payload(request.mimetype, request.get_data(cache=False), None)
+        else:
+            payload = request.get_json(silent=True)
+    g.payload = payload
+    return payload
+
+
+def prefers_msgpack(accept_mimetypes):
+    """True if an Accept header (werkzeug MIMEAccept) prefers MessagePack"""
+    best = accept_mimetypes.best_match(('application/json',) + MSGPACK_MIMETYPES)
+    return best in MSGPACK_MIMETYPES
+
+
+def wants_msgpack():
+    """True if the client prefers a MessagePack response"""
+    return prefers_msgpack(request.accept_mimetypes)
+
+
+def pack_msgpack(obj):
+    """MessagePack-encode a response body (numpy values included)"""
+    return _get_msgpack().packb(obj, default=_msgpack_default, use_bin_type=True)
+
+
+def make_payload_response(app, obj, status=200):
+    """Serialize obj as MessagePack or JSON depending on the Accept header"""
+    with span('serialize'):
+        if wants_msgpack():
+            body = pack_msgpack(obj)
+            return app.response_class(body, status=status, mimetype='application/msgpack')
+        response = app.json.response(obj)
+    response.status_code = status
+    return response
+
+
+def _msgpack_default(obj):
+    # numpy scalars (np.str_ is already a str) and arrays
+    if hasattr(obj, 'item') and not hasattr(obj, '__len__'):
+        return obj.item()
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not MessagePack serializable")
@@ -0,0 +1,136 @@
+"""
+Cheap pre-inference filter for junk input
+
+Texts that are symbol soup, dominated by one repeated character or word,
+or (optionally) without a single token the model knows would still be
+vectorized, classified (as little more than the class prior), stored and
+counted. JunkFilter rejects them before any of that, with checks ordered
+from cheapest to most expensive:
+
+    junk_symbols        letters are less than `min_letter_ratio` of the
+                        letters and other symbols, or there are neither
+                        letters nor digits; digits and common punctuation
+                        do not count against letters ("ERR 0x80070005 at
+                        10:42", "$49.99", "10/10" and "!!!" are ordinary
+                        feedback)
+    junk_repeated_chars runs of 5+ identical characters cover more than
+                        `max_run_ratio` of the text and, with every run
+                        collapsed to one character, fewer than 2 letters
+                        remain ("Soooooo good" and "Noooo!!!!!" pass,
+                        "aaaaaaaaaa" does not)
+    junk_repeated_words fewer than `min_unique_ratio` of the tokens are
+                        distinct (texts with at least 6 tokens)
+    junk_no_vocabulary  no token is in the model's vocabulary; off unless
+                        `require_vocabulary`, since short, misspelled or
+                        non-English feedback ("Merci beaucoup") is real
+                        input the training vocabulary just lacks
+
+The character checks look at the whole text; for ASCII text letters and
+symbols are counted with bytes.translate, and the run scan is skipped as
+soon as two adjacent distinct letters show up (they alone leave 2 letters
+after collapsing, and real text has them within a few characters). Only
+the repeated-words check is limited to the first `window` characters, so
+it stays flat however long the text is. Tokens are found with the
+vectorizer's own token pattern and lowercasing, and the vocabulary check
+stops at the first known token. Stop words never made it into the
+vocabulary, so they do not count as known.
+"""
+
+import re
+import string
+
+# Digits and punctuation that ordinary feedback is full of (versions,
+# prices, times, error codes, emphasis); they never count against letters
+COMMON_PUNCTUATION = '.,;:!?\'"-()/$%&@#'
+_UNICODE_PUNCTUATION = '‘’“”–—…€£'
+
+_NEUTRAL = re.compile(r'[\s\d' + re.escape(COMMON_PUNCTUATION + _UNICODE_PUNCTUATION) + r']+')
+_WHITESPACE = re.compile(r'\s+')
+_CHAR_RUNS = re.compile(r'(.)\1\1\1\1+', re.DOTALL)
+_LETTER_PAIR = re.compile(r'([^\W\d_])(?!\1)[^\W\d_]')
+_ASCII_LETTERS = string.ascii_letters.encode()
+_ASCII_WHITESPACE = string.whitespace.encode()
+_ASCII_DIGITS = string.digits.encode()
+_ASCII_NEUTRAL = (string.whitespace + string.digits + COMMON_PUNCTUATION).encode()
+MIN_TOKENS_FOR_REPETITION = 6
+MIN_LETTERS_COLLAPSED = 2
+
+MESSAGES = {
+    'junk_symbols': 'Text is mostly symbols or digits',
+    'junk_repeated_chars': 'Text is mostly repeated characters',
+    'junk_repeated_words': 'Text is mostly repeated words',
+    'junk_no_vocabulary': 'Text contains no words the model knows'
+}
+
+
+def _count_characters(text):
+    """(non-whitespace characters, letters, letters plus symbols that are not neutral)"""
+    if text.isascii():
+        data = text.encode('ascii')
+        letters = len(data) - len(data.translate(None, _ASCII_LETTERS))
+        return len(data.translate(None, _ASCII_WHITESPACE)), letters, len(data.translate(None, _ASCII_NEUTRAL))
+    letters = sum(map(str.isalpha, text))
+    return len(_WHITESPACE.sub('', text)), letters, len(_NEUTRAL.sub('', text))
+
+
+def _has_digit(text):
+    if text.isascii():
+        data = text.encode('ascii')
+        return len(data.translate(None, _ASCII_DIGITS)) < len(data)
+    return any(map(str.isdigit, text))
+
+
+class JunkFilter:
+    """Rejects junk texts before vectorization; check() returns (error_type, message) or None"""
+
+    def __init__(self, vocabulary, token_pattern=r'(?u)\b\w\w+\b', lowercase=True,
+                 min_letter_ratio=0.5, max_run_ratio=0.5, min_unique_ratio=0.25,
+                 require_vocabulary=False, window=1000):
+        self.vocabulary = vocabulary
+        self.token_pattern = re.compile(token_pattern)
+        self.lowercase = lowercase
+        self.min_letter_ratio = min_letter_ratio
+        self.max_run_ratio = max_run_ratio
+        self.min_unique_ratio = min_unique_ratio
+        self.require_vocabulary = require_vocabulary
+        self.window = window
+
+    @classmethod
+    def from_vectorizer(cls, vectorizer, **thresholds):
+        return cls(vectorizer.vocabulary_, vectorizer.token_pattern, vectorizer.lowercase, **thresholds)
+
+    def reason(self, text, check_vocabulary=True):
+        """The error type for a junk text, or None if it looks like real text"""
+        visible, letters, counted = _count_characters(text)
+        if letters < self.min_letter_ratio * counted or (letters == 0 and not _has_digit(text)):
+            return 'junk_symbols'
+
+        if _LETTER_PAIR.search(text) is None:
+            repeated = collapsed_letters = 0
+            for match in _CHAR_RUNS.finditer(text):
+                length = match.end() - match.start()
+                repeated += length
+                if match.group(1).isalpha():
+                    collapsed_letters += length - 1
+            if repeated > self.max_run_ratio * visible and letters - collapsed_letters < MIN_LETTERS_COLLAPSED:
+                return 'junk_repeated_chars'
+
+        if self.lowercase:
+            text = text.lower()
+        sample = text[:self.window]
+        tokens = self.token_pattern.findall(sample)
+        if len(tokens) >= MIN_TOKENS_FOR_REPETITION and len(set(tokens)) < self.min_unique_ratio * len(tokens):
+            return 'junk_repeated_words'
+
+        if check_vocabulary and self.require_vocabulary:
+            vocabulary = self.vocabulary
+            if not any(token in vocabulary for token in tokens):
+                rest = self.token_pattern.finditer(text, len(sample)) if len(text) > len(sample) else ()
+                if not any(match.group() in vocabulary for match in rest):
+                    return 'junk_no_vocabulary'
+        return None
+
+    def check(self, text, check_vocabulary=True):
+        """(error_type, message) for a junk text, else None (like validate_text)"""
+        reason = self.reason(text, check_vocabulary)
+        return (reason, MESSAGES[reason]) if reason else None
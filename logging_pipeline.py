@@ -0,0 +1,169 @@
+"""
+Non-blocking logging pipeline
+
+Request threads only put log records on a bounded queue; a QueueListener
+thread formats them as JSON lines and writes them to stdout. When the queue
+is full (stdout pipe stalled, log shipper slow) records are dropped and
+counted instead of blocking the request. High-volume INFO lines marked with
+`extra={'sample': True}` are kept with probability LOG_SAMPLE_RATE.
+
+Environment:
+    LOG_PIPELINE     async (default) or sync (plain StreamHandler, the old behavior)
+    LOG_LEVEL        root log level (default INFO); OFF disables logging
+    LOG_SAMPLE_RATE  fraction of sampled INFO lines kept (default 0.1)
+    LOG_QUEUE_SIZE   bounded queue capacity (default 10000)
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg plus structured fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 6),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep INFO records marked `sample=True` with probability `rate`"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+        self.sampled_out = 0
+
+    def filter(self, record):
+        if record.levelno <= logging.INFO and getattr(record, 'sample', False):
+            if random.random() >= self.rate:
+                self.sampled_out += 1
+                return False
+        return True
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking
+
+    The queue and its listener are recreated lazily in each process, since
+    the listener thread does not survive a gunicorn --preload fork.
+    """
+
+    def __init__(self, target, maxsize):
+        super().__init__(queue.Queue(maxsize))
+        self.target = target
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._pid = None
+        self._listener = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.Queue(self.maxsize)
+            self._listener = logging.handlers.QueueListener(
+                self.queue, self.target, respect_handler_level=True
+            )
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def prepare(self, record):
+        # Defer message formatting to the listener thread; only tracebacks
+        # must be rendered here while the frames are still alive
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def stop(self):
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._pid = None
+
+
+class LoggingPipeline:
+    """Handles returned by setup_logging(), for metrics and shutdown"""
+
+    def __init__(self, queue_handler=None, sampler=None):
+        self.queue_handler = queue_handler
+        self.sampler = sampler
+
+    @property
+    def dropped(self):
+        return self.queue_handler.dropped if self.queue_handler else 0
+
+    @property
+    def sampled_out(self):
+        return self.sampler.sampled_out if self.sampler else 0
+
+    @property
+    def queue_depth(self):
+        return self.queue_handler.queue.qsize() if self.queue_handler else 0
+
+
+def setup_logging():
+    """Configure the root logger from the environment and return the pipeline"""
+    level_name = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    mode = os.environ.get('LOG_PIPELINE', 'async').lower()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    if level_name == 'OFF':
+        root.setLevel(logging.CRITICAL + 1)
+        return LoggingPipeline()
+    root.setLevel(level_name)
+
+    if mode == 'sync':
+        logging.basicConfig(level=level_name)
+        return LoggingPipeline()
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter())
+    sampler = SamplingFilter(float(os.environ.get('LOG_SAMPLE_RATE', 0.1)))
+    queue_handler = BoundedQueueHandler(stream, int(os.environ.get('LOG_QUEUE_SIZE', 10000)))
+    queue_handler.addFilter(sampler)
+    root.addHandler(queue_handler)
+    atexit.register(queue_handler.stop)
+    return LoggingPipeline(queue_handler, sampler)
+
+
+def access_log_fields(method, path, status, latency_seconds, **extra):
+    """Structured fields for one access log line"""
+    return {
+        'type': 'access',
+        'method': method,
+        'path': path,
+        'status': status,
+        'latency_ms': round(latency_seconds * 1000, 3),
+        'pid': os.getpid(),
+        **extra
+    }
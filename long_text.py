@@ -0,0 +1,74 @@
+"""
+Chunked classification of long documents
+
+Texts longer than the /predict limit are split into chunks of at most
+`chunk_chars` characters, cut at whitespace so words stay whole. Chunks
+are produced lazily and vectorized `batch_chunks` at a time, so the
+tokenizer only ever sees chunk-sized strings (no lowercased copy or token
+list of the whole document), and memory stays bounded by the batch rather
+than by the document.
+
+Chunk probabilities are averaged weighted by chunk length. Chunks with no
+vocabulary terms carry no evidence and get zero weight, so pages of
+boilerplate don't pull the result towards the class prior.
+"""
+
+from itertools import islice
+
+import numpy as np
+
+
+def iter_chunks(text, chunk_chars=2000):
+    """Yield slices of at most chunk_chars characters, cut at whitespace"""
+    start, length = 0, len(text)
+    while start < length:
+        end = min(start + chunk_chars, length)
+        if end < length:
+            # Prefer the last whitespace in the second half of the window
+            cut = max(text.rfind(' ', start + chunk_chars // 2, end),
+                      text.rfind('\n', start + chunk_chars // 2, end))
+            if cut > start:
+                end = cut + 1
+        chunk = text[start:end]
+        if not chunk.isspace():
+            yield chunk
+        start = end
+
+
+def classify_long_text(text, vectorizer, model, chunk_chars=2000, batch_chunks=64):
+    """
+    Classify a long text chunk by chunk.
+
+    Returns (proba, n_chunks, chunk_votes): the length-weighted mean class
+    probabilities, the number of chunks and how many chunks each class won.
+    """
+    n_classes = len(model.classes_)
+    weighted = np.zeros(n_classes)
+    unweighted = np.zeros(n_classes)
+    votes = np.zeros(n_classes, dtype=np.int64)
+    total_weight = 0.0
+    n_chunks = 0
+
+    chunks = iter_chunks(text, chunk_chars)
+    while True:
+        batch = list(islice(chunks, batch_chunks))
+        if not batch:
+            break
+        matrix = vectorizer.transform(batch)
+        proba = model.predict_proba(matrix)
+        weights = np.fromiter((len(chunk) for chunk in batch), dtype=np.float64, count=len(batch))
+        weights[matrix.getnnz(axis=1) == 0] = 0.0
+        weighted += weights @ proba
+        unweighted += proba.sum(axis=0)
+        total_weight += weights.sum()
+        np.add.at(votes, proba[weights > 0].argmax(axis=1), 1)
+        n_chunks += len(batch)
+
+    if n_chunks == 0:
+        raise ValueError('text contains no content')
+    if total_weight > 0:
+        proba = weighted / total_weight
+    else:
+        # No chunk had a known term: every chunk predicted the prior anyway
+        proba = unweighted / n_chunks
+    return proba, n_chunks, dict(zip(model.classes_, votes.tolist()))
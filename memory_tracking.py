@@ -0,0 +1,125 @@
+"""
+Opt-in allocation tracking with tracemalloc, for finding what makes a
+long-running worker's RSS creep
+
+An AllocationTracker starts tracemalloc and keeps a baseline snapshot per
+process. `diff()` takes a new snapshot and compares it with the baseline:
+the allocation sites (grouped by line, file or traceback) whose size and
+whose number of live blocks grew the most. Sites inside tracemalloc and
+the import machinery are filtered out.
+
+tracemalloc slows allocation-heavy code down noticeably and keeps its
+own bookkeeping in memory (reported as `tracemalloc_overhead_bytes`), so
+it only runs when MEMORY_TRACKING is set. Started before gunicorn forks
+(--preload), tracing is inherited by the workers; each worker still keeps
+its own baseline, taken the first time it is asked.
+"""
+
+import os
+import threading
+import time
+import tracemalloc
+
+GROUP_BY = ('lineno', 'filename', 'traceback')
+
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>')
+)
+
+
+def _site(stat, group_by):
+    frames = stat.traceback if group_by == 'traceback' else stat.traceback[:1]
+    return [f'{frame.filename}:{frame.lineno}' for frame in frames]
+
+
+class AllocationTracker:
+    """tracemalloc snapshots diffed against a per-process baseline"""
+
+    def __init__(self, frames=10):
+        self.frames = frames
+        self._lock = threading.Lock()
+        self._baseline = None
+        self._baseline_pid = None
+        self._baseline_at = None
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(_IGNORED)
+
+    def reset_baseline(self):
+        """Make the current allocations the baseline later diffs compare against"""
+        self.start()
+        with self._lock:
+            self._baseline = self._snapshot()
+            self._baseline_pid = os.getpid()
+            self._baseline_at = time.time()
+        return self._baseline_at
+
+    def diff(self, top=20, group_by='lineno'):
+        """Top allocation sites by size growth and by count growth since the baseline"""
+        if group_by not in GROUP_BY:
+            raise ValueError(f'group_by must be one of {", ".join(GROUP_BY)}')
+        if self._baseline_pid != os.getpid():
+            self.reset_baseline()
+        with self._lock:
+            start = time.perf_counter()
+            snapshot = self._snapshot()
+            stats = snapshot.compare_to(self._baseline, group_by)
+            baseline_at = self._baseline_at
+            elapsed = time.perf_counter() - start
+
+        def describe(stat):
+            return {
+                'site': _site(stat, group_by),
+                'size_bytes': stat.size,
+                'size_diff_bytes': stat.size_diff,
+                'count': stat.count,
+                'count_diff': stat.count_diff
+            }
+
+        traced, peak = tracemalloc.get_traced_memory()
+        return {
+            'pid': os.getpid(),
+            'group_by': group_by,
+            'baseline_at': baseline_at,
+            'seconds_since_baseline': round(time.time() - baseline_at, 1),
+            'traced_bytes': traced,
+            'traced_peak_bytes': peak,
+            'tracemalloc_overhead_bytes': tracemalloc.get_tracemalloc_memory(),
+            'size_diff_bytes': sum(stat.size_diff for stat in stats),
+            'count_diff': sum(stat.count_diff for stat in stats),
+            'top_by_size_growth': [
+                describe(stat)
+                for stat in sorted(stats, key=lambda stat: stat.size_diff, reverse=True)[:top]
+                if stat.size_diff > 0
+            ],
+            'top_by_count_growth': [
+                describe(stat)
+                for stat in sorted(stats, key=lambda stat: stat.count_diff, reverse=True)[:top]
+                if stat.count_diff > 0
+            ],
+            'snapshot_seconds': round(elapsed, 3)
+        }
+
+
+def metric_series(registry, top=10):
+    """Number of exported samples per metric family, largest first (label growth)"""
+    counts = {}
+    for family in registry.collect():
+        counts[family.name] = counts.get(family.name, 0) + len(family.samples)
+    ranked = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+    return {
+        'total_samples': sum(counts.values()),
+        'families': len(counts),
+        'largest': dict(ranked[:top])
+    }
@@ -0,0 +1,335 @@
+"""
+Schema migrations for the predictions table
+
+Migrations are applied in order and recorded in `schema_migrations`. A
+PostgreSQL advisory lock serialises concurrent runners, so every worker
+(or a release step) can call migrate() safely; the app runs it once at
+startup, never from a request.
+
+The schema they produce:
+  - `predictions` range-partitioned by month on created_at. An existing
+    unpartitioned table is attached as-is as `predictions_legacy` (no data
+    copy) and covers everything up to the first monthly partition.
+  - A DEFAULT partition as a safety net for rows outside the created months.
+  - Indexes on (created_at) and (category, created_at), inherited by every
+    partition.
+  - `idempotency_keys`: each key with its prediction and text fingerprint.
+
+Retention drops whole monthly partitions (DETACH + DROP) instead of
+DELETEing rows, so old data is removed without bloat or long scans.
+
+Usage:
+    python migrations.py up                         # apply pending migrations
+    python migrations.py status
+    python migrations.py partitions [--months-ahead 3]
+    python migrations.py retention --keep-months 12 [--dry-run]
+"""
+
+import argparse
+import logging
+import os
+import re
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_LOCK_ID = 7_284_106  # arbitrary constant shared by all runners
+PARTITION_MONTHS_AHEAD = 3
+
+_BOUND_RE = re.compile(r"FROM \((MINVALUE|'[^']*')\) TO \((MAXVALUE|'[^']*')\)")
+
+
+def _cursor(conn):
+    # Tuple rows, whatever cursor_factory the connection was opened with
+    import psycopg2.extensions
+    return conn.cursor(cursor_factory=psycopg2.extensions.cursor)
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def _parse_bound(token):
+    if token in ('MINVALUE', 'MAXVALUE'):
+        return None
+    return datetime.fromisoformat(token.strip("'"))
+
+
+def list_partitions(cur):
+    """(name, lower, upper, is_default) per partition; None bounds are unbounded"""
+    cur.execute("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'predictions'::regclass
+        ORDER BY c.relname
+    """)
+    partitions = []
+    for name, bound in cur.fetchall():
+        if bound == 'DEFAULT':
+            partitions.append((name, None, None, True))
+            continue
+        match = _BOUND_RE.search(bound)
+        partitions.append((name, _parse_bound(match.group(1)), _parse_bound(match.group(2)), False))
+    return partitions
+
+
+def _is_partitioned(cur):
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = 'predictions'::regclass")
+    return cur.fetchone()[0] == 'p'
+
+
+# --- Migrations (each runs in its own transaction) ---------------------------
+
+def _create_predictions(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS predictions (
+            id SERIAL PRIMARY KEY,
+            text TEXT NOT NULL,
+            category VARCHAR(50) NOT NULL,
+            confidence FLOAT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _partition_predictions(cur):
+    if _is_partitioned(cur):
+        return
+    cur.execute("LOCK TABLE predictions IN ACCESS EXCLUSIVE MODE")
+    cur.execute("SELECT pg_get_serial_sequence('predictions', 'id')")
+    sequence = cur.fetchone()[0]
+    # The legacy table becomes one partition covering everything before the
+    # first monthly partition, so it has to end after its newest row
+    cur.execute("""
+        SELECT date_trunc('month', GREATEST(MAX(created_at), (now() AT TIME ZONE 'UTC'))) + INTERVAL '1 month'
+        FROM predictions
+    """)
+    legacy_upper = cur.fetchone()[0]
+
+    cur.execute("UPDATE predictions SET created_at = (now() AT TIME ZONE 'UTC') WHERE created_at IS NULL")
+    cur.execute("ALTER TABLE predictions ALTER COLUMN created_at SET NOT NULL")
+    cur.execute("ALTER TABLE predictions RENAME TO predictions_legacy")
+    # Attaching gives the partition the parent's (id, created_at) key, and a
+    # table cannot have two primary keys
+    cur.execute("ALTER TABLE predictions_legacy DROP CONSTRAINT predictions_pkey")
+    # The primary key of a partitioned table must include the partition key
+    cur.execute(f"""
+        CREATE TABLE predictions (
+            id INTEGER NOT NULL DEFAULT nextval('{sequence}'),
+            text TEXT NOT NULL,
+            category VARCHAR(50) NOT NULL,
+            confidence FLOAT NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    cur.execute(f"ALTER SEQUENCE {sequence} OWNED BY predictions.id")
+    cur.execute("ALTER TABLE predictions_legacy ALTER COLUMN id DROP DEFAULT")
+    cur.execute(
+        "ALTER TABLE predictions ATTACH PARTITION predictions_legacy FOR VALUES FROM (MINVALUE) TO (%s)",
+        (legacy_upper,)
+    )
+    cur.execute("CREATE TABLE predictions_default PARTITION OF predictions DEFAULT")
+
+
+def _add_indexes(cur):
+    # Created on the parent, so existing and future partitions all get them
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_predictions_created_at ON predictions (created_at)")
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_predictions_category_created_at
+        ON predictions (category, created_at)
+    """)
+
+
+def _create_idempotency_keys(cur):
+    # Not partitioned: keys must be unique across all of predictions
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            key VARCHAR(255) PRIMARY KEY,
+            prediction_id INTEGER,
+            created_at TIMESTAMP NOT NULL
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created_at ON idempotency_keys (created_at)")
+
+
+def _add_idempotency_fingerprints(cur):
+    # Keys claimed before this have none and are not compared
+    cur.execute("ALTER TABLE idempotency_keys ADD COLUMN IF NOT EXISTS fingerprint VARCHAR(32)")
+
+
+MIGRATIONS = [
+    (1, 'create predictions table', _create_predictions),
+    (2, 'partition predictions by month on created_at', _partition_predictions),
+    (3, 'index created_at and (category, created_at)', _add_indexes),
+    (4, 'create idempotency_keys table', _create_idempotency_keys),
+    (5, 'record the text fingerprint of each idempotency key', _add_idempotency_fingerprints),
+]
+
+
+def applied_versions(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cur.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cur.fetchall()}
+
+
+def migrate(conn, months_ahead=PARTITION_MONTHS_AHEAD):
+    """Apply pending migrations and create upcoming partitions; returns applied versions"""
+    applied = []
+    with _cursor(conn) as cur:
+        cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+        conn.commit()
+        try:
+            done = applied_versions(cur)
+            conn.commit()
+            for version, description, apply in MIGRATIONS:
+                if version in done:
+                    continue
+                try:
+                    apply(cur)
+                    cur.execute(
+                        "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                        (version, description)
+                    )
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                logger.info(f"✅ Applied migration {version}: {description}")
+                applied.append(version)
+            ensure_partitions(conn, months_ahead)
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+            conn.commit()
+    return applied
+
+
+def ensure_partitions(conn, months_ahead=PARTITION_MONTHS_AHEAD, now=None):
+    """Create monthly partitions from the current month through months_ahead; returns new names"""
+    current = month_start(now or datetime.utcnow())
+    created = []
+    with _cursor(conn) as cur:
+        if not _is_partitioned(cur):
+            return created
+        existing = [(lower, upper) for _, lower, upper, is_default in list_partitions(cur) if not is_default]
+        for offset in range(months_ahead + 1):
+            lower, upper = add_months(current, offset), add_months(current, offset + 1)
+            overlaps = any(
+                (other_lower is None or other_lower < upper) and (other_upper is None or lower < other_upper)
+                for other_lower, other_upper in existing
+            )
+            if overlaps:
+                continue
+            name = f"predictions_p{lower:%Y%m}"
+            try:
+                cur.execute(f"CREATE TABLE {name} (LIKE predictions INCLUDING DEFAULTS)")
+                # Rows that landed in the DEFAULT partition for this month move over
+                # first, otherwise ATTACH fails its overlap check
+                cur.execute(f"""
+                    WITH moved AS (
+                        DELETE FROM predictions_default
+                        WHERE created_at >= %s AND created_at < %s
+                        RETURNING *
+                    )
+                    INSERT INTO {name} SELECT * FROM moved
+                """, (lower, upper))
+                cur.execute(
+                    f"ALTER TABLE predictions ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)",
+                    (lower, upper)
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            existing.append((lower, upper))
+            created.append(name)
+            logger.info(f"🗂️  Created partition {name}")
+    return created
+
+
+def drop_expired_partitions(conn, keep_months, dry_run=False, now=None):
+    """Detach and drop partitions that end before the retention window; returns their names"""
+    cutoff = add_months(month_start(now or datetime.utcnow()), -keep_months)
+    dropped = []
+    with _cursor(conn) as cur:
+        if not _is_partitioned(cur):
+            return dropped
+        for name, _, upper, is_default in list_partitions(cur):
+            if is_default or upper is None or upper > cutoff:
+                continue
+            if not dry_run:
+                try:
+                    cur.execute(f"ALTER TABLE predictions DETACH PARTITION {name}")
+                    cur.execute(f"DROP TABLE {name}")
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                logger.info(f"🗑️  Dropped partition {name} (rows before {upper:%Y-%m-%d})")
+            dropped.append(name)
+    return dropped
+
+
+def connect(database_url=None):
+    import psycopg2
+    database_url = database_url or os.environ.get('DATABASE_URL')
+    if not database_url:
+        raise SystemExit('DATABASE_URL is not set (or pass --database-url)')
+    if database_url.startswith('postgres://'):
+        database_url = database_url.replace('postgres://', 'postgresql://', 1)
+    return psycopg2.connect(database_url)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage the predictions schema')
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL'))
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('up', help='apply pending migrations')
+    commands.add_parser('status', help='list migrations and partitions')
+    partitions = commands.add_parser('partitions', help='create upcoming monthly partitions')
+    partitions.add_argument('--months-ahead', type=int, default=PARTITION_MONTHS_AHEAD)
+    retention = commands.add_parser('retention', help='drop partitions older than the retention window')
+    retention.add_argument('--keep-months', type=int, required=True)
+    retention.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    conn = connect(args.database_url)
+    try:
+        if args.command == 'up':
+            applied = migrate(conn)
+            print(f"Applied migrations: {applied or 'none pending'}")
+        elif args.command == 'status':
+            with _cursor(conn) as cur:
+                done = applied_versions(cur)
+                conn.commit()
+                for version, description, _ in MIGRATIONS:
+                    print(f"{'✅' if version in done else '⏳'} {version:>3}  {description}")
+                if _is_partitioned(cur):
+                    print()
+                    for name, lower, upper, is_default in list_partitions(cur):
+                        span = 'DEFAULT' if is_default else f"{lower or '-inf'} → {upper or '+inf'}"
+                        print(f"   {name:<28}{span}")
+        elif args.command == 'partitions':
+            print(f"Created: {ensure_partitions(conn, args.months_ahead) or 'nothing to do'}")
+        else:
+            dropped = drop_expired_partitions(conn, args.keep_months, args.dry_run)
+            print(f"{'Would drop' if args.dry_run else 'Dropped'}: {dropped or 'nothing'}")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""
+Named, versioned models loaded on demand into a memory-bounded LRU cache
+
+Models live in a local directory, one subdirectory per name and version:
+
+    MODELS_DIR/<name>/<version>/textcat_model.pkl
+    MODELS_DIR/<name>/<version>/tfidf_vectorizer.pkl
+
+A request names a model as "name" (its highest version, compared
+numerically where possible) or "name@version". Loaded models are kept in
+an LRU cache whose total size, measured as the size of the pickled
+artifacts, stays under `max_bytes`; the least recently used model is
+evicted first, but the model just loaded always stays.
+
+Loading happens outside the cache lock: requests for a model that is
+already cached (or for any other model) never wait on a load, and
+concurrent requests for the model being loaded wait for that one load
+instead of starting their own.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import joblib
+
+MODEL_FILE = 'textcat_model.pkl'
+VECTORIZER_FILE = 'tfidf_vectorizer.pkl'
+_NAME = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$')
+
+
+class ModelNotFound(LookupError):
+    pass
+
+
+def _version_key(version):
+    # "10" sorts after "9"; non-numeric parts compare as text
+    return [(0, int(part), '') if part.isdigit() else (1, 0, part) for part in re.split(r'(\d+)', version) if part]
+
+
+class LoadedModel:
+    __slots__ = ('name', 'version', 'model', 'vectorizer', 'nbytes', 'loaded_at', 'hits')
+
+    def __init__(self, name, version, model, vectorizer, nbytes):
+        self.name = name
+        self.version = version
+        self.model = model
+        self.vectorizer = vectorizer
+        self.nbytes = nbytes
+        self.loaded_at = time.time()
+        self.hits = 0
+
+    @property
+    def key(self):
+        return f'{self.name}@{self.version}'
+
+
+class _PendingLoad:
+    __slots__ = ('done', 'entry', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.entry = None
+        self.error = None
+
+
+class ModelRegistry:
+    """Thread-safe LRU cache of named models read from `root`"""
+
+    def __init__(self, root, max_bytes=512 * 1024 * 1024, on_load=None, on_evict=None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.on_load = on_load  # called with (entry, seconds) after a load
+        self.on_evict = on_evict  # called with (entry) after an eviction
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # "name@version" -> LoadedModel
+        self._loading = {}  # "name@version" -> _PendingLoad
+        self._bytes = 0
+
+    @property
+    def cached_bytes(self):
+        return self._bytes
+
+    def __len__(self):
+        return len(self._cache)
+
+    @staticmethod
+    def parse_ref(ref):
+        """Split "name" or "name@version"; raises ValueError for invalid names"""
+        name, _, version = ref.partition('@')
+        if not _NAME.match(name) or (version and not _NAME.match(version)):
+            raise ValueError(f'Invalid model name {ref!r}')
+        return name, version or None
+
+    def versions(self, name):
+        """Versions of a model on disk, oldest first"""
+        path = os.path.join(self.root, name)
+        if not os.path.isdir(path):
+            return []
+        return sorted(
+            (version for version in os.listdir(path)
+             if _NAME.match(version) and os.path.isfile(os.path.join(path, version, MODEL_FILE))),
+            key=_version_key
+        )
+
+    def available(self):
+        """{name: [versions]} for every model directory under root"""
+        if not os.path.isdir(self.root):
+            return {}
+        models = {}
+        for name in sorted(os.listdir(self.root)):
+            if _NAME.match(name):
+                versions = self.versions(name)
+                if versions:
+                    models[name] = versions
+        return models
+
+    def get(self, ref):
+        """The loaded model for a reference, loading it on a cache miss"""
+        name, version = self.parse_ref(ref)
+        if version is None:
+            versions = self.versions(name)
+            if not versions:
+                raise ModelNotFound(f'Unknown model {name!r}')
+            version = versions[-1]
+        key = f'{name}@{version}'
+
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+                entry.hits += 1
+                self.hits += 1
+                return entry
+            pending = self._loading.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._loading[key] = _PendingLoad()
+                self.misses += 1
+
+        if not owner:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.entry
+
+        try:
+            pending.entry = self._load(name, version)
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._loading[key]
+                if pending.entry is not None:
+                    self._insert(pending.entry)
+                elif pending.error is None:
+                    pending.error = RuntimeError(f'Loading {key} was interrupted')
+            pending.done.set()
+        return pending.entry
+
+    def _load(self, name, version):
+        path = os.path.join(self.root, name, version)
+        model_path = os.path.join(path, MODEL_FILE)
+        vectorizer_path = os.path.join(path, VECTORIZER_FILE)
+        if not os.path.isfile(model_path) or not os.path.isfile(vectorizer_path):
+            raise ModelNotFound(f'Unknown model {name}@{version}')
+        start = time.perf_counter()
+        entry = LoadedModel(
+            name, version, joblib.load(model_path), joblib.load(vectorizer_path),
+            os.path.getsize(model_path) + os.path.getsize(vectorizer_path)
+        )
+        if self.on_load is not None:
+            self.on_load(entry, time.perf_counter() - start)
+        return entry
+
+    def _insert(self, entry):
+        # Called with the lock held
+        self._cache[entry.key] = entry
+        self._bytes += entry.nbytes
+        while self._bytes > self.max_bytes and len(self._cache) > 1:
+            _, evicted = self._cache.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(evicted)
+
+    def prewarm(self, refs):
+        """Load models ahead of traffic; returns {ref: error message} for failures"""
+        failures = {}
+        for ref in refs:
+            try:
+                self.get(ref)
+            except Exception as e:
+                failures[ref] = str(e)
+        return failures
+
+    def snapshot(self):
+        """Cache contents, most recently used first"""
+        with self._lock:
+            return {
+                'max_bytes': self.max_bytes,
+                'cached_bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'loaded': [
+                    {
+                        'model': entry.key,
+                        'bytes': entry.nbytes,
+                        'hits': entry.hits,
+                        'classes': [str(c) for c in entry.model.classes_],
+                        'loaded_at': entry.loaded_at
+                    }
+                    for entry in reversed(self._cache.values())
+                ]
+            }
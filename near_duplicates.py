@@ -0,0 +1,149 @@
+"""
+Near-duplicate detection with MinHash + LSH
+
+Feedback is normalized (lowercase, punctuation stripped, whitespace
+collapsed) and split into character shingles. A MinHash signature
+estimates Jaccard similarity between shingle sets; locality-sensitive
+hashing over signature bands finds candidates without comparing against
+every stored entry. Candidates are verified against the signature before a
+stored classification is reused.
+
+The index holds at most `max_entries` signatures and evicts the least
+recently matched entry when full, so memory stays bounded.
+"""
+
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize_text(text):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return _NON_WORD.sub(' ', text.lower()).strip()
+
+
+class _Entry:
+    __slots__ = ('signature', 'band_keys', 'payload', 'text', 'cluster_size')
+
+    def __init__(self, signature, band_keys, payload, text):
+        self.signature = signature
+        self.band_keys = band_keys
+        self.payload = payload
+        self.text = text
+        self.cluster_size = 1
+
+
+class NearDuplicateIndex:
+    """Bounded MinHash/LSH index mapping feedback to a stored classification"""
+
+    def __init__(self, threshold=0.9, max_entries=10000, num_perm=64, bands=16,
+                 shingle_size=5, seed=1):
+        if num_perm % bands:
+            raise ValueError('num_perm must be divisible by bands')
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, (1 << 61) - 1, size=num_perm, dtype=np.uint64)[:, None]
+        self._b = rng.randint(0, (1 << 61) - 1, size=num_perm, dtype=np.uint64)[:, None]
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # entry id -> _Entry, least recently matched first
+        self._buckets = [dict() for _ in range(bands)]  # band key -> set of entry ids
+        self._next_id = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def signature(self, text):
+        """MinHash signature of the normalized text's character shingles"""
+        normalized = normalize_text(text)
+        size = self.shingle_size
+        if len(normalized) <= size:
+            shingles = {normalized}
+        else:
+            shingles = {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles)
+        )
+        # Universal hashing (a*x + b) mod p, one row per permutation
+        permuted = ((self._a * hashes + self._b) % _MERSENNE_PRIME) & _MAX_HASH
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def lookup(self, signature):
+        """Return (payload, similarity, cluster_size) of the best match, or None"""
+        band_keys = self._band_keys(signature)
+        with self._lock:
+            candidates = set()
+            for bucket, key in zip(self._buckets, band_keys):
+                candidates.update(bucket.get(key, ()))
+            best_id, best_similarity = None, 0.0
+            for entry_id in candidates:
+                similarity = float(np.mean(self._entries[entry_id].signature == signature))
+                if similarity > best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+            if best_id is None or best_similarity < self.threshold:
+                return None
+            entry = self._entries[best_id]
+            entry.cluster_size += 1
+            self._entries.move_to_end(best_id)
+            return entry.payload, best_similarity, entry.cluster_size
+
+    def insert(self, signature, payload, text):
+        """Store a fresh classification, evicting the stalest entry if full"""
+        if self.max_entries <= 0:
+            return
+        band_keys = self._band_keys(signature)
+        with self._lock:
+            while len(self._entries) >= self.max_entries:
+                self._evict()
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _Entry(signature, band_keys, payload, text)
+            for bucket, key in zip(self._buckets, band_keys):
+                bucket.setdefault(key, set()).add(entry_id)
+
+    def _evict(self):
+        entry_id, entry = self._entries.popitem(last=False)
+        for bucket, key in zip(self._buckets, entry.band_keys):
+            members = bucket.get(key)
+            if members is not None:
+                members.discard(entry_id)
+                if not members:
+                    del bucket[key]
+        self.evictions += 1
+
+    def cluster_summary(self, top=10):
+        """Largest duplicate clusters currently held, for /stats"""
+        with self._lock:
+            sizes = [entry.cluster_size for entry in self._entries.values()]
+            largest = sorted(self._entries.values(), key=lambda e: e.cluster_size, reverse=True)[:top]
+            return {
+                'entries': len(sizes),
+                'duplicate_clusters': sum(1 for size in sizes if size > 1),
+                'duplicates_absorbed': sum(size - 1 for size in sizes),
+                'evictions': self.evictions,
+                'largest_clusters': [
+                    {
+                        'size': entry.cluster_size,
+                        'category': entry.payload['prediction'],
+                        'example': entry.text
+                    }
+                    for entry in largest if entry.cluster_size > 1
+                ]
+            }
@@ -180,6 +180,10 @@ async function handlePredict() {
  * Make API request with retry logic
  */
 async function makeRequestWithRetry(feedback, retries = CONFIG.MAX_RETRIES) {
+  // Same key on every attempt, so a retry after a timeout returns the
+  // original result instead of classifying and saving the text twice
+  const idempotencyKey = createIdempotencyKey();
+  
   for (let attempt = 0; attempt <= retries; attempt++) {
     try {
       const response = await fetchWithTimeout(
@@ -187,7 +191,8 @@ async function makeRequestWithRetry(feedback, retries = CONFIG.MAX_RETRIES) {
         {
           method: 'POST',
           headers: {
-            'Content-Type': 'application/json'
+            'Content-Type': 'application/json',
+            'Idempotency-Key': idempotencyKey
           },
           body: JSON.stringify({ feedback })
         },
@@ -222,6 +227,16 @@ async function makeRequestWithRetry(feedback, retries = CONFIG.MAX_RETRIES) {
   }
 }
 
+/**
+ * Random key identifying one logical request across retries
+ */
+function createIdempotencyKey() {
+  if (window.crypto && typeof window.crypto.randomUUID === 'function') {
+    return window.crypto.randomUUID();
+  }
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+}
+
 /**
  * Fetch with timeout
  */
@@ -0,0 +1,154 @@
+"""
+Async vs Gunicorn Load Test
+Starts the Flask app under gunicorn with the start.sh topology and the ASGI
+variant (app_async.py) under uvicorn, drives each with the same concurrent
+/predict load, and prints throughput and latency side by side. Every
+prediction is stored, as in production: in PostgreSQL when DATABASE_URL is
+set, otherwise in a fresh embedded SQLite database per server. Requests are
+random pairs of training texts, so near-duplicate reuse does not skip the
+inference being compared.
+
+Usage:
+    python scripts/bench_async_vs_gunicorn.py [--concurrency 64] [--duration 20]
+"""
+
+import argparse
+import csv
+import os
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+
+def load_feedback():
+    """The training texts (customer_feedback.csv)"""
+    with open(ROOT / 'customer_feedback.csv', newline='', encoding='utf-8') as f:
+        return [row['feedback_text'].strip() for row in csv.DictReader(f)]
+
+
+def load_texts(n, seed=0):
+    """n request texts: random pairs of training feedback, so few are near-duplicates"""
+    feedback = load_feedback()
+    rng = random.Random(seed)
+    return [f"{rng.choice(feedback)} {rng.choice(feedback)}" for _ in range(n)]
+
+
+def start_server(command, port, data_dir, extra_env=None):
+    """Start a server storing into data_dir (unless DATABASE_URL is set) and wait until it is healthy"""
+    env = dict(os.environ, PORT=str(port), LOG_LEVEL='WARNING', **(extra_env or {}))
+    if not env.get('DATABASE_URL'):
+        env['STORAGE_BACKEND'] = 'sqlite'
+        env['SQLITE_PATH'] = os.path.join(data_dir, f'predictions-{port}.db')
+    process = subprocess.Popen(
+        command, cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if requests.get(f'http://127.0.0.1:{port}/health', timeout=1).ok:
+                return process
+        except requests.RequestException:
+            time.sleep(0.5)
+    stop_server(process)
+    raise RuntimeError(f"Server did not become healthy: {' '.join(command)}")
+
+
+def stop_server(process):
+    os.killpg(process.pid, signal.SIGTERM)
+    process.wait(timeout=30)
+
+
+def drive(port, concurrency, duration, texts):
+    """Closed-loop load: each thread sends /predict back to back for `duration` seconds"""
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    def worker(worker_id):
+        session = requests.Session()
+        i = worker_id
+        local, failed = [], 0
+        while time.time() < stop_at:
+            start = time.perf_counter()
+            try:
+                response = session.post(
+                    f'http://127.0.0.1:{port}/predict',
+                    json={'text': texts[i % len(texts)]},
+                    timeout=30
+                )
+                if response.status_code != 200:
+                    failed += 1
+            except requests.RequestException:
+                failed += 1
+            local.append(time.perf_counter() - start)
+            i += concurrency
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    latencies.sort()
+    return {
+        'rps': len(latencies) / duration,
+        'p50': statistics.median(latencies) * 1000,
+        'p99': latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        'errors': errors[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=int, default=20)
+    parser.add_argument('--async-workers', type=int, default=2)
+    args = parser.parse_args()
+
+    servers = (
+        ('gunicorn 4w x 2t (start.sh)', [
+            sys.executable, '-m', 'gunicorn', '--bind', '127.0.0.1:5101',
+            '--workers', '4', '--threads', '2', '--preload', '--timeout', '60', 'app:app'
+        ], 5101),
+        (f'uvicorn {args.async_workers}w (app_async)', [
+            sys.executable, '-m', 'uvicorn', 'app_async:app', '--host', '127.0.0.1',
+            '--port', '5102', '--workers', str(args.async_workers), '--log-level', 'warning'
+        ], 5102),
+    )
+
+    print("=" * 70)
+    print("⚡ ASYNC VS GUNICORN LOAD TEST")
+    print("=" * 70)
+    print(f"concurrency {args.concurrency}, {args.duration}s per server, "
+          f"storage {'PostgreSQL' if os.environ.get('DATABASE_URL') else 'SQLite'}\n")
+    print(f"{'server':<30} | {'req/s':>8} | {'p50 ms':>8} | {'p99 ms':>8} | {'errors':>6}")
+    print("-" * 70)
+    texts, warmup_texts = load_texts(50_000, seed=0), load_texts(2_000, seed=1)
+    data_dir = tempfile.mkdtemp(prefix='bench_async_')
+    for label, command, port in servers:
+        process = start_server(command, port, data_dir)
+        try:
+            drive(port, args.concurrency, 2, warmup_texts)  # warm up
+            result = drive(port, args.concurrency, args.duration, texts)
+        finally:
+            stop_server(process)
+        print(f"{label:<30} | {result['rps']:>8.1f} | {result['p50']:>8.1f} | "
+              f"{result['p99']:>8.1f} | {result['errors']:>6}")
+
+
+if __name__ == '__main__':
+    main()
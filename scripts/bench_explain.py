@@ -0,0 +1,77 @@
+"""
+Explanation Benchmark
+Compares the cost of /explain (top-k contributing terms) with a plain
+/predict inference on the same texts, for single texts and batches.
+
+Usage:
+    python scripts/bench_explain.py [--repeat 200] [--top-k 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import joblib
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+from explain import TermExplainer  # noqa: E402
+
+
+def best_of(fn, repeat):
+    """Best per-call time in seconds over `repeat` calls"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=5)
+    args = parser.parse_args()
+
+    model = joblib.load('textcat_model.pkl')
+    vectorizer = joblib.load('tfidf_vectorizer.pkl')
+
+    start = time.perf_counter()
+    explainer = TermExplainer(model, vectorizer)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    texts = pd.read_csv('customer_feedback.csv')['feedback_text'].astype(str).tolist()
+
+    def predict(batch):
+        vec = vectorizer.transform(batch)
+        model.predict(vec)
+        model.predict_proba(vec)
+
+    def explain(batch):
+        vec = vectorizer.transform(batch)
+        model.predict_proba(vec)
+        explainer.explain(vec, args.top_k)
+
+    print("=" * 60)
+    print("🔍 EXPLANATION BENCHMARK")
+    print("=" * 60)
+    print(f"Explainer build (inverse vocabulary): {build_ms:.2f} ms")
+    print(f"Vocabulary size: {len(explainer.terms)}, classes: {len(explainer.classes)}\n")
+    print(f"{'batch':>6} | {'predict ms':>10} | {'explain ms':>10} | {'ratio':>6}")
+    print("-" * 44)
+
+    for size in (1, 10, 100):
+        batch = texts[:size]
+        predict_s = best_of(lambda: predict(batch), args.repeat)
+        explain_s = best_of(lambda: explain(batch), args.repeat)
+        print(f"{size:>6} | {predict_s * 1000:>10.3f} | {explain_s * 1000:>10.3f} | {explain_s / predict_s:>5.2f}x")
+
+
+if __name__ == '__main__':
+    main()
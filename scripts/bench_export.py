@@ -0,0 +1,138 @@
+"""
+Export Benchmark
+Streams the predictions table through export_predictions (server-side
+cursor) at several fetch sizes and compares it with a plain client-side
+cursor that loads every row before encoding. Each run happens in a fresh
+subprocess so peak RSS is measured per mode.
+
+Needs DATABASE_URL. --seed N inserts N synthetic rows first (use a
+scratch database).
+
+Usage:
+    python scripts/bench_export.py [--seed 1000000] [--fetch-sizes 1000,5000,20000]
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+import export_predictions  # noqa: E402
+
+
+def connect():
+    import psycopg2
+    database_url = os.environ['DATABASE_URL']
+    if database_url.startswith('postgres://'):
+        database_url = database_url.replace('postgres://', 'postgresql://', 1)
+    return psycopg2.connect(database_url)
+
+
+def seed(rows):
+    categories = ['Bug Report', 'Feature Request', 'Praise', 'Complaint', 'Question']
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO predictions (text, category, confidence, created_at)
+                SELECT 'synthetic feedback row ' || g || ' with a few more words of text',
+                       (%s::text[])[1 + g %% 5], random(), now() - (g || ' seconds')::interval
+                FROM generate_series(1, %s) AS g
+            """, (categories, rows))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_worker(mode, fmt, fetch_size):
+    """One export into /dev/null; prints a JSON result line"""
+    conn = connect()
+    rows = 0
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as out:
+        if mode == 'server':
+            batches = export_predictions.iter_row_batches(conn, fetch_size=fetch_size)
+
+            def counted():
+                nonlocal rows
+                for batch in batches:
+                    rows += len(batch)
+                    yield batch
+            encode = export_predictions.encode_csv if fmt == 'csv' else export_predictions.encode_ndjson
+            for chunk in encode(counted()):
+                out.write(chunk)
+        else:
+            query, params = export_predictions.build_query()
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                all_rows = cur.fetchall()
+            rows = len(all_rows)
+            encode = export_predictions.encode_csv if fmt == 'csv' else export_predictions.encode_ndjson
+            for chunk in encode([all_rows]):
+                out.write(chunk)
+    elapsed = time.perf_counter() - start
+    conn.close()
+    print(json.dumps({'rows': rows, 'seconds': elapsed, 'peak_rss_mb': peak_rss_mb()}))
+
+
+def run_mode(mode, fmt, fetch_size):
+    output = subprocess.run(
+        [sys.executable, __file__, '--worker', mode, '--format', fmt, '--fetch-size', str(fetch_size)],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seed', type=int, default=0, help='insert N synthetic rows first')
+    parser.add_argument('--format', choices=sorted(export_predictions.EXPORT_FORMATS), default='csv')
+    parser.add_argument('--fetch-sizes', default='1000,5000,20000')
+    parser.add_argument('--skip-client', action='store_true', help='skip the load-everything baseline')
+    parser.add_argument('--worker', choices=['server', 'client'], help=argparse.SUPPRESS)
+    parser.add_argument('--fetch-size', type=int, default=5000, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if not os.environ.get('DATABASE_URL'):
+        parser.error('DATABASE_URL must point at a PostgreSQL database')
+
+    if args.worker:
+        run_worker(args.worker, args.format, args.fetch_size)
+        return
+
+    print("=" * 60)
+    print(f"📤 Export benchmark ({args.format})")
+    print("=" * 60)
+
+    if args.seed:
+        start = time.perf_counter()
+        seed(args.seed)
+        print(f"Seeded {args.seed:,} rows in {time.perf_counter() - start:.1f}s")
+
+    runs = [('server', int(size)) for size in args.fetch_sizes.split(',')]
+    if not args.skip_client:
+        runs.append(('client', 0))
+
+    print(f"\n{'mode':<24}{'rows':>12}{'rows/sec':>14}{'peak RSS':>12}")
+    for mode, fetch_size in runs:
+        result = run_mode(mode, args.format, fetch_size or 1)
+        label = f"server fetch={fetch_size}" if mode == 'server' else 'client fetchall'
+        rate = result['rows'] / max(result['seconds'], 1e-9)
+        print(f"{label:<24}{result['rows']:>12,}{rate:>14,.0f}{result['peak_rss_mb']:>10.1f}MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Junk Filter Benchmark
+Per-text cost of JunkFilter.check() on real feedback and on each kind of
+junk, against the single-text inference it saves (transform, predict and
+predict_proba, as /predict runs them), plus false positives on the
+training CSV and on realistic live feedback the CSV lacks (short,
+numeric, emphatic and non-English texts). The opt-in vocabulary check
+(JUNK_REQUIRE_VOCABULARY=1) is measured on its own junk class. Exits
+non-zero when the filter on real text costs more than --max-fraction of
+an inference or flags any real text.
+
+Usage:
+    python scripts/bench_junk_filter.py [--repeat 20] [--max-fraction 0.1]
+"""
+
+import argparse
+import os
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+import joblib  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from junk_filter import JunkFilter  # noqa: E402
+
+
+# Real feedback shapes the training CSV does not contain
+REALISTIC = [
+    'App v2.3.1 crashes: ERR 0x80070005 at 10:42',
+    'Why was I billed $49.99 twice?',
+    'Terrible!!!!!!',
+    'Merci beaucoup',
+    'Soooooo good',
+    'Noooooo!!!!!',
+    'Order #A-10293 never arrived (tracking: 1Z999AA10123456784)',
+    '5/5 would recommend :)',
+    'Login fails with code 401 since 03/14/2025',
+    '10/10',
+    'Das ist wirklich schlecht, 2 Sterne',
+    '¡Me encanta la aplicación!',
+    '料金が高すぎます',
+    'Очень медленно работает',
+    '👍👍 great app',
+    'Price went from €9.99 to €14.99 — why?',
+    'ok',
+    'meh...',
+    'WORST. APP. EVER.',
+    'too expensive!!!!!!!!!!!!!!!!!!!!',
+]
+
+
+def make_junk(n, seed=42):
+    rng = random.Random(seed)
+    return {
+        'junk_symbols': [''.join(rng.choices('!@#$%^&*()0123456789 ', k=rng.randint(5, 400))) for _ in range(n)],
+        'junk_repeated_chars': [rng.choice('a!?.x') * rng.randint(10, 2000) for _ in range(n)],
+        'junk_repeated_words': [' '.join([rng.choice(['lol', 'test', 'asdf'])] * rng.randint(6, 300)) for _ in range(n)],
+        'junk_no_vocabulary': [
+            ' '.join(''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))) for _ in range(rng.randint(2, 30)))
+            for _ in range(n)
+        ]
+    }
+
+
+def per_text_us(fn, texts, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            fn(text)
+    return (time.perf_counter() - start) / (repeat * len(texts)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20, help='passes over the texts per measurement')
+    parser.add_argument('--max-fraction', type=float, default=0.1, help='allowed filter cost as a fraction of inference')
+    args = parser.parse_args()
+
+    model = joblib.load('textcat_model.pkl')
+    vectorizer = joblib.load('tfidf_vectorizer.pkl')
+    junk_filter = JunkFilter.from_vectorizer(vectorizer)
+    strict_filter = JunkFilter.from_vectorizer(vectorizer, require_vocabulary=True)
+    feedback = pd.read_csv('customer_feedback.csv')['feedback_text'].tolist()
+    long_feedback = [' '.join(random.Random(i).sample(feedback, 40))[:5000] for i in range(50)]
+    junk = make_junk(200)
+
+    def infer(text):
+        text_vec = vectorizer.transform([text])
+        model.predict(text_vec)
+        model.predict_proba(text_vec)
+
+    print("=" * 60)
+    print(f"🧹 Junk filter benchmark ({len(feedback)} feedback texts, {sum(map(len, junk.values()))} junk texts)")
+    print("=" * 60)
+
+    inference_us = per_text_us(infer, feedback, max(1, args.repeat // 4))
+    filter_us = per_text_us(junk_filter.check, feedback, args.repeat)
+    long_inference_us = per_text_us(infer, long_feedback, max(1, args.repeat // 4))
+    long_filter_us = per_text_us(junk_filter.check, long_feedback, args.repeat)
+    print(f"{'':<26}{'filter µs':>10}{'inference µs':>14}{'fraction':>10}")
+    print(f"{'feedback (passes)':<26}{filter_us:>10.1f}{inference_us:>14.1f}{filter_us / inference_us:>10.3f}")
+    print(f"{'~5000-char feedback':<26}{long_filter_us:>10.1f}{long_inference_us:>14.1f}"
+          f"{long_filter_us / long_inference_us:>10.3f}")
+
+    failures = []
+    for reason, texts in junk.items():
+        checker = strict_filter if reason == 'junk_no_vocabulary' else junk_filter
+        caught = [checker.reason(text) for text in texts]
+        caught_us = per_text_us(checker.check, texts, args.repeat)
+        print(f"{reason:<26}{caught_us:>10.1f}{'':>14}{caught_us / inference_us:>10.3f}  "
+              f"caught {sum(r is not None for r in caught)}/{len(texts)} "
+              f"(as {reason}: {sum(r == reason for r in caught)})")
+
+    flagged = []
+    for name, texts in (('customer_feedback.csv', feedback), ('realistic live feedback', REALISTIC)):
+        found = [(text, junk_filter.reason(text)) for text in texts if junk_filter.reason(text)]
+        print(f"\nFalse positives on {name}: {len(found)}/{len(texts)}")
+        for text, reason in found[:5]:
+            print(f"   {reason}: {text[:70]}")
+        flagged.extend(found)
+
+    for name, fraction in (('feedback', filter_us / inference_us), ('long feedback', long_filter_us / long_inference_us)):
+        if fraction > args.max_fraction:
+            failures.append(f"filter costs {fraction:.3f} of an inference on {name} (limit {args.max_fraction})")
+    if flagged:
+        failures.append(f"{len(flagged)} real texts flagged as junk")
+    if failures:
+        print(f"\n❌ {'; '.join(failures)}")
+        sys.exit(1)
+    print(f"\n✅ Filter costs under {args.max_fraction:.0%} of an inference and flags no real text")
+
+
+if __name__ == '__main__':
+    main()
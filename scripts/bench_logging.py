@@ -0,0 +1,90 @@
+"""
+Logging Overhead Benchmark
+Drives /predict from several threads through the Flask test client with
+logging off, with the synchronous StreamHandler (LOG_PIPELINE=sync) and with
+the queue-based JSON pipeline (LOG_PIPELINE=async). Each mode runs in a
+fresh interpreter whose stdout is a pipe drained by this process.
+
+Usage:
+    python scripts/bench_logging.py [--threads 8] [--requests 500]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CHILD = """
+import sys, threading, time
+import app
+client_app = app.app
+threads, per_thread = int(sys.argv[1]), int(sys.argv[2])
+texts = ['The app crashes when I upload a file %d' % i for i in range(per_thread)]
+
+def worker():
+    client = client_app.test_client()
+    for text in texts:
+        client.post('/predict', json={'text': text})
+
+start = time.perf_counter()
+pool = [threading.Thread(target=worker) for _ in range(threads)]
+for t in pool: t.start()
+for t in pool: t.join()
+elapsed = time.perf_counter() - start
+sys.stderr.write(f"RESULT {threads * per_thread / elapsed:.1f} {app.LOGGING_PIPELINE.dropped}\\n")
+"""
+
+MODES = (
+    ('logging off', {'LOG_LEVEL': 'OFF'}),
+    ('sync StreamHandler', {'LOG_PIPELINE': 'sync'}),
+    ('async pipeline', {'LOG_PIPELINE': 'async', 'LOG_SAMPLE_RATE': '0.1'}),
+    ('async, no sampling', {'LOG_PIPELINE': 'async', 'LOG_SAMPLE_RATE': '1.0'}),
+)
+
+
+def run_mode(env_overrides, threads, requests):
+    env = dict(os.environ)
+    env.pop('DATABASE_URL', None)
+    env['STORAGE_BACKEND'] = 'none'
+    env['NEAR_DUPLICATE_MAX_ENTRIES'] = '0'  # measure full inference on every request
+    env.update(env_overrides)
+    child = subprocess.Popen(
+        [sys.executable, '-c', CHILD, str(threads), str(requests)],
+        cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    stdout, stderr = child.communicate()
+    log_bytes = len(stdout)
+    stderr = stderr.decode()
+    result = [line for line in stderr.splitlines() if line.startswith('RESULT')]
+    if not result:
+        raise RuntimeError(stderr.strip().splitlines()[-1])
+    _, rps, dropped = result[-1].split()
+    # The sync handler writes to stderr, so count those bytes too
+    log_bytes += sum(len(line) + 1 for line in stderr.splitlines() if not line.startswith('RESULT'))
+    return float(rps), int(dropped), log_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=500, help='requests per thread')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("📝 LOGGING OVERHEAD BENCHMARK")
+    print("=" * 60)
+    print(f"{args.threads} threads x {args.requests} requests\n")
+    print(f"{'mode':<22} | {'req/s':>8} | {'log KB':>8} | {'dropped':>7}")
+    print("-" * 55)
+    baseline = None
+    for label, env in MODES:
+        rps, dropped, log_bytes = run_mode(env, args.threads, args.requests)
+        baseline = baseline or rps
+        print(f"{label:<22} | {rps:>8.1f} | {log_bytes / 1024:>8.1f} | {dropped:>7}  ({rps / baseline:.0%} of off)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Long Text Benchmark
+Latency and peak traced memory of chunked classification (long_text.py)
+by document size, against vectorizing the whole document at once, plus
+end-to-end /predict/long latency through the Flask test client (junk
+filter, drift and the save of the document's excerpt into a temporary
+SQLite database included).
+
+Usage:
+    python scripts/bench_long_text.py [--sizes 5000,50000,250000,1000000] [--repeat 5]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+os.environ.setdefault('LOG_LEVEL', 'OFF')
+os.environ['STORAGE_BACKEND'] = 'sqlite'
+os.environ['SQLITE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='bench_long_text_'), 'predictions.db')
+
+import pandas as pd  # noqa: E402
+
+import app as textcat  # noqa: E402
+from long_text import classify_long_text  # noqa: E402
+
+
+def make_document(size):
+    feedback = pd.read_csv('customer_feedback.csv')['feedback_text'].tolist()
+    parts, length, i = [], 0, 0
+    while length < size:
+        sentence = feedback[i % len(feedback)]
+        parts.append(sentence)
+        length += len(sentence) + 1
+        i += 1
+    return ' '.join(parts)[:size]
+
+
+def whole_document(text):
+    return textcat.MODEL.predict_proba(textcat.VECTORIZER.transform([text]))[0]
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(timings), peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='5000,50000,250000,1000000')
+    parser.add_argument('--chunk-chars', type=int, default=textcat.LONG_TEXT_CHUNK_CHARS)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    client = textcat.app.test_client()
+
+    print("=" * 60)
+    print(f"📄 Long text benchmark (chunk_chars={args.chunk_chars})")
+    print("=" * 60)
+    print(f"{'chars':>10} {'chunks':>7} | {'chunked ms':>10} {'peak MB':>8} | "
+          f"{'whole ms':>9} {'peak MB':>8} | {'/predict/long ms':>16}")
+    for size in (int(value) for value in args.sizes.split(',')):
+        text = make_document(size)
+        _, n_chunks, _ = classify_long_text(text, textcat.VECTORIZER, textcat.MODEL, args.chunk_chars)
+        chunked_ms, chunked_mb = measure(
+            lambda: classify_long_text(text, textcat.VECTORIZER, textcat.MODEL, args.chunk_chars), args.repeat
+        )
+        whole_ms, whole_mb = measure(lambda: whole_document(text), args.repeat)
+        http_ms, _ = measure(
+            lambda: client.post('/predict/long', json={'text': text, 'chunk_chars': args.chunk_chars}), args.repeat
+        )
+        print(f"{size:>10,} {n_chunks:>7} | {chunked_ms:>10.1f} {chunked_mb:>8.2f} | "
+              f"{whole_ms:>9.1f} {whole_mb:>8.2f} | {http_ms:>16.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Near-Duplicate Short-Circuit Benchmark
+End-to-end cost of a /predict request (Flask test client, embedded SQLite
+storage, similarity index and drift monitoring on) when the near-duplicate
+index is off, when it misses (lookup plus inference) and when it hits (the
+stored classification, TF-IDF terms and drift analysis are reused), so the
+saving of a hit is measured on the whole request rather than on the
+skipped predict() alone.
+
+Usage:
+    python scripts/bench_near_duplicates.py [--requests 2000]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+DATA_DIR = tempfile.mkdtemp(prefix='bench_near_duplicates_')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ['STORAGE_BACKEND'] = 'sqlite'
+os.environ['SQLITE_PATH'] = os.path.join(DATA_DIR, 'predictions.db')
+
+import pandas as pd  # noqa: E402
+
+import app as api  # noqa: E402
+
+ROUND = 100  # requests per case before switching to the next
+
+
+def unique_texts(feedback, n, seed):
+    """n texts that are not near-duplicates of each other: random pairs of feedback"""
+    rng = random.Random(seed)
+    return [f"{rng.choice(feedback)} {rng.choice(feedback)}" for _ in range(n)]
+
+
+def run(client, texts):
+    """Per-request wall time in µs of one /predict call per text"""
+    samples = []
+    for text in texts:
+        start = time.perf_counter()
+        response = client.post('/predict', json={'text': text})
+        samples.append((time.perf_counter() - start) * 1e6)
+        if response.status_code != 200:
+            raise RuntimeError(f"/predict returned {response.status_code}: {response.get_data(as_text=True)}")
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    feedback = pd.read_csv('customer_feedback.csv')['feedback_text'].astype(str).str.strip().tolist()
+    client = api.app.test_client()
+    index = api.NEAR_DUPLICATES
+    max_entries = index.max_entries
+
+    print("=" * 64)
+    print(f"♻️  Near-duplicate benchmark ({args.requests:,} /predict requests per case, SQLite storage)")
+    print("=" * 64)
+
+    run(client, unique_texts(feedback, 200, seed=0))  # warm up
+    results = {'index off': [], 'miss (lookup + inference)': [], 'hit (reused)': []}
+    # Cases alternate in rounds so the growing table and indexes weigh on all of them
+    for round_seed in range(1, args.requests // ROUND + 1):
+        index.max_entries = 0
+        results['index off'] += run(client, unique_texts(feedback, ROUND, seed=2 * round_seed))
+        index.max_entries = max_entries
+        seen = unique_texts(feedback, ROUND, seed=2 * round_seed + 1)
+        results['miss (lookup + inference)'] += run(client, seen)
+        # Case and punctuation changes normalize away: each variant hits its original
+        results['hit (reused)'] += run(client, [f"{text.upper()} !!" for text in seen])
+    hits = api.NEAR_DUPLICATE_LOOKUPS.labels(result='hit')._value.get()
+
+    print(f"{'case':<28} | {'mean µs':>8} | {'p50 µs':>8} | {'p99 µs':>8}")
+    print("-" * 64)
+    for label, samples in results.items():
+        samples.sort()
+        print(f"{label:<28} | {statistics.mean(samples):>8.0f} | {samples[len(samples) // 2]:>8.0f} | "
+              f"{samples[int(len(samples) * 0.99) - 1]:>8.0f}")
+
+    off, hit = statistics.median(results['index off']), statistics.median(results['hit (reused)'])
+    print(f"\nA hit saves {(off - hit) / off:.0%} of a request with the index off ({hits:.0f} hits counted)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Out-of-Core Training Benchmark
+Writes a synthetic corpus (customer_feedback.csv sentences recombined) in
+streamed chunks, then trains on it in-memory (train_model.train) and
+out-of-core (training_stream.py), each in a fresh subprocess, and reports
+wall time, accuracy and peak RSS of the trainer plus its worker processes.
+
+Usage:
+    python scripts/bench_out_of_core.py [--rows 2000000] [--chunk-rows 50000] [--workers N]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+
+def write_corpus(path, rows, seed=42, chunk=200_000):
+    source = pd.read_csv('customer_feedback.csv')
+    rng = np.random.default_rng(seed)
+    texts = source['feedback_text'].to_numpy()
+    categories = source['category'].to_numpy()
+    words = ' '.join(texts).split()
+    for offset in range(0, rows, chunk):
+        n = min(chunk, rows - offset)
+        picks = rng.integers(0, len(source), n)
+        extras = rng.integers(0, len(words), (n, 3))
+        pd.DataFrame({
+            'feedback_text': [f"{texts[p]} {words[a]} {words[b]} {words[c]}"
+                              for p, (a, b, c) in zip(picks, extras)],
+            'category': categories[picks]
+        }).to_csv(path, mode='a', header=offset == 0, index=False)
+
+
+def run_trainer(mode, data_path, chunk_rows, workers):
+    """Child process: train once and print timings and peak RSS as JSON"""
+    import resource
+
+    import train_model
+    from training_stream import train_out_of_core
+
+    start = time.perf_counter()
+    if mode == 'in-memory':
+        _, _, accuracy, _ = train_model.train(data_path, use_cache=False, verbose=False)
+    else:
+        _, _, accuracy, _ = train_out_of_core(
+            data_path, train_model.TEXT_COLUMN, train_model.LABEL_COLUMN,
+            max_features=train_model.MAX_FEATURES, chunk_rows=chunk_rows, workers=workers,
+            verbose=False, **train_model.TOKENIZER_SETTINGS
+        )
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        'seconds': elapsed,
+        'accuracy': accuracy,
+        # ru_maxrss is in KiB on Linux
+        'parent_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'worker_mb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--chunk-rows', type=int, default=50_000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--skip-in-memory', action='store_true')
+    parser.add_argument('--run', choices=['in-memory', 'out-of-core'], help=argparse.SUPPRESS)
+    parser.add_argument('--data', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_trainer(args.run, args.data, args.chunk_rows, args.workers)
+        return
+
+    print("=" * 60)
+    print(f"🏗️  Out-of-core training benchmark ({args.rows:,} rows, "
+          f"chunk_rows={args.chunk_rows:,}, workers={args.workers or os.cpu_count()})")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = os.path.join(tmp, 'corpus.csv')
+        start = time.perf_counter()
+        write_corpus(data_path, args.rows)
+        print(f"Corpus written in {time.perf_counter() - start:.1f}s "
+              f"({os.path.getsize(data_path) / 1e6:.0f} MB)\n")
+
+        modes = ['out-of-core'] if args.skip_in_memory else ['in-memory', 'out-of-core']
+        print(f"{'mode':<14}{'seconds':>9}{'accuracy':>10}{'parent MB':>11}{'worker MB':>11}")
+        for mode in modes:
+            command = [sys.executable, __file__, '--run', mode, '--data', data_path,
+                       '--chunk-rows', str(args.chunk_rows)]
+            if args.workers:
+                command += ['--workers', str(args.workers)]
+            output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            worker_mb = f"{result['worker_mb']:.0f}" if mode == 'out-of-core' else '-'
+            print(f"{mode:<14}{result['seconds']:>9.1f}{result['accuracy']:>10.4f}"
+                  f"{result['parent_mb']:>11.0f}{worker_mb:>11}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Serialization Benchmark
+Compares stdlib JSON (Flask's default provider), orjson and MessagePack on
+single /predict responses and /predict/batch payloads, first as raw
+encode/decode and then end to end through the Flask test client.
+
+Usage:
+    python scripts/bench_serialization.py [--batch 1000] [--repeat 50]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+os.environ.setdefault('LOG_LEVEL', 'OFF')
+os.environ.pop('DATABASE_URL', None)
+os.environ['STORAGE_BACKEND'] = 'none'
+
+import msgpack  # noqa: E402
+import orjson  # noqa: E402
+import pandas as pd  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+import app as textcat  # noqa: E402
+from json_provider import OrjsonProvider  # noqa: E402
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--batch', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    texts = pd.read_csv('customer_feedback.csv')['feedback_text'].astype(str).tolist()
+    batch_texts = (texts * (args.batch // len(texts) + 1))[:args.batch]
+    client = textcat.app.test_client()
+
+    single = client.post('/predict', json={'text': texts[0]}).get_json()
+    batch = client.post('/predict/batch', json={'texts': batch_texts}).get_json()
+
+    print("=" * 60)
+    print("📦 SERIALIZATION BENCHMARK")
+    print("=" * 60)
+    print(f"\nRaw encode + decode (best of {args.repeat}, ms)")
+    print(f"{'payload':<14} | {'stdlib json':>11} | {'orjson':>8} | {'msgpack':>8}")
+    print("-" * 52)
+    for label, payload in (('single', single), (f'batch x{args.batch}', batch)):
+        stdlib = best_of(lambda: json.loads(json.dumps(payload, sort_keys=True, separators=(',', ':'))), args.repeat)
+        fast = best_of(lambda: orjson.loads(orjson.dumps(payload)), args.repeat)
+        packed = best_of(lambda: msgpack.unpackb(msgpack.packb(payload)), args.repeat)
+        print(f"{label:<14} | {stdlib:>11.3f} | {fast:>8.3f} | {packed:>8.3f}")
+
+    print(f"\nEnd to end through the test client (best of {args.repeat}, ms)")
+    print(f"{'request':<22} | {'stdlib':>8} | {'orjson':>8} | {'msgpack':>8}")
+    print("-" * 56)
+    packed_batch = msgpack.packb({'texts': batch_texts})
+    packed_single = msgpack.packb({'text': texts[0]})
+    for label, path, body, packed in (
+        ('/predict', '/predict', {'text': texts[0]}, packed_single),
+        (f'/predict/batch x{args.batch}', '/predict/batch', {'texts': batch_texts}, packed_batch),
+    ):
+        timings = []
+        for provider in (DefaultJSONProvider, OrjsonProvider):
+            textcat.app.json = provider(textcat.app)
+            timings.append(best_of(lambda: client.post(path, json=body), args.repeat))
+        timings.append(best_of(lambda: client.post(
+            path, data=packed, content_type='application/msgpack',
+            headers={'Accept': 'application/msgpack'}
+        ), args.repeat))
+        print(f"{label:<22} | {timings[0]:>8.3f} | {timings[1]:>8.3f} | {timings[2]:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
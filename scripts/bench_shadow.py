@@ -0,0 +1,77 @@
+"""
+Shadow Scoring Benchmark
+/predict latency through the Flask test client with no shadow model and
+with a candidate shadow-scoring every request (sample rate 1.0), plus how
+many samples the CPU budget scored versus dropped.
+
+Usage:
+    python scripts/bench_shadow.py [--requests 2000] [--cpu-budget 0.1]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+os.environ.setdefault('LOG_LEVEL', 'OFF')
+os.environ['STORAGE_BACKEND'] = 'none'
+os.environ['NEAR_DUPLICATE_MAX_ENTRIES'] = '0'  # every request runs the primary model
+
+import pandas as pd  # noqa: E402
+from sklearn.naive_bayes import MultinomialNB  # noqa: E402
+
+import app as textcat  # noqa: E402
+from shadow import ShadowScorer  # noqa: E402
+
+
+def measure(client, texts):
+    timings = []
+    for text in texts:
+        start = time.perf_counter()
+        client.post('/predict', json={'text': text})
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--cpu-budget', type=float, default=0.1)
+    args = parser.parse_args()
+
+    feedback = pd.read_csv('customer_feedback.csv')
+    texts = (feedback['feedback_text'].tolist() * (args.requests // len(feedback) + 1))[:args.requests]
+    # Candidate: same features, stronger smoothing
+    candidate = MultinomialNB(alpha=5.0).fit(
+        textcat.VECTORIZER.transform(feedback['feedback_text']), feedback['category']
+    )
+    client = textcat.app.test_client()
+
+    print("=" * 60)
+    print(f"👥 Shadow scoring benchmark ({args.requests:,} requests, cpu_budget={args.cpu_budget})")
+    print("=" * 60)
+
+    textcat.SHADOW = None
+    measure(client, texts[:200])  # warm up
+    base_p50, base_p99 = measure(client, texts)
+
+    textcat.SHADOW = ShadowScorer(candidate, textcat.VECTORIZER, sample_rate=1.0, cpu_budget=args.cpu_budget)
+    shadow_p50, shadow_p99 = measure(client, texts)
+    time.sleep(1)
+    snapshot = textcat.SHADOW.snapshot()
+
+    print(f"{'':<16}{'p50 ms':>9}{'p99 ms':>9}")
+    print(f"{'no shadow':<16}{base_p50:>9.3f}{base_p99:>9.3f}")
+    print(f"{'shadow (100%)':<16}{shadow_p50:>9.3f}{shadow_p99:>9.3f}")
+    print(f"\nSampled {snapshot['sampled']:,}: scored {snapshot['scored']:,}, dropped {snapshot['dropped']:,}, "
+          f"agreement {snapshot['agreement_rate']:.3f}")
+
+
+if __name__ == '__main__':
+    main()
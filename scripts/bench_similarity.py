@@ -0,0 +1,133 @@
+"""
+Similarity Search Benchmark
+Builds the inverted similarity index over a synthetic corpus of stored
+predictions (resampled from customer_feedback.csv with random term dropout)
+and reports build throughput, memory and top-k query latency. Then a fresh
+worker's background catch-up (SimilaritySyncJob, which fetches and
+vectorizes stored texts) runs against a table of --catch-up-rows texts
+while queries keep hitting the index, as /similar does.
+
+Usage:
+    python scripts/bench_similarity.py [--rows 1000000] [--queries 200] [--catch-up-rows 100000]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import normalize
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+from similarity_index import SimilarityIndex, SimilaritySyncJob  # noqa: E402
+
+
+def synthetic_rows(base, categories, rows, rng):
+    """Resample base TF-IDF rows, dropping ~30% of terms so documents differ"""
+    picks = rng.integers(0, base.shape[0], size=rows)
+    matrix = base[picks].tocsr()
+    matrix.data *= rng.random(len(matrix.data)) > 0.3
+    matrix.eliminate_zeros()
+    return normalize(matrix), categories[picks]
+
+
+def percentile_ms(samples, q):
+    return np.percentile(samples, q) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--chunk', type=int, default=100_000)
+    parser.add_argument('--catch-up-rows', type=int, default=100_000)
+    parser.add_argument('--sync-cpu-budget', type=float, default=0.5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    vectorizer = joblib.load('tfidf_vectorizer.pkl')
+    df = pd.read_csv('customer_feedback.csv')
+    base = vectorizer.transform(df['feedback_text'].astype(str))
+    categories = df['category'].to_numpy()
+
+    print("=" * 60)
+    print("🔎 SIMILARITY SEARCH BENCHMARK")
+    print("=" * 60)
+
+    index = SimilarityIndex(len(vectorizer.vocabulary_))
+    build_s = 0.0
+    total_nnz = 0
+    for start in range(0, args.rows, args.chunk):
+        size = min(args.chunk, args.rows - start)
+        matrix, labels = synthetic_rows(base, categories, size, rng)
+        total_nnz += matrix.nnz
+        t0 = time.perf_counter()
+        index.add_batch(np.arange(start + 1, start + size + 1), matrix, labels)
+        build_s += time.perf_counter() - t0
+
+    print(f"Indexed rows:      {len(index):,} ({total_nnz:,} postings)")
+    print(f"Build throughput:  {len(index) / build_s:,.0f} rows/s")
+
+    index_path = Path('/tmp') / f"similarity_bench_{os.getpid()}.npz"
+    t0 = time.perf_counter()
+    index.save(index_path)
+    save_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    SimilarityIndex.load(index_path, len(vectorizer.vocabulary_))
+    load_s = time.perf_counter() - t0
+    print(f"Persisted size:    {index_path.stat().st_size / 1e6:.1f} MB "
+          f"(save {save_s:.2f}s, load {load_s:.2f}s)")
+    index_path.unlink()
+
+    queries = vectorizer.transform(
+        df['feedback_text'].sample(args.queries, replace=True, random_state=7).astype(str)
+    )
+
+    print(f"\n{'query':<22} | {'p50 ms':>8} | {'p99 ms':>8}")
+    print("-" * 44)
+    for label, category in (('all categories', None), ('category filter', 'Bug Report')):
+        samples = []
+        for i in range(queries.shape[0]):
+            t0 = time.perf_counter()
+            index.query(queries[i], args.top_k, category)
+            samples.append(time.perf_counter() - t0)
+        print(f"{label:<22} | {percentile_ms(samples, 50):>8.2f} | {percentile_ms(samples, 99):>8.2f}")
+
+    # A fresh worker: empty index, a table written by other workers
+    texts = df['feedback_text'].astype(str).to_numpy()
+    picks = rng.integers(0, len(texts), size=args.catch_up_rows)
+    table = [(row_id, texts[pick], categories[pick]) for row_id, pick in enumerate(picks, start=1)]
+    fresh = SimilarityIndex(len(vectorizer.vocabulary_))
+    job = SimilaritySyncJob(
+        fresh, lambda after_id, limit: table[after_id:after_id + limit], vectorizer.transform,
+        cpu_budget=args.sync_cpu_budget
+    )
+    catch_up = threading.Thread(target=job.run_once)
+    t0 = time.perf_counter()
+    catch_up.start()
+    samples = []
+    while catch_up.is_alive():
+        query = queries[len(samples) % queries.shape[0]]
+        q0 = time.perf_counter()
+        fresh.query(query, args.top_k)
+        samples.append(time.perf_counter() - q0)
+        time.sleep(0.005)
+    catch_up_s = time.perf_counter() - t0
+
+    rate = len(fresh) / catch_up_s
+    print(f"\nBackground catch-up ({args.sync_cpu_budget:.0%} of a core): {len(fresh):,} rows in "
+          f"{catch_up_s:.1f}s ({rate:,.0f} rows/s, {args.rows:,} rows in ~{args.rows / rate / 60:.0f} min)")
+    print(f"{'query during catch-up':<22} | {percentile_ms(samples, 50):>8.2f} | {percentile_ms(samples, 99):>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Startup Benchmark
+Measures cold-start cost of app.py: import time per module (python -X importtime)
+and time-to-first-successful-prediction, in default and lean startup modes.
+
+Usage:
+    python scripts/bench_startup.py [--runs 5] [--top 15]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Child program: import the app, then issue one /predict through the test client
+FIRST_PREDICTION_SNIPPET = """
+import time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().post('/predict', json={'text': 'The app crashes when I upload files'})
+assert response.status_code == 200, response.get_data(as_text=True)
+done = time.perf_counter()
+print(f"{imported - start:.6f} {done - start:.6f}")
+"""
+
+
+def child_env(lean):
+    """Environment for a fresh interpreter, without a database"""
+    env = dict(os.environ)
+    env.pop('DATABASE_URL', None)
+    env['STORAGE_BACKEND'] = 'none'
+    env['LEAN_STARTUP'] = '1' if lean else '0'
+    return env
+
+
+def time_to_first_prediction(lean, runs):
+    """Return (import_seconds, first_prediction_seconds) samples"""
+    imports, firsts = [], []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-c', FIRST_PREDICTION_SNIPPET],
+            cwd=ROOT,
+            env=child_env(lean),
+            capture_output=True,
+            text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1])
+        import_s, first_s = result.stdout.strip().splitlines()[-1].split()
+        imports.append(float(import_s))
+        firsts.append(float(first_s))
+    return imports, firsts
+
+
+def import_profile(lean, top):
+    """Return the slowest top-level imports as (cumulative_us, module) pairs"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=ROOT,
+        env=child_env(lean),
+        capture_output=True,
+        text=True
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Direct imports of app.py are nested exactly one level under it
+        depth = len(name) - len(name.lstrip(' '))
+        if depth == 3:
+            entries.append((int(cumulative), name.strip()))
+    return sorted(entries, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters per mode')
+    parser.add_argument('--top', type=int, default=15, help='slowest imports to list')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🚀 STARTUP BENCHMARK")
+    print("=" * 60)
+
+    for lean in (False, True):
+        mode = 'lean' if lean else 'default'
+        imports, firsts = time_to_first_prediction(lean, args.runs)
+        print(f"\n📦 Mode: {mode} (median of {args.runs} runs)")
+        print(f"   import app:                 {statistics.median(imports) * 1000:8.1f} ms")
+        print(f"   time to first prediction:   {statistics.median(firsts) * 1000:8.1f} ms")
+        print(f"   slowest imports (cumulative):")
+        for cumulative_us, name in import_profile(lean, args.top):
+            print(f"     {cumulative_us / 1000:8.1f} ms  {name}")
+
+    print()
+
+
+if __name__ == '__main__':
+    main()
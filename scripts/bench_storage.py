@@ -0,0 +1,117 @@
+"""
+Storage Benchmark
+Compares the SQLite backend (WAL + group commit) with PostgreSQL (when
+DATABASE_URL is set) on concurrent single-row saves like /predict, 100-row
+batch saves like /predict/batch, /stats aggregation and a full export. A
+naive SQLite baseline (one connection and one commit per save) shows what
+group commit buys.
+
+Usage:
+    python scripts/bench_storage.py [--saves 5000] [--threads 8]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+from storage import PostgresStorage, SQLiteStorage  # noqa: E402
+
+CATEGORIES = ['Bug Report', 'Feature Request', 'Positive Feedback', 'Pricing Complaint', 'Support Issue']
+
+
+def row(i):
+    return (f"synthetic feedback number {i} about the product", CATEGORIES[i % 5], 0.5 + (i % 50) / 100)
+
+
+def concurrent(save, total, threads):
+    """Writes/sec for `total` single-row saves spread over `threads` threads"""
+    per_thread = total // threads
+
+    def worker(offset):
+        for i in range(per_thread):
+            save([row(offset + i)])
+
+    workers = [threading.Thread(target=worker, args=(t * per_thread,)) for t in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return per_thread * threads / (time.perf_counter() - start)
+
+
+def naive_sqlite_save(path):
+    local = threading.local()
+
+    def save(rows):
+        if not hasattr(local, 'conn'):
+            local.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+            local.conn.execute("PRAGMA journal_mode=WAL")
+        for text, category, confidence in rows:
+            local.conn.execute(
+                "INSERT INTO predictions (text, category, confidence, created_at) VALUES (?, ?, ?, datetime('now'))",
+                (text, category, confidence)
+            )
+    return save
+
+
+def bench(label, storage, args):
+    storage.init()
+    print(f"\n{label}")
+    rate = concurrent(storage.save, args.saves, args.threads)
+    commits = f"  ({storage.commits} commits)" if isinstance(storage, SQLiteStorage) else ''
+    print(f"  single-row saves ({args.threads} threads): {rate:>10,.0f} rows/s{commits}")
+
+    batch = [row(i) for i in range(100)]
+    start = time.perf_counter()
+    for _ in range(args.batches):
+        storage.save(batch)
+    elapsed = time.perf_counter() - start
+    print(f"  100-row batch saves:             {args.batches * 100 / elapsed:>10,.0f} rows/s")
+
+    start = time.perf_counter()
+    total, _ = storage.stats()
+    print(f"  stats over {total:,} rows:        {(time.perf_counter() - start) * 1000:>10.1f} ms")
+
+    start = time.perf_counter()
+    exported = sum(len(rows) for rows in storage.export_batches())
+    print(f"  export:                          {exported / (time.perf_counter() - start):>10,.0f} rows/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--saves', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--batches', type=int, default=50)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🗄️  Storage backend benchmark")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        naive_path = os.path.join(tmp, 'naive.db')
+        SQLiteStorage(naive_path).init()
+        rate = concurrent(naive_sqlite_save(naive_path), args.saves, args.threads)
+        print(f"\nSQLite, commit per save (baseline)")
+        print(f"  single-row saves ({args.threads} threads): {rate:>10,.0f} rows/s")
+
+        bench("SQLite, WAL + group commit", SQLiteStorage(os.path.join(tmp, 'predictions.db')), args)
+
+    if os.environ.get('DATABASE_URL'):
+        bench("PostgreSQL (DATABASE_URL)", PostgresStorage(os.environ['DATABASE_URL']), args)
+    else:
+        print("\nPostgreSQL skipped (DATABASE_URL not set)")
+
+
+if __name__ == '__main__':
+    main()
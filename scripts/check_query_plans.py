@@ -0,0 +1,161 @@
+"""
+Query Plan Checks
+Runs the migrations against a scratch PostgreSQL database, seeds synthetic
+predictions across several monthly partitions and checks with EXPLAIN that
+time-range queries are pruned to the matching partition and that
+category + time-range queries use the (category, created_at) index. Also
+exercises the DEFAULT-partition hand-over and the retention job.
+
+DESTRUCTIVE: drops `predictions` and `schema_migrations` in DATABASE_URL
+first, so only point it at a throwaway database. Exits non-zero on failure.
+
+Usage:
+    DATABASE_URL=postgresql://localhost/textcat_scratch \\
+        python scripts/check_query_plans.py --i-know-this-drops-tables [--rows 200000]
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+import migrations  # noqa: E402
+
+CATEGORIES = ['Bug Report', 'Feature Request', 'Praise', 'Complaint', 'Question']
+failures = []
+
+
+def check(name, ok, detail=''):
+    print(f"{'✅' if ok else '❌'} {name}{f'  ({detail})' if detail else ''}")
+    if not ok:
+        failures.append(name)
+
+
+def plan_nodes(cur, query, params):
+    cur.execute(f"EXPLAIN (FORMAT JSON) {query}", params)
+    plan = cur.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    stack, nodes = [plan[0]['Plan']], []
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        stack.extend(node.get('Plans', []))
+    return nodes
+
+
+def scanned_relations(nodes):
+    return {node['Relation Name'] for node in nodes if 'Relation Name' in node}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--i-know-this-drops-tables', dest='confirmed', action='store_true')
+    args = parser.parse_args()
+
+    if not os.environ.get('DATABASE_URL'):
+        parser.error('DATABASE_URL must point at a scratch PostgreSQL database')
+    if not args.confirmed:
+        parser.error('pass --i-know-this-drops-tables to confirm DATABASE_URL is a scratch database')
+
+    print("=" * 60)
+    print("🔎 Query plan checks")
+    print("=" * 60)
+
+    conn = migrations.connect()
+    cur = conn.cursor()
+    cur.execute("DROP TABLE IF EXISTS predictions CASCADE")
+    cur.execute("DROP TABLE IF EXISTS schema_migrations")
+    conn.commit()
+
+    applied = migrations.migrate(conn, months_ahead=6)
+    check('all migrations applied', applied == [version for version, _, _ in migrations.MIGRATIONS], str(applied))
+
+    # Fresh database: the (empty) legacy partition covers the current month,
+    # monthly partitions follow it
+    current = migrations.month_start(datetime.utcnow())
+    first, last = migrations.add_months(current, 1), migrations.add_months(current, 7)
+    cur.execute("""
+        INSERT INTO predictions (text, category, confidence, created_at)
+        SELECT 'synthetic feedback row ' || g, (%s::text[])[1 + g %% 5], random(),
+               %s + (g::float / %s) * (%s - %s)
+        FROM generate_series(0, %s - 1) AS g
+    """, (CATEGORIES, first, args.rows, last, first, args.rows))
+    conn.commit()
+    cur.execute("ANALYZE predictions")
+    conn.commit()
+    print(f"Seeded {args.rows:,} rows between {first:%Y-%m} and {last:%Y-%m}")
+
+    month = migrations.add_months(current, 3)
+    target = f"predictions_p{month:%Y%m}"
+    nodes = plan_nodes(
+        cur,
+        "SELECT id, category FROM predictions WHERE created_at >= %s AND created_at < %s",
+        (month, migrations.add_months(month, 1))
+    )
+    relations = scanned_relations(nodes)
+    check('time range is pruned to one partition', relations == {target}, ', '.join(sorted(relations)))
+
+    day_start = month.replace(day=10)
+    nodes = plan_nodes(
+        cur,
+        "SELECT id FROM predictions WHERE category = %s AND created_at >= %s AND created_at < %s",
+        ('Praise', day_start, day_start.replace(day=11))
+    )
+    indexes = {node.get('Index Name', '') for node in nodes}
+    check(
+        'category + time range uses the (category, created_at) index',
+        any(name.endswith('category_created_at_idx') for name in indexes),
+        ', '.join(sorted(index for index in indexes if index)) or 'no index scan'
+    )
+
+    nodes = plan_nodes(
+        cur,
+        "SELECT count(*) FROM predictions WHERE created_at >= %s",
+        (migrations.add_months(current, 5),)
+    )
+    relations = scanned_relations(nodes)
+    check('open-ended range skips older partitions', target not in relations, ', '.join(sorted(relations)))
+
+    # A row beyond the created months lands in DEFAULT and moves to its
+    # partition once that month is created
+    far = migrations.add_months(current, 12)
+    cur.execute(
+        "INSERT INTO predictions (text, category, confidence, created_at) VALUES ('late', 'Praise', 0.5, %s)",
+        (far,)
+    )
+    conn.commit()
+    created = migrations.ensure_partitions(conn, months_ahead=0, now=far)
+    cur.execute("SELECT count(*) FROM predictions_default")
+    in_default = cur.fetchone()[0]
+    check('DEFAULT rows move into a newly created partition', created == [f"predictions_p{far:%Y%m}"] and in_default == 0,
+          f"created={created}, left in default={in_default}")
+
+    # Retention: pretend it is six months from now and keep three
+    now = migrations.add_months(current, 6)
+    cutoff = migrations.add_months(now, -3)
+    would_drop = migrations.drop_expired_partitions(conn, keep_months=3, dry_run=True, now=now)
+    dropped = migrations.drop_expired_partitions(conn, keep_months=3, now=now)
+    cur.execute("SELECT min(created_at) FROM predictions")
+    oldest = cur.fetchone()[0]
+    check('retention dry run matches the real run', would_drop == dropped, ', '.join(dropped))
+    check('retention drops whole partitions before the cutoff', oldest is not None and oldest >= cutoff,
+          f"oldest row {oldest}, cutoff {cutoff:%Y-%m-%d}")
+
+    conn.close()
+    print()
+    if failures:
+        print(f"❌ {len(failures)} check(s) failed")
+        sys.exit(1)
+    print("✅ All query plan checks passed")
+
+
+if __name__ == '__main__':
+    main()
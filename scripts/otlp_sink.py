@@ -0,0 +1,99 @@
+"""
+OTLP Trace Sink
+A local stand-in for an OpenTelemetry collector: accepts OTLP/HTTP JSON
+trace exports (what the API sends when OTLP_ENDPOINT is set), prints one
+line per trace and optionally appends every span to an NDJSON file.
+
+Only the JSON encoding is supported; protobuf exports get 415. Point the
+API at it with OTLP_ENDPOINT=http://127.0.0.1:4318/v1/traces.
+
+Usage:
+    python scripts/otlp_sink.py [--port 4318] [--output spans.ndjson] [--quiet]
+"""
+
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def spans_of(payload):
+    """Flatten an ExportTraceServiceRequest into span dicts with the service name"""
+    for resource_spans in payload.get('resourceSpans', []):
+        attributes = resource_spans.get('resource', {}).get('attributes', [])
+        service = next((a['value'].get('stringValue') for a in attributes if a.get('key') == 'service.name'), None)
+        for scope_spans in resource_spans.get('scopeSpans', []):
+            for span in scope_spans.get('spans', []):
+                yield dict(span, service=service)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=4318)
+    parser.add_argument('--output', help='append received spans to this NDJSON file')
+    parser.add_argument('--quiet', action='store_true', help='do not print a line per trace')
+    args = parser.parse_args()
+
+    lock = threading.Lock()
+    totals = {'requests': 0, 'traces': 0, 'spans': 0}
+    output = open(args.output, 'a', encoding='utf-8') if args.output else None
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *_):
+            pass
+
+        def do_POST(self):
+            if self.path.rstrip('/') != '/v1/traces':
+                self.send_error(404)
+                return
+            if not self.headers.get('Content-Type', '').startswith('application/json'):
+                self.send_error(415, 'Only OTLP/HTTP JSON is supported')
+                return
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            except ValueError:
+                self.send_error(400, 'Invalid JSON')
+                return
+
+            spans = list(spans_of(payload))
+            roots = [span for span in spans if span.get('kind') == 2]
+            with lock:
+                totals['requests'] += 1
+                totals['traces'] += len(roots)
+                totals['spans'] += len(spans)
+                if output is not None:
+                    for span in spans:
+                        output.write(json.dumps(span, separators=(',', ':')) + '\n')
+                    output.flush()
+                if not args.quiet:
+                    for root in roots:
+                        ms = (int(root['endTimeUnixNano']) - int(root['startTimeUnixNano'])) / 1e6
+                        children = sum(1 for span in spans if span.get('parentSpanId') == root['spanId'])
+                        print(f"{root['traceId']}  {root['name']:<20} {ms:>9.2f} ms  {children} spans")
+
+            body = b'{}'
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    print("=" * 60)
+    print(f"📡 OTLP sink listening on http://{args.host}:{args.port}/v1/traces")
+    print("=" * 60)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if output is not None:
+            output.close()
+        print(f"\n✅ Received {totals['traces']:,} traces ({totals['spans']:,} spans) "
+              f"in {totals['requests']:,} exports")
+
+
+if __name__ == '__main__':
+    main()
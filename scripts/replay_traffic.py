@@ -0,0 +1,237 @@
+"""
+Traffic Replay
+Replays a capture written with TRAFFIC_CAPTURE_DIR (traffic_capture.py)
+against any running build, and compares two runs request by request.
+
+Requests are replayed in capture order and numbered, so runs against two
+builds line up by sequence number. --speed original keeps the captured
+inter-arrival times, a number scales them (2 = twice as fast) and max
+sends as fast as --concurrency clients allow. In scheduled modes latency
+counts from the scheduled send time, so a server that falls behind shows
+it as latency rather than slowing the replay down.
+
+Usage:
+    python scripts/replay_traffic.py replay CAPTURE_DIR --target http://127.0.0.1:5000 \\
+        [--speed original|max|2.0] [--concurrency 32] --output run.ndjson
+    python scripts/replay_traffic.py compare baseline.ndjson candidate.ndjson [--max-p99-ratio 1.2]
+
+A capture directory can be used as the baseline of `compare` to check a
+build against what production answered.
+"""
+
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from traffic_capture import read_capture  # noqa: E402
+
+ENDPOINT_PATHS = {'predict': '/predict', 'predict_batch': '/predict/batch'}
+
+
+def parse_speed(value):
+    if value in ('original', 'max'):
+        return value
+    speed = float(value)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError('speed must be positive')
+    return speed
+
+
+def prediction_of(response):
+    try:
+        payload = response.json()
+    except ValueError:
+        return None
+    if 'results' in payload:
+        return [item.get('prediction') for item in payload['results']]
+    return payload.get('prediction')
+
+
+def replay(records, target, speed, concurrency):
+    """Send every record; returns one result dict per record, in sequence order"""
+    work = queue.Queue()
+    results = [None] * len(records)
+    factor = 1.0 if speed == 'original' else speed
+    start = time.perf_counter() + 0.5
+    first_ts = records[0]['ts'] if records else 0.0
+    for seq, record in enumerate(records):
+        scheduled = None if speed == 'max' else start + (record['ts'] - first_ts) / factor
+        work.put((seq, scheduled, record))
+    for _ in range(concurrency):
+        work.put(None)
+
+    def client():
+        session = requests.Session()
+        while True:
+            item = work.get()
+            if item is None:
+                return
+            seq, scheduled, record = item
+            if scheduled is not None:
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            sent = time.perf_counter()
+            try:
+                response = session.post(target + ENDPOINT_PATHS[record['ep']], json=record['body'], timeout=60)
+                status, output = response.status_code, prediction_of(response)
+            except requests.RequestException as e:
+                status, output = 0, type(e).__name__
+            results[seq] = {
+                'seq': seq,
+                'ep': record['ep'],
+                'status': status,
+                'ms': round((time.perf_counter() - (scheduled or sent)) * 1000, 3),
+                'out': output
+            }
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def load_run(path):
+    """Replay results, or a capture (numbered in replay order) to compare against"""
+    if Path(path).is_file():
+        with open(path, encoding='utf-8') as f:
+            first = json.loads(f.readline() or '{}')
+        if 'seq' in first:
+            with open(path, encoding='utf-8') as f:
+                return {record['seq']: record for record in map(json.loads, f)}
+    return {seq: dict(record, status=200) for seq, record in enumerate(read_capture([path]))}
+
+
+def percentiles(values):
+    values = sorted(values)
+    if not values:
+        return {name: None for name in ('p50', 'p90', 'p99', 'max')}
+
+    def pick(q):
+        return values[min(len(values) - 1, int(len(values) * q))]
+
+    return {'p50': pick(0.5), 'p90': pick(0.9), 'p99': pick(0.99), 'max': values[-1]}
+
+
+def compare(baseline, candidate):
+    common = sorted(set(baseline) & set(candidate))
+    agree = disagree = status_mismatch = 0
+    examples = []
+    for seq in common:
+        a, b = baseline[seq], candidate[seq]
+        if a['status'] != b['status']:
+            status_mismatch += 1
+            continue
+        outputs_a = a['out'] if isinstance(a['out'], list) else [a['out']]
+        outputs_b = b['out'] if isinstance(b['out'], list) else [b['out']]
+        for out_a, out_b in zip(outputs_a, outputs_b):
+            if out_a == out_b:
+                agree += 1
+            else:
+                disagree += 1
+                if len(examples) < 5:
+                    examples.append((seq, out_a, out_b))
+    return {
+        'compared': len(common),
+        'only_in_baseline': len(set(baseline) - set(candidate)),
+        'only_in_candidate': len(set(candidate) - set(baseline)),
+        'status_mismatches': status_mismatch,
+        'agreement': agree / (agree + disagree) if agree + disagree else None,
+        'disagreement_examples': examples,
+        'baseline_latency': percentiles([baseline[seq]['ms'] for seq in common]),
+        'candidate_latency': percentiles([candidate[seq]['ms'] for seq in common])
+    }
+
+
+def cmd_replay(args):
+    records = read_capture(args.capture)
+    if args.limit:
+        records = records[:args.limit]
+    if not records:
+        print("❌ No captured requests found")
+        return 1
+    span = records[-1]['ts'] - records[0]['ts']
+    print("=" * 60)
+    print(f"🔁 Replaying {len(records):,} requests ({span:.0f}s captured) against {args.target} "
+          f"at speed {args.speed}")
+    print("=" * 60)
+    start = time.perf_counter()
+    results = replay(records, args.target.rstrip('/'), args.speed, args.concurrency)
+    elapsed = time.perf_counter() - start
+    with open(args.output, 'w', encoding='utf-8') as f:
+        for result in results:
+            f.write(json.dumps(result, separators=(',', ':')) + '\n')
+    errors = sum(1 for result in results if result['status'] != 200)
+    latency = percentiles([result['ms'] for result in results])
+    print(f"Done in {elapsed:.1f}s ({len(results) / elapsed:.1f} req/s), {errors} non-200 responses")
+    print(f"Latency ms: p50 {latency['p50']:.1f}  p90 {latency['p90']:.1f}  "
+          f"p99 {latency['p99']:.1f}  max {latency['max']:.1f}")
+    print(f"💾 Results written to {args.output}")
+    return 0
+
+
+def cmd_compare(args):
+    report = compare(load_run(args.baseline), load_run(args.candidate))
+    print("=" * 60)
+    print(f"🔍 {args.baseline}  vs  {args.candidate}")
+    print("=" * 60)
+    print(f"Requests compared: {report['compared']:,} (only in baseline {report['only_in_baseline']}, "
+          f"only in candidate {report['only_in_candidate']}, status mismatches {report['status_mismatches']})")
+    if report['agreement'] is not None:
+        print(f"Prediction agreement: {report['agreement'] * 100:.2f}%")
+    for seq, out_a, out_b in report['disagreement_examples']:
+        print(f"   #{seq}: {out_a} -> {out_b}")
+    print(f"\n{'latency ms':<12}{'baseline':>10}{'candidate':>11}{'ratio':>8}")
+    for name in ('p50', 'p90', 'p99', 'max'):
+        a, b = report['baseline_latency'][name], report['candidate_latency'][name]
+        ratio = f"{b / a:.2f}" if a and b is not None else '-'
+        print(f"{name:<12}{a if a is None else round(a, 2):>10}{b if b is None else round(b, 2):>11}{ratio:>8}")
+
+    failures = []
+    if args.min_agreement is not None and (report['agreement'] or 0) < args.min_agreement:
+        failures.append(f"agreement below {args.min_agreement}")
+    base_p99, cand_p99 = report['baseline_latency']['p99'], report['candidate_latency']['p99']
+    if args.max_p99_ratio is not None and base_p99 and cand_p99 > base_p99 * args.max_p99_ratio:
+        failures.append(f"p99 regressed more than {args.max_p99_ratio}x")
+    if failures:
+        print(f"\n❌ {'; '.join(failures)}")
+        return 1
+    print("\n✅ Within thresholds")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    replay_parser = subparsers.add_parser('replay', help='send a capture to a running build')
+    replay_parser.add_argument('capture', nargs='+', help='capture directory, files or globs')
+    replay_parser.add_argument('--target', default='http://127.0.0.1:5000')
+    replay_parser.add_argument('--speed', type=parse_speed, default='original')
+    replay_parser.add_argument('--concurrency', type=int, default=32)
+    replay_parser.add_argument('--limit', type=int, help='replay only the first N requests')
+    replay_parser.add_argument('--output', required=True)
+
+    compare_parser = subparsers.add_parser('compare', help='compare two runs (or a capture and a run)')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.add_argument('--min-agreement', type=float, help='fail below this agreement (0-1)')
+    compare_parser.add_argument('--max-p99-ratio', type=float, help='fail if candidate p99 exceeds baseline p99 times this')
+
+    args = parser.parse_args()
+    sys.exit(cmd_replay(args) if args.command == 'replay' else cmd_compare(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+"""
+Memory Soak Test
+Runs sustained, varied traffic against the app under gunicorn, samples
+every worker's RSS, and fails if memory keeps growing once the bounded
+caches (near-duplicate index, idempotency keys, trace store) have filled.
+
+Traffic is open-loop at --rate requests/s: mostly /predict with texts
+made unique by random tokens, plus /predict/batch, requests carrying
+Idempotency-Key and /explain. RSS is sampled every --interval seconds.
+Samples taken during --warmup are ignored; after it, each worker's growth
+(last minus first sample) must stay under --max-growth-mb, and its
+least-squares slope under --max-slope-mb-per-hour. The slope is only
+enforced over at least --min-slope-window seconds, since extrapolating a
+few minutes of allocator noise to an hour is meaningless. A worker that restarts is
+reported and fails the run. The near-duplicate and idempotency caches are
+shrunk to --cache-entries so they are full before warmup ends: growth
+after that is a leak, not a cache filling up.
+
+With --track-allocations the server runs with MEMORY_TRACKING=1, a
+one-off ADMIN_TOKEN and one worker: a tracemalloc baseline is taken when
+warmup ends, and the top allocation sites that grew are printed from
+/debug/memory at the end.
+Storage is off by default: with --storage sqlite the similarity index
+grows with every stored prediction, which is expected, not a leak.
+
+Usage:
+    python scripts/soak_memory.py [--duration 900] [--warmup 120] [--rate 100] [--workers 2]
+        [--max-growth-mb 20] [--max-slope-mb-per-hour 100] [--cache-entries 1000] [--storage none|sqlite]
+        [--track-allocations] [--output soak.json]
+"""
+
+import argparse
+import json
+import os
+import queue
+import random
+import secrets
+import string
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import psutil
+import requests
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_async_vs_gunicorn import load_feedback, stop_server  # noqa: E402
+
+FEEDBACK = load_feedback()
+
+
+def start_gunicorn(port, workers, env):
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+         '--threads', '2', '--preload', '--timeout', '60', 'app:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if requests.get(f'http://127.0.0.1:{port}/ready', timeout=1).ok:
+                return process
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    stop_server(process)
+    raise RuntimeError("Server did not become ready")
+
+
+def random_text(rng):
+    words = ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9)))
+    return f"{rng.choice(FEEDBACK)} {words} order {rng.randint(1, 10**9)}"
+
+
+def make_request(session, base, rng, i):
+    kind = i % 20
+    if kind == 0:
+        return session.post(f'{base}/predict/batch', json={'texts': [random_text(rng) for _ in range(20)]}, timeout=30)
+    if kind == 1:
+        return session.post(f'{base}/explain', json={'text': random_text(rng)}, timeout=30)
+    if kind in (2, 3):
+        return session.post(f'{base}/predict', json={'text': random_text(rng)},
+                            headers={'Idempotency-Key': f'soak-{i}'}, timeout=30)
+    return session.post(f'{base}/predict', json={'text': random_text(rng)}, timeout=30)
+
+
+def drive(base, rate, duration, stop, stats, senders=16):
+    """Open-loop traffic at `rate` req/s until `duration` elapses or `stop` is set"""
+    schedule = queue.Queue(maxsize=senders * 4)
+    start = time.perf_counter()
+
+    def scheduler():
+        i = 0
+        while not stop.is_set() and time.perf_counter() - start < duration:
+            schedule.put((i, start + i / rate))
+            i += 1
+        for _ in range(senders):
+            schedule.put(None)
+
+    def sender(seed):
+        rng = random.Random(seed)
+        session = requests.Session()
+        while True:
+            item = schedule.get()
+            if item is None:
+                return
+            i, scheduled = item
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                ok = make_request(session, base, rng, i).status_code < 500
+            except requests.RequestException:
+                ok = False
+            with stats['lock']:
+                stats['sent'] += 1
+                stats['errors'] += not ok
+
+    threads = [threading.Thread(target=scheduler)] + [threading.Thread(target=sender, args=(n,)) for n in range(senders)]
+    for t in threads:
+        t.start()
+    return threads
+
+
+def slope_per_hour(samples):
+    """Least-squares slope of (seconds, MB) samples, in MB per hour"""
+    n = len(samples)
+    if n < 2:
+        return 0.0
+    mean_t = sum(t for t, _ in samples) / n
+    mean_m = sum(m for _, m in samples) / n
+    variance = sum((t - mean_t) ** 2 for t, _ in samples)
+    if variance == 0:
+        return 0.0
+    return sum((t - mean_t) * (m - mean_m) for t, m in samples) / variance * 3600
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--duration', type=float, default=900.0, help='seconds of traffic, warmup included')
+    parser.add_argument('--warmup', type=float, default=120.0, help='seconds before samples count')
+    parser.add_argument('--rate', type=float, default=100.0, help='offered requests per second')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--interval', type=float, default=5.0, help='seconds between RSS samples')
+    parser.add_argument('--max-growth-mb', type=float, default=20.0)
+    parser.add_argument('--max-slope-mb-per-hour', type=float, default=100.0)
+    parser.add_argument('--min-slope-window', type=float, default=300.0,
+                        help='seconds after warmup needed before the slope limit applies')
+    parser.add_argument('--cache-entries', type=int, default=1000,
+                        help='near-duplicate and idempotency cache size, small so they fill during warmup (0 = app default)')
+    parser.add_argument('--storage', choices=('none', 'sqlite'), default='none')
+    parser.add_argument('--track-allocations', action='store_true', help='run with MEMORY_TRACKING=1 (one worker)')
+    parser.add_argument('--port', type=int, default=5123)
+    parser.add_argument('--output', help='write samples and verdict as JSON')
+    args = parser.parse_args()
+
+    workers = 1 if args.track_allocations else args.workers
+    env = dict(os.environ, LOG_LEVEL='WARNING', STORAGE_BACKEND=args.storage)
+    scratch = tempfile.mkdtemp(prefix='soak-')
+    env['SQLITE_PATH'] = os.path.join(scratch, 'predictions.db')
+    if args.cache_entries:
+        env['NEAR_DUPLICATE_MAX_ENTRIES'] = env['IDEMPOTENCY_MAX_ENTRIES'] = str(args.cache_entries)
+    if args.track_allocations:
+        env['MEMORY_TRACKING'] = '1'
+        env['ADMIN_TOKEN'] = secrets.token_urlsafe(16)
+    admin = {'Authorization': f"Bearer {env.get('ADMIN_TOKEN', '')}"}
+    base = f'http://127.0.0.1:{args.port}'
+
+    print("=" * 60)
+    print(f"🧪 MEMORY SOAK: {args.duration:.0f}s at {args.rate:.0f} req/s, {workers} workers, "
+          f"storage {args.storage}{', tracemalloc on' if args.track_allocations else ''}")
+    print("=" * 60)
+
+    process = start_gunicorn(args.port, workers, env)
+    master = psutil.Process(process.pid)
+    samples = {}  # pid -> [(seconds, MB)]
+    restarted = set()
+    stop = threading.Event()
+    stats = {'lock': threading.Lock(), 'sent': 0, 'errors': 0}
+    baseline_taken = not args.track_allocations
+    report = None
+    try:
+        start = time.perf_counter()
+        threads = drive(base, args.rate, args.duration, stop, stats)
+        initial = {child.pid for child in master.children()}
+        while any(t.is_alive() for t in threads):
+            time.sleep(args.interval)
+            elapsed = time.perf_counter() - start
+            if not baseline_taken and elapsed >= args.warmup:
+                # Before sampling: the baseline snapshot itself stays in memory
+                requests.post(f'{base}/debug/memory/baseline', headers=admin, timeout=60).raise_for_status()
+                baseline_taken = True
+            for child in master.children():
+                if child.pid not in initial:
+                    restarted.add(child.pid)
+                try:
+                    samples.setdefault(child.pid, []).append((elapsed, child.memory_info().rss / 1e6))
+                except psutil.NoSuchProcess:
+                    restarted.add(child.pid)
+            with stats['lock']:
+                sent, errors = stats['sent'], stats['errors']
+            rss = ', '.join(f"{series[-1][1]:.0f}" for series in samples.values())
+            print(f"  {elapsed:6.0f}s  {sent:>8,} requests  {errors} errors  RSS MB per worker: {rss}")
+        if args.track_allocations:
+            report = requests.get(f'{base}/debug/memory', params={'top': 10}, headers=admin, timeout=120).json()
+    finally:
+        stop.set()
+        stop_server(process)
+
+    print("-" * 60)
+    failures = []
+    results = {}
+    for pid, series in samples.items():
+        steady = [(t, mb) for t, mb in series if t >= args.warmup]
+        if len(steady) < 2:
+            failures.append(f"worker {pid}: not enough samples after warmup")
+            continue
+        growth = steady[-1][1] - steady[0][1]
+        slope = slope_per_hour(steady)
+        results[pid] = {'start_mb': steady[0][1], 'end_mb': steady[-1][1], 'growth_mb': growth, 'slope_mb_per_hour': slope}
+        slope_enforced = steady[-1][0] - steady[0][0] >= args.min_slope_window
+        print(f"worker {pid}: {steady[0][1]:.1f} -> {steady[-1][1]:.1f} MB after warmup "
+              f"(growth {growth:+.1f} MB, slope {slope:+.1f} MB/h{'' if slope_enforced else ', window too short to enforce'})")
+        if growth > args.max_growth_mb:
+            failures.append(f"worker {pid} grew {growth:.1f} MB (limit {args.max_growth_mb})")
+        if slope_enforced and slope > args.max_slope_mb_per_hour:
+            failures.append(f"worker {pid} grows {slope:.1f} MB/h (limit {args.max_slope_mb_per_hour})")
+    if restarted:
+        failures.append(f"workers restarted during the run: {sorted(restarted)}")
+    if stats['errors'] > 0.01 * max(1, stats['sent']):
+        failures.append(f"{stats['errors']} of {stats['sent']} requests failed")
+
+    if report is not None:
+        print(f"\n🔬 tracemalloc since warmup: {report['size_diff_bytes'] / 1e6:+.2f} MB traced, "
+              f"{report['count_diff']:+,} blocks")
+        for stat in report['top_by_size_growth']:
+            print(f"   {stat['size_diff_bytes'] / 1024:+10.1f} KiB {stat['count_diff']:+8,}  {stat['site'][0]}")
+        print(f"   inventory: {json.dumps({k: v for k, v in report['inventory'].items() if k != 'prometheus'})}")
+        print(f"   prometheus samples: {report['inventory']['prometheus']['total_samples']:,}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'args': vars(args), 'samples': {str(pid): series for pid, series in samples.items()},
+                'results': {str(pid): result for pid, result in results.items()},
+                'allocations': report, 'failures': failures
+            }, f, indent=2)
+        print(f"\n💾 Report written to {args.output}")
+
+    if failures:
+        print(f"\n❌ {'; '.join(failures)}")
+        sys.exit(1)
+    print("\n✅ Memory stayed bounded")
+
+
+if __name__ == '__main__':
+    main()
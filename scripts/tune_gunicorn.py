@@ -0,0 +1,294 @@
+"""
+Gunicorn Topology Autotuner
+Starts the app under gunicorn for every combination of --workers,
+--threads and BLAS/OpenMP thread-pool size, finds the highest request
+rate each one sustains with open-loop load at a p99 latency target, and
+prints a capacity report with per-worker memory and a recommended
+configuration.
+
+Open-loop means requests are sent on a fixed schedule whether or not
+earlier ones have finished, and latency is measured from the scheduled
+send time, so a saturated server shows up as growing latency instead of
+a politely slowed-down client. A rate is sustainable when p99 stays under
+the target, at least 95% of the offered rate completes and under 1% of
+requests fail. The load generator runs on the same host, so leave it
+idle and treat results on machines with very few cores as a lower bound.
+
+Requests replay the /predict and /predict/batch texts of a traffic capture
+(TRAFFIC_CAPTURE_DIR, see traffic_capture.py) in order when --capture is
+given, so the near-duplicate hit rate and text lengths are production's;
+otherwise they are random pairs of training texts. Every prediction is
+stored, in a fresh SQLite database per configuration (or in PostgreSQL when
+DATABASE_URL is set).
+
+Usage:
+    pip install -r requirements-dev.txt
+    python scripts/tune_gunicorn.py [--workers 1,2,4] [--threads 1,2,4] [--blas-threads 1,0]
+                                    [--capture captures/] [--p99-ms 100] [--duration 8]
+                                    [--output report.json]
+"""
+
+import argparse
+import json
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import psutil
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_async_vs_gunicorn import load_texts, start_server, stop_server  # noqa: E402
+from traffic_capture import read_capture  # noqa: E402
+
+BLAS_ENV = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS')
+MIN_COMPLETION = 0.95
+MAX_ERROR_RATE = 0.01
+
+
+def gunicorn_command(port, workers, threads):
+    return [
+        sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}',
+        '--workers', str(workers), '--threads', str(threads), '--preload', '--timeout', '60', 'app:app'
+    ]
+
+
+def load_request_texts(capture, n=50_000):
+    """Texts of the captured /predict traffic in order, or n random pairs of training texts"""
+    if not capture:
+        return load_texts(n)
+    texts = []
+    for record in read_capture(capture):
+        body = record['body']
+        if record['ep'] == 'predict':
+            text = body.get('text') or body.get('feedback')
+            if isinstance(text, str):
+                texts.append(text)
+        else:
+            texts.extend(text for text in body.get('texts', []) if isinstance(text, str))
+    if not texts:
+        raise SystemExit(f"No /predict texts in {' '.join(capture)}")
+    return texts
+
+
+def closed_loop_rps(port, concurrency, duration, texts, offset=0):
+    """Back-to-back requests from `concurrency` clients: a rough capacity estimate
+
+    Clients send texts from `offset` on, interleaved.
+    """
+    completed = [0]
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    def client(client_id):
+        session = requests.Session()
+        count = 0
+        while time.time() < stop_at:
+            try:
+                session.post(f'http://127.0.0.1:{port}/predict',
+                             json={'text': texts[(offset + client_id + count * concurrency) % len(texts)]}, timeout=30)
+                count += 1
+            except requests.RequestException:
+                pass
+        with lock:
+            completed[0] += count
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return completed[0] / duration
+
+
+def open_loop(port, rate, duration, texts, offset=0, senders=64):
+    """Offer `rate` req/s for `duration` seconds; latency counts from the scheduled send time
+
+    Request i sends texts[offset + i], wrapping around at the end.
+    """
+    schedule = queue.Queue()
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    start = time.perf_counter() + 0.2
+    n_requests = int(rate * duration)
+    for i in range(n_requests):
+        schedule.put((i, start + i / rate))
+    for _ in range(senders):
+        schedule.put(None)
+
+    def sender():
+        session = requests.Session()
+        local, failed = [], 0
+        while True:
+            item = schedule.get()
+            if item is None:
+                break
+            i, scheduled = item
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                response = session.post(f'http://127.0.0.1:{port}/predict',
+                                        json={'text': texts[(offset + i) % len(texts)]}, timeout=30)
+                if response.status_code != 200:
+                    failed += 1
+            except requests.RequestException:
+                failed += 1
+            local.append(time.perf_counter() - scheduled)
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=sender) for _ in range(senders)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'offered_rps': rate,
+        'achieved_rps': len(latencies) / elapsed,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p99_ms': latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000,
+        'error_rate': errors[0] / max(1, n_requests),
+        'requests': n_requests
+    }
+
+
+def sustainable(result, p99_ms):
+    return (result['p99_ms'] <= p99_ms
+            and result['achieved_rps'] >= MIN_COMPLETION * result['offered_rps']
+            and result['error_rate'] < MAX_ERROR_RATE)
+
+
+def find_max_rps(port, estimate, p99_ms, duration, steps, texts, offset=0):
+    """Bisect the offered rate between 0 and 1.5x the closed-loop estimate"""
+    low, high, best = 0.0, max(estimate * 1.5, 1.0), None
+    for _ in range(steps):
+        rate = (low + high) / 2
+        result = open_loop(port, rate, duration, texts, offset)
+        offset += result['requests']  # the next step continues through the texts
+        if sustainable(result, p99_ms):
+            low, best = rate, result
+        else:
+            high = rate
+    return best
+
+
+def worker_memory(master_pid):
+    """RSS and PSS (pages shared copy-on-write counted fractionally) of each worker, in MB"""
+    rss, pss = [], []
+    for child in psutil.Process(master_pid).children():
+        rss.append(child.memory_info().rss / 1e6)
+        try:
+            pss.append(child.memory_full_info().pss / 1e6)
+        except (AttributeError, psutil.AccessDenied):
+            pass
+    return {
+        'rss_mb': max(rss) if rss else None,
+        'pss_mb': max(pss) if pss else None,
+        'total_rss_mb': sum(rss) + psutil.Process(master_pid).memory_info().rss / 1e6
+    }
+
+
+def recommend(results):
+    """Highest sustainable rate; within 5% of it, the fewest processes, then fewest threads"""
+    viable = [r for r in results if r['max_rps']]
+    if not viable:
+        return None
+    best_rps = max(r['max_rps'] for r in viable)
+    close = [r for r in viable if r['max_rps'] >= 0.95 * best_rps]
+    return min(close, key=lambda r: (r['workers'], r['threads'], -r['max_rps']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--threads', default='1,2,4')
+    parser.add_argument('--blas-threads', default='1,0', help='BLAS/OpenMP pool sizes to try (0 = library default)')
+    parser.add_argument('--capture', nargs='+', help='traffic capture files or directories to take the texts from')
+    parser.add_argument('--p99-ms', type=float, default=100.0)
+    parser.add_argument('--duration', type=float, default=8.0, help='seconds per offered rate')
+    parser.add_argument('--search-steps', type=int, default=5)
+    parser.add_argument('--port', type=int, default=5111)
+    parser.add_argument('--output', help='write the full report as JSON')
+    args = parser.parse_args()
+
+    grid = [
+        (int(w), int(t), int(b))
+        for w in args.workers.split(',') for t in args.threads.split(',') for b in args.blas_threads.split(',')
+    ]
+
+    print("=" * 78)
+    print(f"🎛️  GUNICORN TOPOLOGY AUTOTUNER ({len(grid)} configs, p99 target {args.p99_ms:.0f} ms, "
+          f"{os.cpu_count()} CPUs)")
+    print("=" * 78)
+    texts = load_request_texts(args.capture)
+    print(f"{len(texts):,} request texts from {' '.join(args.capture) if args.capture else 'customer_feedback.csv'}, "
+          f"storage {'PostgreSQL' if os.environ.get('DATABASE_URL') else 'SQLite'}\n")
+    print(f"{'workers':>7} {'threads':>7} {'blas':>5} | {'closed rps':>10} | {'max rps':>8} {'p50 ms':>7} "
+          f"{'p99 ms':>7} | {'RSS/w MB':>8} {'PSS/w MB':>8}")
+    print("-" * 78)
+
+    results = []
+    for workers, threads, blas in grid:
+        extra_env = {name: str(blas) for name in BLAS_ENV} if blas else {}
+        data_dir = tempfile.mkdtemp(prefix='tune_gunicorn_')  # every configuration starts from an empty table
+        process = start_server(gunicorn_command(args.port, workers, threads), args.port, data_dir, extra_env)
+        try:
+            concurrency = workers * threads * 2
+            warmup_rps = closed_loop_rps(args.port, concurrency, 2, texts)
+            offset = round(warmup_rps * 2)
+            estimate_duration = min(args.duration, 5)
+            estimate = closed_loop_rps(args.port, concurrency, estimate_duration, texts, offset)
+            offset += round(estimate * estimate_duration)
+            best = find_max_rps(args.port, estimate, args.p99_ms, args.duration, args.search_steps, texts, offset)
+            memory = worker_memory(process.pid)
+        finally:
+            stop_server(process)
+
+        row = {
+            'workers': workers, 'threads': threads, 'blas_threads': blas or None,
+            'closed_loop_rps': estimate,
+            'max_rps': best['achieved_rps'] if best else 0.0,
+            'at_max': best, **memory
+        }
+        results.append(row)
+        p50 = f"{best['p50_ms']:.1f}" if best else '-'
+        p99 = f"{best['p99_ms']:.1f}" if best else '-'
+        pss = f"{memory['pss_mb']:.0f}" if memory['pss_mb'] else '-'
+        print(f"{workers:>7} {threads:>7} {blas or 'def':>5} | {estimate:>10.1f} | {row['max_rps']:>8.1f} "
+              f"{p50:>7} {p99:>7} | {memory['rss_mb']:>8.0f} {pss:>8}")
+
+    choice = recommend(results)
+    print("-" * 78)
+    if choice is None:
+        print(f"❌ No configuration sustained any load under p99 {args.p99_ms:.0f} ms")
+    else:
+        env = ''.join(f"{name}={choice['blas_threads']} " for name in BLAS_ENV) if choice['blas_threads'] else ''
+        print(f"✅ Recommended: {choice['workers']} workers x {choice['threads']} threads"
+              f"{', BLAS threads ' + str(choice['blas_threads']) if choice['blas_threads'] else ''} "
+              f"-> {choice['max_rps']:.0f} req/s at p99 <= {args.p99_ms:.0f} ms, "
+              f"{choice['total_rss_mb']:.0f} MB total RSS")
+        print(f"   {env}gunicorn app:app --workers {choice['workers']} --threads {choice['threads']} --preload")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'p99_target_ms': args.p99_ms,
+                'cpu_count': os.cpu_count(),
+                'results': results,
+                'recommended': choice
+            }, f, indent=2)
+        print(f"\n💾 Report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Shadow scoring of a candidate model on live traffic
+
+A sample of /predict requests is handed to a ShadowScorer after the
+primary model has answered. The request thread only draws a random number
+and does a non-blocking put on a bounded queue, so shadow scoring never
+adds latency to the response. One daemon thread per process scores the
+queued texts with the candidate model and records agreement with the
+primary, per-class disagreement and the latency of both models.
+
+The thread sleeps after each text so it averages at most `cpu_budget` of
+one core. When it cannot keep up the queue fills and new samples are
+dropped (and counted), never queued without bound.
+"""
+
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class ShadowScorer:
+    """Sampled, CPU-budgeted comparison of a candidate model against the primary"""
+
+    def __init__(self, model, vectorizer, sample_rate=0.1, max_queue=256, cpu_budget=0.1,
+                 on_result=None, latency_window=1000):
+        self.model = model
+        self.vectorizer = vectorizer
+        self.sample_rate = sample_rate
+        self.cpu_budget = cpu_budget
+        self.on_result = on_result  # called with (primary, shadow, primary_seconds, shadow_seconds)
+        self.sampled = 0
+        self.dropped = 0
+        self.errors = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._pid = None
+        self._scored = 0
+        self._agreements = 0
+        self._by_class = {}  # primary class -> {shadow class: count}
+        self._primary_latency = deque(maxlen=latency_window)
+        self._shadow_latency = deque(maxlen=latency_window)
+
+    def ensure_started(self):
+        """Start the thread once per process (threads do not survive fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            threading.Thread(target=self._run, name='shadow-scoring', daemon=True).start()
+            self._pid = os.getpid()
+
+    def submit(self, text, primary_prediction, primary_seconds=None):
+        """Offer a scored request for shadowing; returns True if it was queued"""
+        if random.random() >= self.sample_rate:
+            return False
+        self.ensure_started()
+        try:
+            self._queue.put_nowait((text, primary_prediction, primary_seconds))
+            queued = True
+        except queue.Full:
+            queued = False
+        with self._lock:
+            self.sampled += 1
+            self.dropped += not queued
+        return queued
+
+    def _run(self):
+        while True:
+            text, primary, primary_seconds = self._queue.get()
+            cpu_start, wall_start = time.thread_time(), time.monotonic()
+            try:
+                self.score(text, primary, primary_seconds)
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                logger.warning(f"Shadow scoring error: {e}")
+            # Sleep long enough that this thread averages <= cpu_budget of one core
+            cpu_used = time.thread_time() - cpu_start
+            elapsed = time.monotonic() - wall_start
+            time.sleep(max(0.0, cpu_used / self.cpu_budget - elapsed))
+
+    def score(self, text, primary, primary_seconds=None):
+        """Classify one text with the candidate and record the comparison"""
+        start = time.perf_counter()
+        text_vec = self.vectorizer.transform([text])
+        shadow = str(self.model.predict(text_vec)[0])
+        self.model.predict_proba(text_vec)  # the primary computes both; keep latencies comparable
+        shadow_seconds = time.perf_counter() - start
+
+        with self._lock:
+            self._scored += 1
+            self._agreements += shadow == primary
+            counts = self._by_class.setdefault(primary, {})
+            counts[shadow] = counts.get(shadow, 0) + 1
+            self._shadow_latency.append(shadow_seconds)
+            if primary_seconds is not None:
+                self._primary_latency.append(primary_seconds)
+        if self.on_result is not None:
+            self.on_result(primary, shadow, primary_seconds, shadow_seconds)
+        return shadow
+
+    @staticmethod
+    def _latency_summary(samples):
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return {
+            'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3),
+            'p50_ms': round(ordered[len(ordered) // 2] * 1000, 3),
+            'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3)
+        }
+
+    def snapshot(self):
+        """Agreement, per-class disagreement and latency since the process started"""
+        with self._lock:
+            per_class = {}
+            for primary, counts in sorted(self._by_class.items()):
+                total = sum(counts.values())
+                per_class[primary] = {
+                    'scored': total,
+                    'disagreement_rate': round(1 - counts.get(primary, 0) / total, 4),
+                    'shadow_predictions': dict(sorted(counts.items()))
+                }
+            return {
+                'sample_rate': self.sample_rate,
+                'cpu_budget': self.cpu_budget,
+                'sampled': self.sampled,
+                'scored': self._scored,
+                'dropped': self.dropped,
+                'errors': self.errors,
+                'queued': self._queue.qsize(),
+                'agreement_rate': self._agreements / self._scored if self._scored else None,
+                'per_class': per_class,
+                'latency': {
+                    'primary': self._latency_summary(self._primary_latency),
+                    'shadow': self._latency_summary(self._shadow_latency)
+                }
+            }
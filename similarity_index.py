@@ -0,0 +1,316 @@
+"""
+In-memory inverted index for "find feedback like this one"
+
+TF-IDF rows produced by the vectorizer are L2-normalized, so cosine
+similarity is a plain dot product. Each vocabulary term keeps a postings
+list of (document, weight) pairs in growable numpy arrays; a query only
+walks the postings of the terms present in the query text and accumulates
+scores into one dense float32 array, so cost scales with the postings
+touched rather than with vocabulary size.
+
+Documents are keyed by their `predictions.id`. The index is appended to as
+predictions are saved and caught up from the database with `sync()`, so
+every worker converges on the full table. SimilaritySyncJob runs that
+catch-up in a daemon thread, so queries only ever read the index. It can
+optionally be persisted to a single .npz file (no pickled objects) and
+reloaded at startup.
+"""
+
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INITIAL_CAPACITY = 16
+# Ids added inline but not yet seen by sync() that are remembered exactly;
+# past this the oldest half is forgotten and sync() checks those rows
+# against the index itself
+MAX_INLINE_IDS = 100_000
+
+
+class _GrowableArray:
+    """Append-only numpy array with amortized O(1) appends
+
+    Growing swaps in a new buffer, so a reader that captured (buffer, size)
+    keeps a valid view of the first `size` items while writers continue.
+    """
+
+    __slots__ = ('data', 'size')
+
+    def __init__(self, dtype, capacity=INITIAL_CAPACITY):
+        self.data = np.empty(capacity, dtype=dtype)
+        self.size = 0
+
+    def extend(self, values):
+        needed = self.size + len(values)
+        if needed > len(self.data):
+            grown = np.empty(max(needed, 2 * len(self.data)), dtype=self.data.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:needed] = values
+        self.size = needed
+
+    def view(self):
+        return self.data[:self.size]
+
+
+class SimilarityIndex:
+    """Top-k cosine similarity search over stored TF-IDF vectors"""
+
+    def __init__(self, n_features):
+        self.n_features = n_features
+        self._lock = threading.Lock()
+        self._ids = _GrowableArray(np.int64)
+        self._category_codes = _GrowableArray(np.int16)
+        self._categories = []
+        self._category_lookup = {}
+        self._postings = [None] * n_features
+        # Highest database id seen by sync(); ids added inline above it are
+        # remembered so the next sync does not index them twice
+        self.synced_id = 0
+        self._inline_ids = set()
+        self._forgotten_through = 0  # inline ids up to here were dropped from _inline_ids
+        self._sync_lock = threading.Lock()
+
+    def __len__(self):
+        return self._ids.size
+
+    def _category_code(self, category):
+        code = self._category_lookup.get(category)
+        if code is None:
+            code = len(self._categories)
+            self._categories.append(category)
+            self._category_lookup[category] = code
+        return code
+
+    def add_batch(self, ids, matrix, categories):
+        """Index the rows of a CSR matrix under the given database ids"""
+        if matrix.shape[0] == 0:
+            return
+        csc = matrix.tocsc()
+        with self._lock:
+            self._remember_inline(map(int, ids))
+            base = self._ids.size
+            self._ids.extend(np.asarray(ids, dtype=np.int64))
+            self._category_codes.extend(
+                np.array([self._category_code(c) for c in categories], dtype=np.int16)
+            )
+            indptr = csc.indptr
+            for term in np.flatnonzero(np.diff(indptr)):
+                start, end = indptr[term], indptr[term + 1]
+                postings = self._postings[term]
+                if postings is None:
+                    postings = self._postings[term] = (
+                        _GrowableArray(np.int32), _GrowableArray(np.float32)
+                    )
+                postings[0].extend(csc.indices[start:end] + base)
+                postings[1].extend(csc.data[start:end])
+
+    def add(self, row_id, vector, category):
+        """Index one freshly saved prediction (a 1-row CSR matrix)"""
+        self.add_terms(row_id, vector.indices, vector.data, category)
+
+    def add_terms(self, row_id, terms, weights, category):
+        """Index one document from its nonzero term ids and weights, no sparse matrix needed"""
+        with self._lock:
+            self._remember_inline([row_id])
+            doc = self._ids.size
+            self._ids.extend([row_id])
+            self._category_codes.extend([self._category_code(category)])
+            for term, weight in zip(terms.tolist(), weights.tolist()):
+                postings = self._postings[term]
+                if postings is None:
+                    postings = self._postings[term] = (
+                        _GrowableArray(np.int32), _GrowableArray(np.float32)
+                    )
+                postings[0].extend([doc])
+                postings[1].extend([weight])
+
+    def _remember_inline(self, ids):
+        # Rows saved inline are also returned by the next sync(); caller holds _lock
+        self._inline_ids.update(row_id for row_id in ids if row_id > self.synced_id)
+        if len(self._inline_ids) > MAX_INLINE_IDS:
+            kept = sorted(self._inline_ids)[len(self._inline_ids) // 2:]
+            self._forgotten_through = max(self._forgotten_through, kept[0] - 1)
+            self._inline_ids = set(kept)
+
+    def query(self, vector, top_k=10, category=None, exclude_id=None):
+        """Return up to top_k (id, category, score) tuples, best first"""
+        vector = vector.tocsr()
+        with self._lock:
+            n_docs = self._ids.size
+            ids = self._ids.view()
+            codes = self._category_codes.view()
+            category_code = self._category_lookup.get(category)
+            touched = [
+                (self._postings[term][0].view(), self._postings[term][1].view(), weight)
+                for term, weight in zip(vector.indices, vector.data)
+                if self._postings[term] is not None
+            ]
+        if n_docs == 0 or not touched or (category is not None and category_code is None):
+            return []
+
+        scores = np.zeros(n_docs, dtype=np.float32)
+        for docs, weights, query_weight in touched:
+            # Postings of one term hold each document at most once
+            scores[docs] += weights * np.float32(query_weight)
+
+        if category_code is not None:
+            scores[codes != category_code] = 0.0
+        if exclude_id is not None:
+            scores[ids == exclude_id] = 0.0
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > top_k:
+            best = np.argpartition(-scores[candidates], top_k - 1)[:top_k]
+            candidates = candidates[best]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+
+        return [
+            (int(ids[doc]), self._categories[codes[doc]], float(scores[doc]))
+            for doc in candidates
+        ]
+
+    def sync(self, fetch_rows, vectorize, batch_size=1000):
+        """Index the next batch of rows written by other workers
+
+        fetch_rows(after_id, limit) returns [(id, text, category), ...] in id
+        order; vectorize(texts) returns their CSR TF-IDF matrix. Returns the
+        number of rows added; synced_id stays put once there is nothing new.
+        """
+        # Concurrent callers skip instead of fetching the same rows twice
+        if not self._sync_lock.acquire(blocking=False):
+            return 0
+        try:
+            rows = fetch_rows(self.synced_id, batch_size)
+            if not rows:
+                return 0
+            with self._lock:
+                fresh = [row for row in rows if row[0] not in self._inline_ids]
+                if fresh and fresh[0][0] <= self._forgotten_through:
+                    # Rows added inline whose ids were forgotten: ask the index
+                    ids = self._ids.view()
+                    indexed = set(ids[np.isin(ids, [row[0] for row in fresh])].tolist())
+                    fresh = [row for row in fresh if row[0] not in indexed]
+                self.synced_id = rows[-1][0]
+                self._inline_ids = {i for i in self._inline_ids if i > self.synced_id}
+                if self.synced_id >= self._forgotten_through:
+                    self._forgotten_through = 0
+            if fresh:
+                self.add_batch(
+                    [row[0] for row in fresh],
+                    vectorize([row[1] for row in fresh]),
+                    [row[2] for row in fresh]
+                )
+            return len(fresh)
+        finally:
+            self._sync_lock.release()
+
+    def save(self, path):
+        """Persist the index atomically to a .npz file"""
+        with self._lock:
+            lengths = np.array(
+                [0 if p is None else p[0].size for p in self._postings], dtype=np.int64
+            )
+            docs = [p[0].view() for p in self._postings if p is not None]
+            weights = [p[1].view() for p in self._postings if p is not None]
+            payload = {
+                'n_features': np.int64(self.n_features),
+                'ids': self._ids.view().copy(),
+                'category_codes': self._category_codes.view().copy(),
+                'categories': np.array(self._categories, dtype=str),
+                'postings_ptr': np.concatenate([[0], np.cumsum(lengths)]),
+                'postings_docs': np.concatenate(docs) if docs else np.empty(0, np.int32),
+                'postings_weights': np.concatenate(weights) if weights else np.empty(0, np.float32),
+                'synced_id': np.int64(self.synced_id),
+                'inline_ids': np.array(sorted(self._inline_ids), dtype=np.int64),
+                'forgotten_through': np.int64(self._forgotten_through),
+            }
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **payload)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, n_features):
+        """Load a persisted index, or return None if it does not match the vocabulary"""
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['n_features']) != n_features:
+                return None
+            index = cls(n_features)
+            index._ids.extend(data['ids'])
+            index._category_codes.extend(data['category_codes'])
+            for category in data['categories'].tolist():
+                index._category_code(category)
+            ptr = data['postings_ptr']
+            docs, weights = data['postings_docs'], data['postings_weights']
+            for term in np.flatnonzero(np.diff(ptr)):
+                postings = (_GrowableArray(np.int32, 0), _GrowableArray(np.float32, 0))
+                postings[0].extend(docs[ptr[term]:ptr[term + 1]])
+                postings[1].extend(weights[ptr[term]:ptr[term + 1]])
+                index._postings[term] = postings
+            index.synced_id = int(data['synced_id'])
+            index._inline_ids = set(data['inline_ids'].tolist())
+            if 'forgotten_through' in data.files:
+                index._forgotten_through = int(data['forgotten_through'])
+        return index
+
+
+class SimilaritySyncJob:
+    """Keeps a SimilarityIndex caught up with the database in a daemon thread
+
+    A fresh worker starts far behind the table; catching up runs here, a
+    batch at a time and sleeping so it averages at most `cpu_budget` of one
+    core, instead of on the query path. Once caught up it polls every
+    `interval` seconds. on_sync(added) runs after each pass that added rows.
+    """
+
+    def __init__(self, index, fetch_rows, vectorize, interval=2.0, cpu_budget=0.5,
+                 batch_size=1000, on_sync=None):
+        self.index = index
+        self.fetch_rows = fetch_rows
+        self.vectorize = vectorize
+        self.interval = interval
+        self.cpu_budget = cpu_budget
+        self.batch_size = batch_size
+        self.on_sync = on_sync
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def ensure_started(self):
+        """Start the thread once per process (threads do not survive fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            threading.Thread(target=self._run, name='similarity-sync', daemon=True).start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            try:
+                added = self.run_once()
+                if added and self.on_sync is not None:
+                    self.on_sync(added)
+            except Exception as e:
+                logger.warning(f"Similarity index sync error: {e}")
+            time.sleep(self.interval)
+
+    def run_once(self):
+        """Sync batches until no new rows come back; returns rows added"""
+        added = 0
+        while True:
+            synced_id = self.index.synced_id
+            cpu_start, wall_start = time.thread_time(), time.monotonic()
+            added += self.index.sync(self.fetch_rows, self.vectorize, self.batch_size)
+            if self.index.synced_id == synced_id:
+                return added
+            # Sleep long enough that this thread averages <= cpu_budget of one core
+            cpu_used = time.thread_time() - cpu_start
+            elapsed = time.monotonic() - wall_start
+            time.sleep(max(0.0, cpu_used / self.cpu_budget - elapsed))
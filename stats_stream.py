@@ -0,0 +1,164 @@
+"""
+Live statistics over Server-Sent Events
+
+LiveStats holds in-process counters updated on every prediction. A single
+StatsBroadcaster thread per process turns them into one SSE event every
+`interval` seconds (category counts, average confidence, throughput since
+the previous tick) and fans the already-encoded event out to every
+subscriber, so N viewers cost one snapshot plus N queue puts.
+
+Each subscriber has a small bounded queue. A viewer that falls behind
+loses stale events (only the newest snapshot matters) and is disconnected
+after `max_missed` consecutive drops. The number of subscribers is capped
+because, under threaded gunicorn, every open stream holds a worker thread.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+
+
+class LiveStats:
+    """Thread-safe per-category counters since process start"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._confidence_sums = {}
+
+    def record(self, category, confidence):
+        with self._lock:
+            self._counts[category] = self._counts.get(category, 0) + 1
+            self._confidence_sums[category] = self._confidence_sums.get(category, 0.0) + confidence
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts), dict(self._confidence_sums)
+
+
+class Subscription:
+    __slots__ = ('events', 'missed', 'closed')
+
+    def __init__(self, backlog):
+        self.events = queue.Queue(maxsize=backlog)
+        self.missed = 0
+        self.closed = False
+
+
+class StatsBroadcaster:
+    """One producer thread per process, fanning SSE events out to subscribers"""
+
+    def __init__(self, live_stats, interval=5.0, max_subscribers=8, backlog=2, max_missed=5):
+        self.live_stats = live_stats
+        self.interval = interval
+        self.max_subscribers = max_subscribers
+        self.backlog = backlog
+        self.max_missed = max_missed
+        self.dropped_events = 0
+        self.disconnected_slow = 0
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._pid = None
+        self._previous = None
+        self._latest_event = None  # last encoded event, replayed to new subscribers
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def subscribe(self):
+        """Register a viewer, or return None when the subscriber limit is reached"""
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            subscription = Subscription(self.backlog)
+            if self._latest_event is not None:
+                # New viewers see the current numbers without waiting a full interval
+                subscription.events.put_nowait(self._latest_event)
+            self._subscribers.add(subscription)
+            if self._pid != os.getpid():
+                threading.Thread(target=self._run, name='stats-stream', daemon=True).start()
+                self._pid = os.getpid()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscription.closed = True
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def _build_event(self):
+        now = time.time()
+        counts, confidence_sums = self.live_stats.snapshot()
+        total = sum(counts.values())
+        if self._previous is None:
+            rate = 0.0
+        else:
+            prev_time, prev_total = self._previous
+            rate = (total - prev_total) / max(now - prev_time, 1e-9)
+        self._previous = (now, total)
+        payload = {
+            'total_predictions': total,
+            'predictions_per_second': round(rate, 3),
+            'categories': [
+                {
+                    'name': category,
+                    'count': count,
+                    'avg_confidence': round(confidence_sums[category] / count, 4)
+                }
+                for category, count in sorted(counts.items(), key=lambda item: -item[1])
+            ],
+            'pid': os.getpid(),
+            'timestamp': now
+        }
+        # Encoded once, shared by every subscriber
+        return f"event: stats\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n"
+
+    def _run(self):
+        while True:
+            with self._lock:
+                subscribers = list(self._subscribers)
+            if not subscribers:
+                # Producer parks (cheaply) until the next viewer arrives
+                self._previous = None
+                self._latest_event = None
+                time.sleep(self.interval)
+                continue
+            event = self._build_event()
+            self._latest_event = event
+            for subscription in subscribers:
+                self._deliver(subscription, event)
+            time.sleep(self.interval)
+
+    def _deliver(self, subscription, event):
+        try:
+            subscription.events.put_nowait(event)
+            subscription.missed = 0
+            return
+        except queue.Full:
+            pass
+        # Slow consumer: replace the stale event with the newest one
+        self.dropped_events += 1
+        subscription.missed += 1
+        if subscription.missed >= self.max_missed:
+            self.disconnected_slow += 1
+            self.unsubscribe(subscription)
+            return
+        try:
+            subscription.events.get_nowait()
+            subscription.events.put_nowait(event)
+        except (queue.Empty, queue.Full):
+            pass
+
+    def stream(self, subscription, heartbeat=15.0):
+        """Generator of SSE text for one subscriber; unsubscribes on exit"""
+        try:
+            yield f"retry: {int(self.interval * 1000)}\n\n"
+            while not subscription.closed:
+                try:
+                    yield subscription.events.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+        finally:
+            self.unsubscribe(subscription)
@@ -0,0 +1,635 @@
+"""
+Prediction storage backends
+
+Both backends expose the same operations used by the API:
+
+    init()                                   create/upgrade the schema
+    warm()                                   open connections ahead of the first request
+    save(rows, keys)                         insert (text, category, confidence) rows,
+                                             return [(id, created), ...]
+    stats()                                  (total, [(category, count, avg_confidence), ...])
+    fetch_rows(after_id, limit)              [(id, text, category), ...] with id > after_id
+    fetch_texts(ids)                         {id: text}
+    export_batches(start, end, category, n)  lists of (id, text, category, confidence, created_at)
+
+PostgresStorage opens a connection per call, as the API always has.
+SQLiteStorage is an embedded single-node backend for deployments without
+DATABASE_URL: the database runs in WAL mode so readers never block the
+writer, and a writer thread per process group-commits concurrent saves
+into one transaction, so throughput is bounded by commits rather than by
+requests. If the writer thread dies, the saves queued on it fail and the
+next save starts a new one; a save never waits more than `write_timeout`
+seconds for it.
+
+save() takes optional idempotency keys, one per row (None for unkeyed
+rows). A row whose key was already recorded within `key_ttl` seconds is not
+inserted again; its original id comes back with created=False. Each key is
+kept with the fingerprint of its text in an `idempotency_keys` table
+(purged once expired), and a key recorded for a different text comes back
+as (None, False): a conflict, as in IdempotencyStore.
+
+create_storage() picks the backend from STORAGE_BACKEND (postgres, sqlite
+or none); by default PostgreSQL when DATABASE_URL is set, SQLite otherwise.
+
+For the ASGI variant (app_async.py), create_async_storage() wraps a backend
+in an awaitable twin of its save() and stats(): AsyncPostgresStorage over an
+asyncpg pool, AsyncSQLiteStorage over aiosqlite. Both write the same tables
+with the same idempotency semantics, so the two servers share a database.
+"""
+
+import asyncio
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from idempotency import fingerprint
+
+logger = logging.getLogger(__name__)
+
+KEY_PURGE_INTERVAL = 600  # seconds between deletes of expired idempotency keys
+
+STATS_QUERY = """
+    SELECT category, COUNT(*) AS count, AVG(confidence) AS avg_conf
+    FROM predictions
+    GROUP BY category
+    ORDER BY count DESC
+"""
+
+# Keyed saves on SQLite, shared by SQLiteStorage and AsyncSQLiteStorage:
+# claim the key unless a live one exists, then insert and link the row
+SQLITE_CLAIM_KEY = """
+    INSERT INTO idempotency_keys (key, fingerprint, created_at) VALUES (?, ?, ?)
+    ON CONFLICT (key) DO UPDATE
+    SET prediction_id = NULL, fingerprint = excluded.fingerprint, created_at = excluded.created_at
+    WHERE idempotency_keys.created_at < ?
+"""
+SQLITE_KEY_PREDICTION = "SELECT prediction_id, fingerprint FROM idempotency_keys WHERE key = ?"
+SQLITE_INSERT = "INSERT INTO predictions (text, category, confidence, created_at) VALUES (?, ?, ?, ?)"
+SQLITE_LINK_KEY = "UPDATE idempotency_keys SET prediction_id = ? WHERE key = ?"
+SQLITE_PURGE_KEYS = "DELETE FROM idempotency_keys WHERE created_at < ?"
+
+
+def stored_key_result(prediction_id, stored_fingerprint, text):
+    """save() result for a key that is already stored: a replay, or a conflict if the text differs"""
+    if stored_fingerprint is not None and stored_fingerprint != fingerprint(text):
+        return None, False
+    return prediction_id, False
+
+
+class PostgresStorage:
+    name = 'postgres'
+
+    def __init__(self, database_url, key_ttl=86400):
+        self.key_ttl = key_ttl
+        self._keys_purged_at = 0.0
+        # Render uses postgres:// but psycopg2 needs postgresql://
+        if database_url.startswith('postgres://'):
+            database_url = database_url.replace('postgres://', 'postgresql://', 1)
+        self.database_url = database_url
+
+    def connect(self):
+        # Imported lazily so database-less deployments never load the driver
+        import psycopg2
+        return psycopg2.connect(self.database_url)
+
+    def init(self):
+        """Apply pending migrations (see migrations.py); returns applied versions"""
+        from migrations import migrate
+        conn = self.connect()
+        try:
+            return migrate(conn)
+        finally:
+            conn.close()
+
+    def warm(self):
+        """Load the driver and complete one connection round trip (DNS, TLS, auth)"""
+        conn = self.connect()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+        finally:
+            conn.close()
+
+    def save(self, rows, keys=None):
+        from psycopg2.extras import execute_values
+        created_at = datetime.utcnow()
+        keys = keys or [None] * len(rows)
+        conn = self.connect()
+        try:
+            with conn.cursor() as cur:
+                results = [None] * len(rows)
+                unkeyed = [index for index, key in enumerate(keys) if key is None]
+                if unkeyed:
+                    inserted = execute_values(
+                        cur,
+                        "INSERT INTO predictions (text, category, confidence, created_at) VALUES %s RETURNING id",
+                        [tuple(rows[index]) + (created_at,) for index in unkeyed],
+                        fetch=True
+                    )
+                    for index, row in zip(unkeyed, inserted):
+                        results[index] = (row[0], True)
+                for index, key in enumerate(keys):
+                    if key is not None:
+                        results[index] = self._save_keyed(cur, rows[index], key, created_at)
+                if any(keys) and time.monotonic() - self._keys_purged_at > KEY_PURGE_INTERVAL:
+                    cur.execute("DELETE FROM idempotency_keys WHERE created_at < %s",
+                                (created_at - timedelta(seconds=self.key_ttl),))
+                    self._keys_purged_at = time.monotonic()
+            conn.commit()
+            return results
+        finally:
+            conn.close()
+
+    def _save_keyed(self, cur, row, key, created_at):
+        # Claims the key unless a live one exists; a concurrent claim blocks
+        # here until that transaction commits
+        cur.execute("""
+            INSERT INTO idempotency_keys (key, fingerprint, created_at) VALUES (%s, %s, %s)
+            ON CONFLICT (key) DO UPDATE
+            SET prediction_id = NULL, fingerprint = EXCLUDED.fingerprint, created_at = EXCLUDED.created_at
+            WHERE idempotency_keys.created_at < %s
+        """, (key, fingerprint(row[0]), created_at, created_at - timedelta(seconds=self.key_ttl)))
+        if cur.rowcount == 0:
+            cur.execute("SELECT prediction_id, fingerprint FROM idempotency_keys WHERE key = %s", (key,))
+            return stored_key_result(*cur.fetchone(), row[0])
+        cur.execute(
+            "INSERT INTO predictions (text, category, confidence, created_at) VALUES (%s, %s, %s, %s) RETURNING id",
+            tuple(row) + (created_at,)
+        )
+        row_id = cur.fetchone()[0]
+        cur.execute("UPDATE idempotency_keys SET prediction_id = %s WHERE key = %s", (row_id, key))
+        return row_id, True
+
+    def stats(self):
+        conn = self.connect()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(STATS_QUERY)
+                categories = cur.fetchall()
+            return sum(row[1] for row in categories), categories
+        finally:
+            conn.close()
+
+    def fetch_rows(self, after_id, limit):
+        conn = self.connect()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT id, text, category FROM predictions
+                    WHERE id > %s ORDER BY id LIMIT %s
+                """, (after_id, limit))
+                return cur.fetchall()
+        finally:
+            conn.close()
+
+    def fetch_texts(self, ids):
+        conn = self.connect()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT id, text FROM predictions WHERE id = ANY(%s)", (list(ids),))
+                return dict(cur.fetchall())
+        finally:
+            conn.close()
+
+    def export_batches(self, start=None, end=None, category=None, fetch_size=5000):
+        """Server-side cursor batches; the connection lives as long as the generator"""
+        from export_predictions import iter_row_batches
+        conn = self.connect()
+        try:
+            yield from iter_row_batches(conn, start, end, category, fetch_size)
+        finally:
+            conn.close()
+
+
+class _PendingSave:
+    __slots__ = ('rows', 'keys', 'done', 'ids', 'error')
+
+    def __init__(self, rows, keys):
+        self.rows = rows
+        self.keys = keys or [None] * len(rows)
+        self.done = threading.Event()
+        self.ids = None
+        self.error = None
+
+
+class SQLiteStorage:
+    name = 'sqlite'
+
+    def __init__(self, path, max_batch_rows=1000, busy_timeout=5.0, key_ttl=86400, write_timeout=10.0):
+        self.path = path
+        self.key_ttl = key_ttl
+        self._keys_purged_at = 0.0
+        self.max_batch_rows = max_batch_rows
+        self.busy_timeout = busy_timeout
+        self.write_timeout = write_timeout  # longest a save() waits for the writer thread
+        self.commits = 0
+        self.rows_written = 0
+        self._local = threading.local()
+        self._queue = None
+        self._writer_lock = threading.Lock()
+        self._pid = None
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                               check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: durable against process crashes, fsync only at checkpoints
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self):
+        """One read connection per thread, reopened after fork"""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.conn = self.connect()
+            local.pid = os.getpid()
+        return local.conn
+
+    def init(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self.connect()
+        try:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS predictions (
+                    id INTEGER PRIMARY KEY,
+                    text TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    confidence REAL NOT NULL,
+                    created_at TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_predictions_created_at ON predictions (created_at);
+                CREATE INDEX IF NOT EXISTS idx_predictions_category_created_at
+                    ON predictions (category, created_at);
+                CREATE TABLE IF NOT EXISTS idempotency_keys (
+                    key TEXT PRIMARY KEY,
+                    prediction_id INTEGER,
+                    fingerprint TEXT,
+                    created_at TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created_at
+                    ON idempotency_keys (created_at);
+            """)
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(idempotency_keys)")]
+            if 'fingerprint' not in columns:
+                # Databases created before keys recorded their text
+                conn.execute("ALTER TABLE idempotency_keys ADD COLUMN fingerprint TEXT")
+        finally:
+            conn.close()
+        return []
+
+    def warm(self):
+        """Start this process's writer thread and read the schema into the page cache"""
+        with self._writer_lock:
+            self._ensure_writer()
+        self._reader().execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+
+    # --- Writes: group commit through one writer thread per process ---------
+
+    def _ensure_writer(self):
+        """Start this process's writer thread unless it runs; call with _writer_lock held"""
+        if self._pid != os.getpid():
+            self._queue = queue.Queue()
+            threading.Thread(target=self._write_loop, args=(self._queue,),
+                             name='sqlite-writer', daemon=True).start()
+            self._pid = os.getpid()
+
+    def save(self, rows, keys=None):
+        pending = _PendingSave(rows, keys)
+        # Queued under the lock, so a writer that dies fails this save or a
+        # new writer picks it up, never neither
+        with self._writer_lock:
+            self._ensure_writer()
+            self._queue.put(pending)
+        if not pending.done.wait(self.write_timeout):
+            raise TimeoutError(f"SQLite writer did not commit within {self.write_timeout:g}s")
+        if pending.error is not None:
+            raise pending.error
+        return pending.ids
+
+    def _write_loop(self, pending_queue):
+        conn = None
+        try:
+            conn = self.connect()
+            while True:
+                # Everything queued while the previous transaction committed goes
+                # into the next one
+                batch = [pending_queue.get()]
+                n_rows = len(batch[0].rows)
+                while n_rows < self.max_batch_rows:
+                    try:
+                        batch.append(pending_queue.get_nowait())
+                    except queue.Empty:
+                        break
+                    n_rows += len(batch[-1].rows)
+                self._commit_batch(conn, batch)
+        except Exception as e:
+            logger.error(f"❌ SQLite writer stopped: {e}")
+            with self._writer_lock:
+                if self._queue is pending_queue:
+                    self._pid = None  # the next save() starts a new writer
+                # Saves already queued here would otherwise wait for nothing
+                while True:
+                    try:
+                        pending = pending_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    pending.ids, pending.error = None, e
+                    pending.done.set()
+            if conn is not None:
+                conn.close()
+
+    def _commit_batch(self, conn, batch):
+        now = datetime.utcnow()
+        created_at = now.isoformat()
+        key_cutoff = (now - timedelta(seconds=self.key_ttl)).isoformat()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for pending in batch:
+                ids = []
+                for (text, category, confidence), key in zip(pending.rows, pending.keys):
+                    if key is not None:
+                        cur = conn.execute(SQLITE_CLAIM_KEY, (key, fingerprint(text), created_at, key_cutoff))
+                        if cur.rowcount == 0:
+                            stored = conn.execute(SQLITE_KEY_PREDICTION, (key,)).fetchone()
+                            ids.append(stored_key_result(*stored, text))
+                            continue
+                    cur = conn.execute(SQLITE_INSERT, (text, str(category), confidence, created_at))
+                    if key is not None:
+                        conn.execute(SQLITE_LINK_KEY, (cur.lastrowid, key))
+                    ids.append((cur.lastrowid, True))
+                pending.ids = ids
+            if time.monotonic() - self._keys_purged_at > KEY_PURGE_INTERVAL:
+                conn.execute(SQLITE_PURGE_KEYS, (key_cutoff,))
+                self._keys_purged_at = time.monotonic()
+            conn.execute("COMMIT")
+            self.commits += 1
+            self.rows_written += sum(len(pending.rows) for pending in batch)
+        except Exception as e:
+            for pending in batch:
+                pending.ids, pending.error = None, e
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")  # if this raises too, _write_loop restarts the writer
+        finally:
+            for pending in batch:
+                pending.done.set()
+
+    # --- Reads ----------------------------------------------------------------
+
+    def stats(self):
+        categories = self._reader().execute(STATS_QUERY).fetchall()
+        return sum(row[1] for row in categories), categories
+
+    def fetch_rows(self, after_id, limit):
+        return self._reader().execute(
+            "SELECT id, text, category FROM predictions WHERE id > ? ORDER BY id LIMIT ?",
+            (after_id, limit)
+        ).fetchall()
+
+    def fetch_texts(self, ids):
+        ids = list(ids)
+        if not ids:
+            return {}
+        placeholders = ','.join('?' * len(ids))
+        return dict(self._reader().execute(
+            f"SELECT id, text FROM predictions WHERE id IN ({placeholders})", ids
+        ).fetchall())
+
+    def export_batches(self, start=None, end=None, category=None, fetch_size=5000):
+        """Rows stepped lazily from SQLite, fetch_size at a time"""
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("created_at >= ?")
+            params.append(start.isoformat())
+        if end is not None:
+            clauses.append("created_at < ?")
+            params.append(end.isoformat())
+        if category:
+            clauses.append("category = ?")
+            params.append(category)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        conn = self.connect()
+        try:
+            cur = conn.execute(
+                f"SELECT id, text, category, confidence, created_at FROM predictions{where} ORDER BY id",
+                params
+            )
+            while True:
+                rows = cur.fetchmany(fetch_size)
+                if not rows:
+                    return
+                yield [
+                    (row_id, text, row_category, confidence, datetime.fromisoformat(created_at))
+                    for row_id, text, row_category, confidence, created_at in rows
+                ]
+        finally:
+            conn.close()
+
+
+class AsyncPostgresStorage:
+    """PostgresStorage's save() and stats() for an event loop, over an asyncpg pool"""
+    name = 'postgres'
+
+    def __init__(self, database_url, key_ttl=86400, pool_size=10):
+        self.database_url = database_url
+        self.key_ttl = key_ttl
+        self.pool_size = pool_size
+        self._keys_purged_at = 0.0
+        self._pool = None
+        self._pool_lock = asyncio.Lock()
+
+    async def _get_pool(self):
+        if self._pool is None:
+            async with self._pool_lock:
+                if self._pool is None:
+                    import asyncpg
+                    self._pool = await asyncpg.create_pool(self.database_url, min_size=1,
+                                                           max_size=self.pool_size)
+        return self._pool
+
+    async def open(self):
+        """Create the pool ahead of the first request; a failure is retried on first use"""
+        try:
+            await self._get_pool()
+        except Exception as e:
+            logger.error(f"❌ Could not open the PostgreSQL pool: {e}")
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+
+    async def save(self, rows, keys=None):
+        created_at = datetime.utcnow()
+        keys = keys or [None] * len(rows)
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                results = []
+                for (text, category, confidence), key in zip(rows, keys):
+                    row = (text, str(category), float(confidence), created_at)
+                    if key is None:
+                        row_id = await conn.fetchval(
+                            "INSERT INTO predictions (text, category, confidence, created_at) "
+                            "VALUES ($1, $2, $3, $4) RETURNING id", *row
+                        )
+                        results.append((row_id, True))
+                    else:
+                        results.append(await self._save_keyed(conn, row, key, created_at))
+                if any(keys) and time.monotonic() - self._keys_purged_at > KEY_PURGE_INTERVAL:
+                    await conn.execute("DELETE FROM idempotency_keys WHERE created_at < $1",
+                                       created_at - timedelta(seconds=self.key_ttl))
+                    self._keys_purged_at = time.monotonic()
+        return results
+
+    async def _save_keyed(self, conn, row, key, created_at):
+        # Same claim as PostgresStorage._save_keyed
+        status = await conn.execute("""
+            INSERT INTO idempotency_keys (key, fingerprint, created_at) VALUES ($1, $2, $3)
+            ON CONFLICT (key) DO UPDATE
+            SET prediction_id = NULL, fingerprint = EXCLUDED.fingerprint, created_at = EXCLUDED.created_at
+            WHERE idempotency_keys.created_at < $4
+        """, key, fingerprint(row[0]), created_at, created_at - timedelta(seconds=self.key_ttl))
+        if status.endswith(' 0'):
+            stored = await conn.fetchrow("SELECT prediction_id, fingerprint FROM idempotency_keys WHERE key = $1", key)
+            return stored_key_result(*stored, row[0])
+        row_id = await conn.fetchval(
+            "INSERT INTO predictions (text, category, confidence, created_at) VALUES ($1, $2, $3, $4) RETURNING id",
+            *row
+        )
+        await conn.execute("UPDATE idempotency_keys SET prediction_id = $1 WHERE key = $2", row_id, key)
+        return row_id, True
+
+    async def stats(self):
+        pool = await self._get_pool()
+        categories = [tuple(record) for record in await pool.fetch(STATS_QUERY)]
+        return sum(row[1] for row in categories), categories
+
+
+class AsyncSQLiteStorage:
+    """SQLiteStorage's save() and stats() for an event loop, over aiosqlite
+
+    Saves go through one writer task per process that group-commits every
+    save queued while the previous transaction committed, as SQLiteStorage's
+    writer thread does. stats() reads on a second connection, so it never
+    sees a write transaction in progress.
+    """
+    name = 'sqlite'
+
+    def __init__(self, path, busy_timeout=5.0, key_ttl=86400, write_timeout=10.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.key_ttl = key_ttl
+        self.write_timeout = write_timeout
+        self.commits = 0
+        self._keys_purged_at = 0.0
+        self._writer = None
+        self._reader = None
+        self._pending = []
+        self._write_task = None
+
+    async def _connect(self):
+        # Imported lazily like psycopg2: only the ASGI variant needs it
+        import aiosqlite
+        conn = await aiosqlite.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+        await conn.execute("PRAGMA journal_mode=WAL")
+        await conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    async def open(self):
+        self._writer = await self._connect()
+        self._reader = await self._connect()
+
+    async def close(self):
+        if self._write_task is not None:
+            await self._write_task
+        for conn in (self._writer, self._reader):
+            if conn is not None:
+                await conn.close()
+
+    async def save(self, rows, keys=None):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((rows, keys or [None] * len(rows), future))
+        if self._write_task is None or self._write_task.done():
+            self._write_task = asyncio.create_task(self._write_loop())
+        try:
+            return await asyncio.wait_for(future, self.write_timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"SQLite writer did not commit within {self.write_timeout:g}s") from None
+
+    async def _write_loop(self):
+        while self._pending:
+            batch, self._pending = self._pending, []
+            await self._commit_batch(batch)
+
+    async def _commit_batch(self, batch):
+        conn = self._writer
+        now = datetime.utcnow()
+        created_at = now.isoformat()
+        key_cutoff = (now - timedelta(seconds=self.key_ttl)).isoformat()
+        results = []
+        try:
+            await conn.execute("BEGIN IMMEDIATE")
+            for rows, keys, _ in batch:
+                ids = []
+                for (text, category, confidence), key in zip(rows, keys):
+                    if key is not None:
+                        cursor = await conn.execute(SQLITE_CLAIM_KEY, (key, fingerprint(text), created_at, key_cutoff))
+                        if cursor.rowcount == 0:
+                            stored = await (await conn.execute(SQLITE_KEY_PREDICTION, (key,))).fetchone()
+                            ids.append(stored_key_result(*stored, text))
+                            continue
+                    cursor = await conn.execute(SQLITE_INSERT, (text, str(category), float(confidence), created_at))
+                    if key is not None:
+                        await conn.execute(SQLITE_LINK_KEY, (cursor.lastrowid, key))
+                    ids.append((cursor.lastrowid, True))
+                results.append(ids)
+            if time.monotonic() - self._keys_purged_at > KEY_PURGE_INTERVAL:
+                await conn.execute(SQLITE_PURGE_KEYS, (key_cutoff,))
+                self._keys_purged_at = time.monotonic()
+            await conn.execute("COMMIT")
+            self.commits += 1
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            if conn.in_transaction:
+                await conn.execute("ROLLBACK")
+            return
+        for (_, _, future), ids in zip(batch, results):
+            if not future.done():  # cancelled when its request went away
+                future.set_result(ids)
+
+    async def stats(self):
+        categories = list(await self._reader.execute_fetchall(STATS_QUERY))
+        return sum(row[1] for row in categories), categories
+
+
+def create_storage():
+    """Storage backend from STORAGE_BACKEND / DATABASE_URL / SQLITE_PATH, or None"""
+    database_url = os.environ.get('DATABASE_URL')
+    backend = os.environ.get('STORAGE_BACKEND', 'postgres' if database_url else 'sqlite').lower()
+    if backend == 'none':
+        return None
+    key_ttl = int(os.environ.get('IDEMPOTENCY_TTL', 86400))
+    if backend == 'postgres':
+        if not database_url:
+            logger.warning("STORAGE_BACKEND=postgres but DATABASE_URL is not set - running without storage")
+            return None
+        return PostgresStorage(database_url, key_ttl=key_ttl)
+    if backend == 'sqlite':
+        return SQLiteStorage(os.environ.get('SQLITE_PATH', 'predictions.db'), key_ttl=key_ttl)
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+def create_async_storage(storage, pool_size=10):
+    """Awaitable twin of a create_storage() backend for app_async.py (None stays None)"""
+    if storage is None:
+        return None
+    if isinstance(storage, SQLiteStorage):
+        return AsyncSQLiteStorage(storage.path, busy_timeout=storage.busy_timeout, key_ttl=storage.key_ttl,
+                                  write_timeout=storage.write_timeout)
+    return AsyncPostgresStorage(storage.database_url, key_ttl=storage.key_ttl, pool_size=pool_size)
@@ -0,0 +1,40 @@
+import pytest
+
+import app as core
+
+
+@pytest.fixture
+def client():
+    return core.app.test_client()
+
+
+def test_export_is_off_without_admin_token(client, monkeypatch):
+    monkeypatch.setattr(core, 'ADMIN_TOKEN', None)
+    assert client.get('/export').status_code == 403
+
+
+def test_export_requires_the_admin_token(client, monkeypatch):
+    monkeypatch.setattr(core, 'ADMIN_TOKEN', 's3cret')
+    assert client.get('/export').status_code == 401
+    assert client.get('/export', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    assert client.get('/export', headers={'Authorization': 'Basic s3cret'}).status_code == 401
+    response = client.get('/export?format=xml', headers={'Authorization': 'Bearer s3cret'})
+    assert response.status_code == 400  # past the token check
+
+
+@pytest.mark.parametrize('path', ['/traces', '/traces/0123456789abcdef0123456789abcdef'])
+def test_traces_require_the_admin_token(client, monkeypatch, path):
+    monkeypatch.setattr(core, 'ADMIN_TOKEN', None)
+    assert client.get(path).status_code == 403
+    monkeypatch.setattr(core, 'ADMIN_TOKEN', 's3cret')
+    assert client.get(path).status_code == 401
+    assert client.get(path, headers={'Authorization': 'Bearer s3cret'}).status_code in (200, 404, 503)
+
+
+@pytest.mark.parametrize('method, path', [('get', '/debug/memory'), ('post', '/debug/memory/baseline')])
+def test_debug_memory_requires_the_admin_token(client, monkeypatch, method, path):
+    monkeypatch.setattr(core, 'ADMIN_TOKEN', None)
+    assert getattr(client, method)(path).status_code == 403
+    monkeypatch.setattr(core, 'ADMIN_TOKEN', 's3cret')
+    assert getattr(client, method)(path).status_code == 401
+    assert getattr(client, method)(path, headers={'Authorization': 'Bearer s3cret'}).status_code in (200, 503)
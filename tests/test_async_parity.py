@@ -0,0 +1,89 @@
+import asyncio
+import json
+
+import msgpack
+import pytest
+
+pytest.importorskip('quart')
+
+import app as core  # noqa: E402
+import app_async  # noqa: E402
+from storage import SQLiteStorage  # noqa: E402
+
+# Fields that legitimately differ between two otherwise identical responses
+VOLATILE = ('timestamp', 'firestore_id', 'processing_time_ms', 'near_duplicate')
+
+
+def predict_requests(key_prefix):
+    """(body bytes, headers) for /predict; idempotency keys are per app so the shared store never crosses them"""
+    as_json = {'Content-Type': 'application/json'}
+    return [
+        (json.dumps({'text': 'The app crashes every time I upload a photo'}), as_json),
+        (b'', as_json),
+        (json.dumps({'text': 'ok'}), as_json),
+        (json.dumps({'text': '^^^^ **** ~~~~ <<>> 1234'}), as_json),
+        (json.dumps({'text': 'Please add a dark mode', 'model': 'billing'}), as_json),
+        (json.dumps({'text': 'Your pricing is too high'}), dict(as_json, **{'Idempotency-Key': f'{key_prefix}-1'})),
+        (json.dumps({'text': 'Your pricing is too high'}), dict(as_json, **{'Idempotency-Key': f'{key_prefix}-1'})),
+        (json.dumps({'text': 'Something else entirely'}), dict(as_json, **{'Idempotency-Key': f'{key_prefix}-1'})),
+        (msgpack.packb({'text': 'Great application, love it!'}),
+         {'Content-Type': 'application/msgpack', 'Accept': 'application/msgpack'}),
+    ]
+
+
+def normalize(status, headers, mimetype, data):
+    body = msgpack.unpackb(data, raw=False) if mimetype == 'application/msgpack' else json.loads(data)
+    stored = 'firestore_id' in body
+    for field in VOLATILE:
+        body.pop(field, None)
+    return status, headers.get('Idempotent-Replayed'), mimetype, body, stored
+
+
+def flask_responses():
+    client = core.app.test_client()
+    responses = []
+    for data, headers in predict_requests('flask'):
+        response = client.post('/predict', data=data, headers=headers)
+        responses.append(normalize(response.status_code, response.headers, response.mimetype, response.data))
+    return responses
+
+
+async def async_responses():
+    async with app_async.app.test_app() as test_app:
+        client = test_app.test_client()
+        responses = []
+        for data, headers in predict_requests('async'):
+            response = await client.post('/predict', data=data, headers=headers)
+            responses.append(normalize(response.status_code, response.headers, response.mimetype,
+                                       await response.get_data()))
+        stats = await client.get('/stats')
+        return responses, stats.status_code, json.loads(await stats.get_data())
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    backend = SQLiteStorage(str(tmp_path / 'predictions.db'))
+    backend.init()
+    monkeypatch.setattr(core, 'STORAGE', backend)
+    monkeypatch.setattr(core.NEAR_DUPLICATES, 'max_entries', 0)  # each app classifies for itself
+    return backend
+
+
+def test_predict_and_stats_match_between_apps(storage):
+    expected = flask_responses()
+    actual, stats_status, async_stats = asyncio.run(async_responses())
+
+    assert actual == expected
+    assert [response[0] for response in expected] == [200, 400, 400, 422, 400, 200, 200, 422, 200]
+    assert expected[6][1] == 'true'
+    assert [response[4] for response in expected] == [True, False, False, False, False, True, True, False, True]
+    assert expected[8][2] == 'application/msgpack'
+
+    response = core.app.test_client().get('/stats')
+    flask_stats = response.get_json()
+    assert stats_status == response.status_code == 200
+    for body in (async_stats, flask_stats):
+        body.pop('timestamp')
+    assert async_stats == flask_stats
+    assert async_stats['total_predictions'] == 6  # three stored predictions per app
+    assert async_stats['storage'] == 'sqlite'
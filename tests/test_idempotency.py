@@ -0,0 +1,49 @@
+import pytest
+
+import app as core
+from idempotency import IdempotencyStore
+from storage import SQLiteStorage
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    backend = SQLiteStorage(str(tmp_path / 'predictions.db'))
+    backend.init()
+    monkeypatch.setattr(core, 'STORAGE', backend)
+    monkeypatch.setattr(core.NEAR_DUPLICATES, 'max_entries', 0)
+    return core.app.test_client()
+
+
+def other_worker(monkeypatch):
+    """A fresh in-memory key store, as seen by a worker that did not serve the first request"""
+    monkeypatch.setattr(core, 'IDEMPOTENCY', IdempotencyStore())
+
+
+def test_key_reused_on_another_worker_with_a_different_text_conflicts(client, monkeypatch):
+    headers = {'Idempotency-Key': 'cross-worker'}
+    first = client.post('/predict', json={'text': 'Your pricing is too high'}, headers=headers)
+    assert first.status_code == 200
+
+    other_worker(monkeypatch)
+    conflict = client.post('/predict', json={'text': 'The app crashes on login'}, headers=headers)
+    assert conflict.status_code == 422
+    assert conflict.get_json() == {'error': 'Idempotency-Key was already used with a different text'}
+
+    # The key was released, and the original text still replays the stored row
+    retry = client.post('/predict', json={'text': 'Your pricing is too high'}, headers=headers)
+    assert retry.status_code == 200
+    assert retry.get_json()['firestore_id'] == first.get_json()['firestore_id']
+
+
+def test_batch_item_key_reused_on_another_worker_conflicts(client, monkeypatch):
+    first = client.post('/predict/batch', json={'texts': ['Your pricing is too high'], 'idempotency_keys': ['item']})
+    assert first.get_json()['results'][0]['success']
+
+    other_worker(monkeypatch)
+    response = client.post('/predict/batch', json={
+        'texts': ['The app crashes on login', 'Your pricing is too high'],
+        'idempotency_keys': ['item', None]
+    })
+    conflict, unkeyed = response.get_json()['results']
+    assert conflict == {'success': False, 'error': 'Idempotency key was already used with a different text'}
+    assert unkeyed['success']
@@ -0,0 +1,54 @@
+import joblib
+import pytest
+
+from junk_filter import JunkFilter
+
+
+@pytest.fixture(scope='module')
+def vectorizer():
+    return joblib.load('tfidf_vectorizer.pkl')
+
+
+@pytest.fixture(scope='module')
+def junk_filter(vectorizer):
+    return JunkFilter.from_vectorizer(vectorizer)
+
+
+@pytest.mark.parametrize('text', [
+    # short
+    'ok', 'meh...', 'Noooooo!!!!!', 'Soooooo good', 'Love it!!!', 'wtf?', 'Nope.',
+    # numeric
+    '10/10', '5/5 would buy again', '$49.99 for this?!', 'ERR 0x80070005 at 10:42',
+    'v2.3.1 broke login (#4521)', '404', 'Charged 3x: $12, $12, $12',
+    # non-English
+    'Merci beaucoup', 'Muy buena aplicación, pero lenta', 'Приложение постоянно вылетает',
+    'アプリがすぐ落ちる', '很好用，谢谢！', 'Sehr gut 👍👍👍',
+])
+def test_real_feedback_passes(junk_filter, text):
+    assert junk_filter.reason(text) is None
+
+
+@pytest.mark.parametrize('text, reason', [
+    ('!!!!!!!!!', 'junk_symbols'),
+    ('...   ---', 'junk_symbols'),
+    ('^^^^ **** ~~~~ <<>> hi', 'junk_symbols'),
+    ('aaaaaaaaaaaaaaaaaaaa', 'junk_repeated_chars'),
+    ('zzzzzzzzzz !!!!!!!!!!', 'junk_repeated_chars'),
+    ('lol lol lol lol lol lol lol', 'junk_repeated_words'),
+])
+def test_junk_is_caught(junk_filter, text, reason):
+    assert junk_filter.reason(text) == reason
+
+
+def test_runs_are_measured_over_the_whole_text(junk_filter):
+    assert junk_filter.reason('x' * 5000) == 'junk_repeated_chars'
+    # The letters come after the first 1000 characters
+    assert junk_filter.reason('!' * 1500 + ' but the new export is great') is None
+
+
+def test_vocabulary_check_is_opt_in(vectorizer, junk_filter):
+    strict = JunkFilter.from_vectorizer(vectorizer, require_vocabulary=True)
+    assert junk_filter.reason('Merci beaucoup') is None
+    assert strict.reason('Merci beaucoup') == 'junk_no_vocabulary'
+    assert strict.reason('Merci beaucoup', check_vocabulary=False) is None
+    assert strict.reason('The app crashes on login') is None
@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+import app as core
+from storage import SQLiteStorage
+
+DOCUMENT = ' '.join(pd.read_csv('customer_feedback.csv')['feedback_text'].astype(str).str.strip())[:12000]
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    backend = SQLiteStorage(str(tmp_path / 'predictions.db'))
+    backend.init()
+    monkeypatch.setattr(core, 'STORAGE', backend)
+    return backend
+
+
+def test_stores_an_excerpt_and_replays_the_key(storage):
+    client = core.app.test_client()
+    total_before = sum(core.LIVE_STATS.snapshot()[0].values())
+    headers = {'Idempotency-Key': 'long-1'}
+
+    first = client.post('/predict/long', json={'text': f'   {DOCUMENT}   '}, headers=headers)
+    assert first.status_code == 200
+    body = first.get_json()
+    assert body['chunks']['count'] > 1
+
+    row_id = int(body['firestore_id'])
+    stored = storage.fetch_texts([row_id])[row_id]
+    assert len(stored) <= core.MAX_TEXT_LENGTH
+    assert DOCUMENT.startswith(stored)
+
+    replay = client.post('/predict/long', json={'text': DOCUMENT}, headers=headers)
+    assert replay.headers['Idempotent-Replayed'] == 'true'
+    assert replay.get_json()['firestore_id'] == body['firestore_id']
+    conflict = client.post('/predict/long', json={'text': DOCUMENT + ' More.'}, headers=headers)
+    assert conflict.status_code == 422
+    # Counted once, after the save
+    assert sum(core.LIVE_STATS.snapshot()[0].values()) == total_before + 1
+
+
+def test_junk_documents_are_rejected(storage):
+    response = core.app.test_client().post('/predict/long', json={'text': 'x' * 8000})
+    assert response.status_code == 422
+    assert response.get_json()['error_type'] == 'junk_repeated_chars'
@@ -0,0 +1,89 @@
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+import similarity_index
+from similarity_index import SimilarityIndex, SimilaritySyncJob
+
+TEXTS = [
+    'The app crashes when I upload a photo',
+    'Upload fails and the app crashes again',
+    'Please add a dark mode option',
+    'Too expensive for what it offers'
+]
+CATEGORIES = ['Bug Report', 'Bug Report', 'Feature Request', 'Pricing Complaint']
+
+
+def stored_rows():
+    return [(i + 1, text, category) for i, (text, category) in enumerate(zip(TEXTS, CATEGORIES))]
+
+
+def fetch_from(rows):
+    return lambda after_id, limit: [row for row in rows if row[0] > after_id][:limit]
+
+
+def make_index():
+    vectorizer = TfidfVectorizer().fit(TEXTS)
+    return SimilarityIndex(len(vectorizer.vocabulary_)), vectorizer
+
+
+def test_batch_then_sync_does_not_index_rows_twice():
+    index, vectorizer = make_index()
+    rows = stored_rows()
+
+    index.add_batch([row[0] for row in rows], vectorizer.transform(TEXTS), CATEGORIES)
+    added = index.sync(fetch_from(rows), vectorizer.transform)
+
+    assert added == 0
+    assert len(index) == len(TEXTS)
+    matches = index.query(vectorizer.transform(['app crashes on upload']), top_k=10)
+    ids = [row_id for row_id, _, _ in matches]
+    assert len(ids) == len(set(ids))
+    assert set(ids) == {1, 2}
+
+
+def test_sync_indexes_rows_saved_elsewhere_once():
+    index, vectorizer = make_index()
+    rows = stored_rows()
+
+    index.add(1, vectorizer.transform(TEXTS[:1]), CATEGORIES[0])
+    added = index.sync(fetch_from(rows), vectorizer.transform)
+
+    assert added == len(TEXTS) - 1
+    assert sorted(row_id for row_id, _, _ in index.query(vectorizer.transform(['app crashes']), top_k=10)) == [1, 2]
+
+
+def test_sync_job_catches_up_in_batches():
+    index, vectorizer = make_index()
+    job = SimilaritySyncJob(index, fetch_from(stored_rows()), vectorizer.transform,
+                            cpu_budget=1.0, batch_size=3)
+
+    assert job.run_once() == len(TEXTS)
+    assert index.synced_id == len(TEXTS)
+    assert job.run_once() == 0
+
+
+def test_inline_ids_stay_bounded_without_sync(monkeypatch):
+    monkeypatch.setattr(similarity_index, 'MAX_INLINE_IDS', 2)
+    index, vectorizer = make_index()
+    rows = stored_rows()
+    for row_id, text, category in rows:
+        index.add(row_id, vectorizer.transform([text]), category)
+
+    assert len(index._inline_ids) <= 2
+    # Forgotten ids are checked against the index, so nothing is indexed twice
+    assert index.sync(fetch_from(rows), vectorizer.transform) == 0
+    assert len(index) == len(TEXTS)
+    assert not index._inline_ids and index._forgotten_through == 0
+
+
+def test_saved_index_loads_without_pickle(tmp_path):
+    index, vectorizer = make_index()
+    index.add_batch([1, 2, 3, 4], vectorizer.transform(TEXTS), CATEGORIES)
+    path = str(tmp_path / 'index.npz')
+    index.save(path)
+
+    with np.load(path, allow_pickle=False) as data:
+        assert data['categories'].dtype.kind == 'U'
+    loaded = SimilarityIndex.load(path, index.n_features)
+    query = vectorizer.transform(['dark mode please'])
+    assert loaded.query(query, category='Feature Request') == index.query(query, category='Feature Request')
@@ -0,0 +1,31 @@
+import pytest
+
+import app as core
+from stats_stream import LiveStats, StatsBroadcaster
+
+
+@pytest.fixture
+def broadcaster(monkeypatch):
+    broadcaster = StatsBroadcaster(LiveStats(), interval=60, max_subscribers=8)
+    monkeypatch.setattr(core, 'STATS_BROADCASTER', broadcaster)
+    return broadcaster
+
+
+def test_streams_take_at_most_a_quarter_of_the_worker_threads(broadcaster):
+    core.limit_stream_subscribers(8)
+    assert broadcaster.max_subscribers == 2
+
+    client = core.app.test_client()
+    streams = [client.get('/stats/stream', buffered=False) for _ in range(2)]
+    assert [response.status_code for response in streams] == [200, 200]
+    # Rejected before the stream starts, not after holding a thread
+    rejected = client.get('/stats/stream')
+    assert rejected.status_code == 503
+    assert rejected.mimetype == 'application/json'
+    for response in streams:
+        response.close()
+
+
+def test_single_threaded_workers_do_not_stream(broadcaster):
+    core.limit_stream_subscribers(1)
+    assert core.app.test_client().get('/stats/stream').status_code == 503
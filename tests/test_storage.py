@@ -0,0 +1,85 @@
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+from storage import SQLiteStorage, create_async_storage
+
+
+@pytest.fixture
+def sqlite_storage(tmp_path):
+    backend = SQLiteStorage(str(tmp_path / 'predictions.db'))
+    backend.init()
+    return backend
+
+
+def test_async_sqlite_group_commits_and_replays_keys(sqlite_storage):
+    pytest.importorskip('aiosqlite')
+
+    async def run():
+        storage = create_async_storage(sqlite_storage)
+        await storage.open()
+        try:
+            saved = await asyncio.gather(*[
+                storage.save([(f'text {n % 3}', 'Bug', 0.5)], [f'key-{n % 3}'])
+                for n in range(9)
+            ])
+            return saved, storage.commits, await storage.stats()
+        finally:
+            await storage.close()
+
+    saved, commits, (total, categories) = asyncio.run(run())
+    assert commits < 9  # concurrent saves share transactions
+    assert [created for ((_, created),) in saved] == [True] * 3 + [False] * 6
+    assert [row_id for ((row_id, _),) in saved] == [saved[n % 3][0][0] for n in range(9)]
+    assert total == 3 and categories == [('Bug', 3, 0.5)]
+    # The synchronous backend sees the same keys
+    assert sqlite_storage.save([('text 0', 'Bug', 0.5)], ['key-0']) == [(saved[0][0][0], False)]
+
+
+def test_saves_fail_and_the_writer_restarts_when_it_dies(sqlite_storage, monkeypatch):
+    connect = sqlite_storage.connect
+    calls = []
+
+    def flaky_connect():
+        calls.append(1)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError('unable to open database file')
+        return connect()
+
+    monkeypatch.setattr(sqlite_storage, 'connect', flaky_connect)
+    with pytest.raises(sqlite3.OperationalError):
+        sqlite_storage.save([('first', 'Bug', 0.5)])
+    assert sqlite_storage.save([('second', 'Bug', 0.5)]) == [(1, True)]
+    assert len(calls) == 2
+
+
+def test_save_wait_is_bounded(sqlite_storage, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(sqlite_storage, '_commit_batch', lambda conn, batch: release.wait(5))
+    sqlite_storage.write_timeout = 0.05
+    try:
+        with pytest.raises(TimeoutError):
+            sqlite_storage.save([('stuck', 'Bug', 0.5)])
+    finally:
+        release.set()
+
+
+def test_stored_key_with_a_different_text_is_a_conflict(sqlite_storage):
+    assert sqlite_storage.save([('first text', 'Bug', 0.5)], ['key']) == [(1, True)]
+    assert sqlite_storage.save([('other text', 'Bug', 0.5)], ['key']) == [(None, False)]
+    assert sqlite_storage.save([('first text', 'Bug', 0.5)], ['key']) == [(1, False)]
+
+
+def test_keys_stored_before_fingerprints_still_replay(tmp_path):
+    path = str(tmp_path / 'predictions.db')
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE idempotency_keys (key TEXT PRIMARY KEY, prediction_id INTEGER, created_at TEXT NOT NULL);
+        INSERT INTO idempotency_keys VALUES ('old-key', 7, '2999-01-01T00:00:00');
+    """)
+    conn.close()
+    storage = SQLiteStorage(path)
+    storage.init()
+    assert storage.save([('any text', 'Bug', 0.5)], ['old-key']) == [(7, False)]
@@ -0,0 +1,33 @@
+import threading
+
+from warmup import Warmup
+
+
+def test_timed_out_warmup_is_not_ready_until_it_finishes():
+    release = threading.Event()
+    warmup = Warmup(['some text'], timeout=0.05)
+
+    assert warmup.start([('slow', lambda texts: release.wait(5))])
+    assert not warmup.wait()
+    assert not warmup.ready
+    assert warmup.snapshot()['timed_out'] is True
+
+    release.set()
+    assert warmup.wait(5)
+    assert warmup.ready
+    assert warmup.snapshot()['finished'] is True
+
+
+def test_warmup_starts_once_per_process_and_survives_failing_steps():
+    calls = []
+    warmup = Warmup(['some text'])
+
+    def boom(texts):
+        raise RuntimeError('storage down')
+
+    assert warmup.start([('storage', boom), ('model', calls.append)])
+    assert not warmup.start([('model', calls.append)])
+    assert warmup.wait()
+    assert warmup.ready
+    assert calls == [['some text']]
+    assert warmup.snapshot()['steps']['storage']['status'] == 'failed: storage down'
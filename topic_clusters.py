@@ -0,0 +1,215 @@
+"""
+Background sub-topic clustering within each predicted category
+
+A TopicClusterer keeps one MiniBatchKMeans model per category and feeds it
+only rows it has not seen before (partial_fit on the TF-IDF features the
+service already computes). For each cluster it tracks a size, the
+highest-weighted centroid terms and a few representative texts closest to
+the centroid.
+
+TopicClusteringJob runs the clusterer in a daemon thread, off the request
+path. Only one process per host does the work (an flock-based leader
+lock); the leader writes a JSON snapshot that every worker serves. The job
+keeps its CPU use under a budget by sleeping in proportion to the CPU time
+each mini-batch consumed.
+
+The leader also pickles the clusterer next to the snapshot so a restart
+resumes where it stopped. Unpickling runs code, so the snapshot directory
+is created with mode 0700 and the state is only loaded from a regular
+file owned by this user that nobody else can write.
+"""
+
+import fcntl
+import heapq
+import json
+import logging
+import os
+import stat
+import threading
+import time
+
+import joblib
+import numpy as np
+from scipy.sparse import vstack
+from sklearn.cluster import MiniBatchKMeans
+
+logger = logging.getLogger(__name__)
+
+
+class TopicClusterer:
+    """Incremental per-category k-means over TF-IDF rows"""
+
+    def __init__(self, terms, n_clusters=5, examples_per_cluster=3, top_terms=8):
+        self.terms = terms
+        self.n_clusters = n_clusters
+        self.examples_per_cluster = examples_per_cluster
+        self.top_terms = top_terms
+        self.last_id = 0
+        self._models = {}
+        self._sizes = {}
+        self._examples = {}
+        self._pending = {}  # category -> (vectors, texts) until there are enough rows to seed k-means
+
+    def update(self, vectors, texts, categories):
+        """Fold a batch of new rows (CSR matrix, texts, categories) into the models"""
+        categories = np.asarray(categories)
+        for category in np.unique(categories):
+            rows = np.flatnonzero(categories == category)
+            self._update_category(str(category), vectors[rows], [texts[i] for i in rows])
+
+    def _update_category(self, category, vectors, texts):
+        model = self._models.get(category)
+        if model is None:
+            pending_vectors, pending_texts = self._pending.get(category, ([], []))
+            pending_vectors.append(vectors)
+            pending_texts.extend(texts)
+            if len(pending_texts) < self.n_clusters:
+                self._pending[category] = (pending_vectors, pending_texts)
+                return
+            self._pending.pop(category, None)
+            vectors, texts = vstack(pending_vectors).tocsr(), pending_texts
+            model = self._models[category] = MiniBatchKMeans(
+                n_clusters=self.n_clusters, random_state=42, n_init=3
+            )
+            self._sizes[category] = np.zeros(self.n_clusters, dtype=np.int64)
+            self._examples[category] = [[] for _ in range(self.n_clusters)]
+
+        model.partial_fit(vectors)
+        distances = model.transform(vectors)
+        labels = distances.argmin(axis=1)
+        np.add.at(self._sizes[category], labels, 1)
+        for text, label, distance in zip(texts, labels, distances[np.arange(len(labels)), labels]):
+            # Min-heap on negated distance keeps the closest texts
+            heap = self._examples[category][label]
+            item = (-float(distance), text)
+            if len(heap) < self.examples_per_cluster:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+
+    def snapshot(self):
+        """JSON-serializable view of every category's clusters"""
+        categories = {}
+        for category, model in self._models.items():
+            clusters = []
+            for label, centroid in enumerate(model.cluster_centers_):
+                top = np.argsort(-centroid)[:self.top_terms]
+                clusters.append({
+                    'cluster': label,
+                    'size': int(self._sizes[category][label]),
+                    'top_terms': [str(self.terms[i]) for i in top if centroid[i] > 0],
+                    'examples': [text for _, text in sorted(self._examples[category][label], reverse=True)]
+                })
+            clusters.sort(key=lambda c: c['size'], reverse=True)
+            categories[category] = clusters
+        return {
+            'last_id': self.last_id,
+            'updated_at': time.time(),
+            'n_clusters': self.n_clusters,
+            'categories': categories
+        }
+
+
+class TopicClusteringJob:
+    """Periodic, CPU-budgeted clustering of new predictions in a daemon thread"""
+
+    def __init__(self, clusterer, fetch_rows, vectorize, snapshot_path,
+                 interval=300, cpu_budget=0.1, batch_size=256):
+        self.clusterer = clusterer
+        self.fetch_rows = fetch_rows
+        self.vectorize = vectorize
+        self.snapshot_path = snapshot_path
+        self.state_path = snapshot_path + '.state.pkl'
+        self.interval = interval
+        self.cpu_budget = cpu_budget
+        self.batch_size = batch_size
+        self._pid = None
+        self._lock_file = None
+        self._start_lock = threading.Lock()
+
+    def ensure_started(self):
+        """Start the thread once per process (threads do not survive fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._lock_file = None
+            threading.Thread(target=self._run, name='topic-clustering', daemon=True).start()
+            self._pid = os.getpid()
+
+    def _acquire_leadership(self):
+        """Non-blocking host-wide lock so only one worker clusters"""
+        if self._lock_file is not None:
+            return True
+        os.makedirs(os.path.dirname(os.path.abspath(self.snapshot_path)), mode=0o700, exist_ok=True)
+        lock_file = open(self.snapshot_path + '.lock', 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        if os.path.exists(self.state_path):
+            try:
+                self.clusterer = _load_owned(self.state_path)
+            except Exception as e:
+                logger.warning(f"Discarding unreadable topic cluster state: {e}")
+        return True
+
+    def _run(self):
+        while True:
+            try:
+                if self._acquire_leadership():
+                    if self.run_once():
+                        self._write_snapshot()
+            except Exception as e:
+                logger.warning(f"Topic clustering error: {e}")
+            time.sleep(self.interval)
+
+    def run_once(self):
+        """Cluster every row newer than the last processed id; returns rows processed"""
+        processed = 0
+        while True:
+            rows = self.fetch_rows(self.clusterer.last_id, self.batch_size)
+            if not rows:
+                return processed
+            cpu_start, wall_start = time.thread_time(), time.monotonic()
+            texts = [row[1] for row in rows]
+            self.clusterer.update(self.vectorize(texts), texts, [row[2] for row in rows])
+            self.clusterer.last_id = rows[-1][0]
+            processed += len(rows)
+            # Sleep long enough that this thread averages <= cpu_budget of one core
+            cpu_used = time.thread_time() - cpu_start
+            elapsed = time.monotonic() - wall_start
+            time.sleep(max(0.0, cpu_used / self.cpu_budget - elapsed))
+
+    def _write_snapshot(self):
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.clusterer.snapshot(), f)
+        os.replace(tmp_path, self.snapshot_path)
+        tmp_path = self.state_path + '.tmp'
+        if os.path.lexists(tmp_path):
+            os.unlink(tmp_path)
+        with os.fdopen(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), 'wb') as f:
+            joblib.dump(self.clusterer, f)
+        os.replace(tmp_path, self.state_path)
+
+
+def _load_owned(path):
+    """Unpickle path only if it is a regular file of ours that nobody else can write"""
+    with os.fdopen(os.open(path, os.O_RDONLY | os.O_NOFOLLOW), 'rb') as f:
+        st = os.fstat(f.fileno())
+        if not stat.S_ISREG(st.st_mode) or st.st_uid != os.geteuid() or st.st_mode & 0o022:
+            raise PermissionError(f"{path} is not a private file owned by this user")
+        return joblib.load(f)
+
+
+def read_snapshot(path):
+    """Load the latest snapshot written by the leader, or None"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,323 @@
+"""
+Per-request tracing with a bounded store of the slowest recent traces
+
+Each traced request gets a trace id (taken from an incoming W3C
+`traceparent` header when there is one) and records spans - name, offset
+and duration - for the steps instrumented with `span()`. Spans cost two
+perf_counter calls and a list append; nothing is formatted on the request
+thread.
+
+When a request finishes, its trace is offered to a SlowTraceStore, which
+keeps the `max_traces` slowest traces of the last `window` seconds in two
+rotating generations (so memory stays bounded and old outliers age out),
+queryable by id. Histograms get OpenMetrics exemplars pointing at trace
+ids through `exemplar()`, only for observations slow enough that the
+trace is likely to be kept, so an exemplar in Grafana leads to a trace
+/traces can still show.
+
+Optionally, finished traces are exported in OTLP/HTTP JSON to a collector
+(for example `http://localhost:4318/v1/traces`) by a background thread
+with a bounded queue: the slow traces the store keeps, plus a random
+sample of the rest. When the queue is full or the collector is down,
+traces are dropped and counted.
+"""
+
+import contextvars
+import heapq
+import itertools
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar('trace', default=None)
+_TRACEPARENT = re.compile(r'^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$')
+
+
+def parse_traceparent(header):
+    """(trace_id, parent_span_id) from a W3C traceparent header, or (None, None)"""
+    match = _TRACEPARENT.match((header or '').strip().lower())
+    if not match or match.group(1) == '0' * 32 or match.group(2) == '0' * 16:
+        return None, None
+    return match.group(1), match.group(2)
+
+
+def new_id(bits=128):
+    return f'{random.getrandbits(bits):0{bits // 4}x}'
+
+
+class Trace:
+    __slots__ = ('trace_id', 'parent_span_id', 'name', 'start', 'started_at', 'duration',
+                 'spans', 'attributes', 'floor')
+
+    def __init__(self, name, trace_id=None, parent_span_id=None, floor=0.0):
+        self.trace_id = trace_id or new_id()
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.start = time.perf_counter()
+        self.started_at = time.time()
+        self.duration = None
+        self.spans = []  # (name, offset seconds, duration seconds, attributes or None)
+        self.attributes = {}
+        self.floor = floor  # slowest-trace admission threshold when the trace started
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'parent_span_id': self.parent_span_id,
+            'name': self.name,
+            'started_at': self.started_at,
+            'duration_ms': round(self.duration * 1000, 3) if self.duration is not None else None,
+            'attributes': self.attributes,
+            'spans': [
+                {
+                    'name': name,
+                    'offset_ms': round(offset * 1000, 3),
+                    'duration_ms': round(duration * 1000, 3),
+                    **({'attributes': attributes} if attributes else {})
+                }
+                for name, offset, duration, attributes in self.spans
+            ]
+        }
+
+
+def current_trace():
+    return _current.get()
+
+
+@contextmanager
+def span(name, **attributes):
+    """Time a block as a span of the current trace (a no-op outside a trace)"""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.spans.append((name, start - trace.start, time.perf_counter() - start, attributes or None))
+
+
+def exemplar(seconds):
+    """Exemplar labels for a histogram observation, or None
+
+    Only observations at least as slow as the store's admission threshold
+    get one, so exemplars point at traces that are likely to be kept.
+    """
+    trace = _current.get()
+    if trace is None or seconds < trace.floor:
+        return None
+    return {'trace_id': trace.trace_id}
+
+
+class SlowTraceStore:
+    """The slowest `max_traces` traces of roughly the last `window` seconds"""
+
+    def __init__(self, max_traces=100, window=300.0):
+        self.max_traces = max_traces
+        self.window = window
+        self._lock = threading.Lock()
+        self._current = []  # min-heap of (duration, seq, trace)
+        self._previous = []
+        self._by_id = {}
+        self._rotated_at = time.monotonic()
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self._by_id)
+
+    @property
+    def floor(self):
+        """Duration a trace needs to be kept right now"""
+        heap = self._current
+        return heap[0][0] if len(heap) >= self.max_traces else 0.0
+
+    def _rotate(self):
+        # Two generations of window/2 each: a trace is kept at least window/2
+        # and at most `window` seconds, without per-trace expiry bookkeeping
+        if time.monotonic() - self._rotated_at < self.window / 2:
+            return
+        for _, _, trace in self._previous:
+            self._forget(trace)
+        self._previous, self._current = self._current, []
+        self._rotated_at = time.monotonic()
+
+    def _forget(self, trace):
+        # Requests continuing one upstream trace share its id; keep the newest
+        if self._by_id.get(trace.trace_id) is trace:
+            del self._by_id[trace.trace_id]
+
+    def add(self, trace):
+        """Offer a finished trace; returns True if it was kept"""
+        with self._lock:
+            self._rotate()
+            item = (trace.duration, next(self._seq), trace)
+            if len(self._current) < self.max_traces:
+                heapq.heappush(self._current, item)
+            elif trace.duration > self._current[0][0]:
+                self._forget(heapq.heapreplace(self._current, item)[2])
+            else:
+                return False
+            self._by_id[trace.trace_id] = trace
+            return True
+
+    def get(self, trace_id):
+        with self._lock:
+            return self._by_id.get(trace_id)
+
+    def slowest(self, limit=20, name=None):
+        """Kept traces, slowest first, optionally only those with one root name"""
+        with self._lock:
+            self._rotate()
+            traces = list(self._by_id.values())
+        if name is not None:
+            traces = [trace for trace in traces if trace.name == name]
+        traces.sort(key=lambda trace: trace.duration, reverse=True)
+        return traces[:limit]
+
+
+class OTLPExporter:
+    """Batches finished traces to an OTLP/HTTP JSON endpoint from a background thread"""
+
+    def __init__(self, url, service_name='textcat-api', max_queue=2048, batch_size=256,
+                 flush_interval=2.0, timeout=5.0):
+        self.url = url
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.exported = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._start_lock = threading.Lock()
+        self._pid = None
+
+    def ensure_started(self):
+        """Start the thread once per process (threads do not survive fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            threading.Thread(target=self._run, name='otlp-export', daemon=True).start()
+            self._pid = os.getpid()
+
+    def submit(self, trace):
+        self.ensure_started()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._post(batch)
+                self.exported += len(batch)
+            except Exception as e:
+                self.dropped += len(batch)
+                logger.warning(f"Trace export to {self.url} failed: {e}")
+
+    def _post(self, traces):
+        body = json.dumps(self.encode(traces), separators=(',', ':')).encode('utf-8')
+        request = urllib.request.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+    @staticmethod
+    def _attributes(attributes):
+        encoded = []
+        for key, value in (attributes or {}).items():
+            if isinstance(value, bool):
+                encoded.append({'key': key, 'value': {'boolValue': value}})
+            elif isinstance(value, int):
+                encoded.append({'key': key, 'value': {'intValue': str(value)}})
+            elif isinstance(value, float):
+                encoded.append({'key': key, 'value': {'doubleValue': value}})
+            else:
+                encoded.append({'key': key, 'value': {'stringValue': str(value)}})
+        return encoded
+
+    def encode(self, traces):
+        """OTLP JSON (ExportTraceServiceRequest) for finished traces"""
+        spans = []
+        for trace in traces:
+            start_ns = int(trace.started_at * 1e9)
+            root_id = new_id(64)
+            status = trace.attributes.get('http.status_code', 200)
+            root = {
+                'traceId': trace.trace_id,
+                'spanId': root_id,
+                'name': trace.name,
+                'kind': 2,  # SERVER
+                'startTimeUnixNano': str(start_ns),
+                'endTimeUnixNano': str(start_ns + int(trace.duration * 1e9)),
+                'attributes': self._attributes(trace.attributes),
+                'status': {'code': 2 if isinstance(status, int) and status >= 500 else 0}
+            }
+            if trace.parent_span_id:
+                root['parentSpanId'] = trace.parent_span_id
+            spans.append(root)
+            for name, offset, duration, attributes in trace.spans:
+                span_start = start_ns + int(offset * 1e9)
+                spans.append({
+                    'traceId': trace.trace_id,
+                    'spanId': new_id(64),
+                    'parentSpanId': root_id,
+                    'name': name,
+                    'kind': 1,  # INTERNAL
+                    'startTimeUnixNano': str(span_start),
+                    'endTimeUnixNano': str(span_start + int(duration * 1e9)),
+                    'attributes': self._attributes(attributes)
+                })
+        return {'resourceSpans': [{
+            'resource': {'attributes': self._attributes({'service.name': self.service_name})},
+            'scopeSpans': [{'scope': {'name': 'textcat.tracing'}, 'spans': spans}]
+        }]}
+
+
+class Tracer:
+    """Starts and finishes request traces; keeps the slow ones and optionally exports"""
+
+    def __init__(self, store, exporter=None, export_sample_rate=0.1):
+        self.store = store
+        self.exporter = exporter
+        self.export_sample_rate = export_sample_rate
+        self.finished = 0
+
+    def start(self, name, traceparent=None):
+        trace_id, parent_span_id = parse_traceparent(traceparent)
+        trace = Trace(name, trace_id, parent_span_id, floor=self.store.floor)
+        _current.set(trace)
+        return trace
+
+    def finish(self, trace, **attributes):
+        """Close the current trace; returns True if the slow-trace store kept it"""
+        _current.set(None)
+        trace.duration = time.perf_counter() - trace.start
+        trace.attributes.update(attributes)
+        self.finished += 1
+        kept = self.store.add(trace)
+        if self.exporter is not None and (kept or random.random() < self.export_sample_rate):
+            self.exporter.submit(trace)
+        return kept
@@ -0,0 +1,170 @@
+"""
+Opt-in capture of /predict traffic for replay
+
+With TRAFFIC_CAPTURE_DIR set, a sample of successful /predict and
+/predict/batch requests is written to `traffic-<pid>.ndjson` in that
+directory, one compact JSON line per request:
+
+    {"ts": 1760000000.123, "ep": "predict", "body": {"text": "..."},
+     "ms": 2.41, "out": "Bug Report"}
+
+Texts are sanitized before they are written: e-mail addresses, URLs,
+phone numbers and long digit runs become placeholders, so the log keeps
+the real length and repetition profile of the traffic without the
+personal data. Headers (including Idempotency-Key) are never recorded.
+
+The request thread only does a non-blocking put of references to the
+parsed body and the response bytes on a bounded queue. Sanitizing,
+decoding the response and writing happen on one background thread per
+process; when the queue is full or the file reaches `max_bytes`, records
+are dropped and counted. scripts/replay_traffic.py merges the per-worker
+files by timestamp.
+"""
+
+import glob
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+_EMAIL = re.compile(r'\b[\w.+-]+@[\w-]+\.[\w.-]+\b')
+_URL = re.compile(r'\bhttps?://\S+|\bwww\.\S+', re.IGNORECASE)
+_PHONE = re.compile(r'\+?\d[\d ().-]{6,}\d')
+_DIGITS = re.compile(r'\d{4,}')
+
+
+def sanitize_text(text):
+    """Replace personal data with placeholders"""
+    text = _EMAIL.sub('<email>', text)
+    text = _URL.sub('<url>', text)
+    text = _PHONE.sub('<phone>', text)
+    return _DIGITS.sub('<number>', text)
+
+
+def sanitize_body(body):
+    """Keep only the fields replay needs, with texts sanitized"""
+    clean = {}
+    for field in ('text', 'feedback'):
+        if isinstance(body.get(field), str):
+            clean[field] = sanitize_text(body[field])
+    if isinstance(body.get('texts'), list):
+        clean['texts'] = [sanitize_text(t) if isinstance(t, str) else t for t in body['texts']]
+    if isinstance(body.get('model'), str):
+        clean['model'] = body['model']
+    return clean
+
+
+class TrafficRecorder:
+    """Sampled, size-capped NDJSON capture written by a background thread"""
+
+    def __init__(self, directory, sample_rate=1.0, max_bytes=100 * 1024 * 1024, max_queue=10000):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.recorded = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._start_lock = threading.Lock()
+        self._pid = None
+
+    def ensure_started(self):
+        """Start the writer once per process (threads do not survive fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            threading.Thread(target=self._run, name='traffic-capture', daemon=True).start()
+            self._pid = os.getpid()
+
+    def record(self, endpoint, timestamp, body, latency_ms, response_data, response_mimetype):
+        """Queue one request; returns False when sampled out or dropped"""
+        if random.random() >= self.sample_rate:
+            return False
+        self.ensure_started()
+        try:
+            self._queue.put_nowait((endpoint, timestamp, body, latency_ms, response_data, response_mimetype))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    @staticmethod
+    def _predictions(data, mimetype):
+        """The prediction (or list of predictions) in a response body"""
+        try:
+            if mimetype == 'application/json':
+                payload = json.loads(data)
+            else:
+                import msgpack
+                payload = msgpack.unpackb(data, raw=False)
+        except Exception:
+            return None
+        if 'results' in payload:
+            return [item.get('prediction') for item in payload['results']]
+        return payload.get('prediction')
+
+    def _run(self):
+        path = os.path.join(self.directory, f'traffic-{os.getpid()}.ndjson')
+        with open(path, 'a', encoding='utf-8') as f:
+            size = f.tell()
+            while True:
+                try:
+                    endpoint, timestamp, body, latency_ms, data, mimetype = self._queue.get(timeout=1.0)
+                except queue.Empty:
+                    f.flush()
+                    continue
+                if size >= self.max_bytes:
+                    self.dropped += 1
+                    continue
+                try:
+                    line = json.dumps({
+                        'ts': round(timestamp, 4),
+                        'ep': endpoint,
+                        'body': sanitize_body(body),
+                        'ms': round(latency_ms, 3),
+                        'out': self._predictions(data, mimetype)
+                    }, ensure_ascii=False, separators=(',', ':')) + '\n'
+                except Exception as e:
+                    self.dropped += 1
+                    logger.warning(f"Traffic capture error: {e}")
+                    continue
+                f.write(line)
+                size += len(line.encode('utf-8'))
+                self.recorded += 1
+                if self._queue.empty():
+                    f.flush()
+
+
+def read_capture(paths, limit=None):
+    """Captured records from files, directories or globs, merged in timestamp order
+
+    With `limit`, at most that many records are read from each file.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, 'traffic-*.ndjson'))))
+        else:
+            files.extend(sorted(glob.glob(path)) or [path])
+
+    captured = []
+    for name in files:
+        with open(name, encoding='utf-8') as f:
+            for n, line in enumerate(f):
+                if limit is not None and n >= limit:
+                    break
+                try:
+                    captured.append(json.loads(line))
+                except ValueError:
+                    logger.warning(f"Skipping a truncated line in {name}")
+    # Workers write in completion order, so sort on the request start time
+    captured.sort(key=lambda record: record['ts'])
+    return captured
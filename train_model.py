@@ -1,42 +1,102 @@
 # train_model.py
+#
+# Usage:
+#     python train_model.py [--data customer_feedback.csv] [--no-cache]
+#     python train_model.py --data export.csv --out-of-core [--chunk-rows 50000] [--workers N]
+#
+# Tokenized term counts are cached under .cache/training (see
+# training_cache.py), so re-running on an unchanged dataset only refits
+# IDF and the model. --out-of-core streams corpora too large for memory
+# through a process pool instead (see training_stream.py).
+
+import argparse
+import time
 
-import pandas as pd
 from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.metrics import accuracy_score, classification_report
 import joblib
+import numpy as np
+
+from training_cache import DEFAULT_CACHE_DIR, load_term_counts, tfidf_from_counts
+from training_stream import DEFAULT_CHUNK_ROWS, classification_summary, train_out_of_core
+
+TEXT_COLUMN = 'feedback_text'
+LABEL_COLUMN = 'category'
+TOKENIZER_SETTINGS = {'stop_words': 'english'}
+MAX_FEATURES = 1000
+
+
+def train(data_path, cache_dir=DEFAULT_CACHE_DIR, use_cache=True, verbose=True):
+    """Fit the vectorizer and model; returns (model, vectorizer, accuracy, timings)"""
+    timings = {}
+
+    # 1️⃣ Load dataset (tokenized term counts, from the cache when possible)
+    start = time.perf_counter()
+    counts, terms, labels, cache_hit = load_term_counts(
+        data_path, TEXT_COLUMN, LABEL_COLUMN, cache_dir=cache_dir, use_cache=use_cache,
+        **TOKENIZER_SETTINGS
+    )
+    timings['load_and_tokenize'] = time.perf_counter() - start
+    if verbose:
+        source = "♻️  cached term counts" if cache_hit else "tokenized"
+        print(f"✅ Dataset loaded successfully! {counts.shape[0]} rows, {len(terms)} terms ({source})\n")
+
+    # 2️⃣ Split data
+    train_rows, test_rows = train_test_split(np.arange(counts.shape[0]), test_size=0.2, random_state=42)
+    y_train, y_test = labels[train_rows], labels[test_rows]
+
+    # 3️⃣ Convert text → numerical features using TF-IDF (IDF fit on the training rows)
+    start = time.perf_counter()
+    vectorizer, columns, transformer = tfidf_from_counts(
+        counts[train_rows], terms, max_features=MAX_FEATURES, **TOKENIZER_SETTINGS
+    )
+    X_train_tfidf = transformer.transform(counts[train_rows][:, columns])
+    X_test_tfidf = transformer.transform(counts[test_rows][:, columns])
+    timings['tfidf'] = time.perf_counter() - start
 
-# 1️⃣ Load dataset
-df = pd.read_csv("customer_feedback.csv")
+    # 4️⃣ Train a Naive Bayes model
+    start = time.perf_counter()
+    model = MultinomialNB()
+    model.fit(X_train_tfidf, y_train)
+    timings['fit'] = time.perf_counter() - start
 
-print("✅ Dataset loaded successfully!")
-print(df.head(), "\n")
+    # 5️⃣ Evaluate model
+    y_pred = model.predict(X_test_tfidf)
+    accuracy = accuracy_score(y_test, y_pred)
 
-# 2️⃣ Split data
-X = df['feedback_text']
-y = df['category']
+    if verbose:
+        print("📊 Model Accuracy:", round(accuracy * 100, 2), "%\n")
+        print("🧾 Classification Report:\n", classification_report(y_test, y_pred))
+    return model, vectorizer, accuracy, timings
 
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
-# 3️⃣ Convert text → numerical features using TF-IDF
-vectorizer = TfidfVectorizer(stop_words='english', max_features=1000)
-X_train_tfidf = vectorizer.fit_transform(X_train)
-X_test_tfidf = vectorizer.transform(X_test)
+def main():
+    parser = argparse.ArgumentParser(description='Train the feedback classifier')
+    parser.add_argument('--data', default='customer_feedback.csv')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--no-cache', action='store_true', help='tokenize from scratch and do not write the cache')
+    parser.add_argument('--out-of-core', action='store_true', help='stream the corpus in chunks (bounded memory)')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument('--workers', type=int, default=None, help='tokenizer processes (default: all CPUs)')
+    args = parser.parse_args()
 
-# 4️⃣ Train a Naive Bayes model
-model = MultinomialNB()
-model.fit(X_train_tfidf, y_train)
+    if args.out_of_core:
+        model, vectorizer, accuracy, confusion = train_out_of_core(
+            args.data, TEXT_COLUMN, LABEL_COLUMN, max_features=MAX_FEATURES,
+            chunk_rows=args.chunk_rows, workers=args.workers, **TOKENIZER_SETTINGS
+        )
+        print("📊 Model Accuracy:", round(accuracy * 100, 2), "%\n")
+        print("🧾 Classification Report:\n", classification_summary(confusion))
+    else:
+        model, vectorizer, _, _ = train(args.data, args.cache_dir, use_cache=not args.no_cache)
 
-# 5️⃣ Evaluate model
-y_pred = model.predict(X_test_tfidf)
-accuracy = accuracy_score(y_test, y_pred)
+    # 6️⃣ Save model and vectorizer
+    joblib.dump(model, "textcat_model.pkl")
+    joblib.dump(vectorizer, "tfidf_vectorizer.pkl")
 
-print("📊 Model Accuracy:", round(accuracy * 100, 2), "%\n")
-print("🧾 Classification Report:\n", classification_report(y_test, y_pred))
+    print("💾 Model and vectorizer saved successfully!")
 
-# 6️⃣ Save model and vectorizer
-joblib.dump(model, "textcat_model.pkl")
-joblib.dump(vectorizer, "tfidf_vectorizer.pkl")
 
-print("💾 Model and vectorizer saved successfully!")
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+On-disk cache of tokenized training corpora
+
+Tokenizing every document is the expensive part of fitting a
+TfidfVectorizer. This module caches the result as a term-count matrix (a
+CSR `counts.npz` over the full, alphabetically sorted vocabulary) plus the
+terms and labels, keyed by a content hash of the dataset file and a hash
+of the tokenizer settings. Any change to the data, the tokenizer settings
+or the scikit-learn version gives a new key.
+
+Everything downstream of tokenization derives from the counts:
+tfidf_from_counts() selects the vocabulary of a training split (the same
+max_features rule as CountVectorizer), fits IDF on it and returns a
+standard TfidfVectorizer, so a cached run only pays for IDF and model
+fitting and still writes the artifact format the service loads.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import sklearn
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer, TfidfVectorizer
+
+DEFAULT_CACHE_DIR = os.path.join('.cache', 'training')
+
+# CountVectorizer settings that change which tokens a document produces
+TOKENIZER_PARAMS = ('lowercase', 'stop_words', 'token_pattern', 'ngram_range', 'strip_accents', 'analyzer')
+
+
+def dataset_hash(path, block_size=1 << 20):
+    """Content hash of a file, read in blocks"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def tokenizer_key(text_column, label_column, **tokenizer_settings):
+    """Hash of everything besides the data that affects the cached counts"""
+    params = CountVectorizer(**tokenizer_settings).get_params()
+    settings = {name: params[name] for name in TOKENIZER_PARAMS}
+    settings.update(text_column=text_column, label_column=label_column, sklearn=sklearn.__version__)
+    encoded = json.dumps(settings, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+
+def load_term_counts(path, text_column, label_column, cache_dir=DEFAULT_CACHE_DIR,
+                     use_cache=True, **tokenizer_settings):
+    """
+    Term counts, terms and labels for a CSV corpus, tokenizing only on a cache miss.
+
+    Returns (counts, terms, labels, cache_hit).
+    """
+    entry = os.path.join(
+        cache_dir,
+        f"{dataset_hash(path)}-{tokenizer_key(text_column, label_column, **tokenizer_settings)}"
+    )
+    if use_cache and os.path.exists(os.path.join(entry, 'labels.npy')):
+        counts = sparse.load_npz(os.path.join(entry, 'counts.npz'))
+        terms = np.load(os.path.join(entry, 'terms.npy'))
+        labels = np.load(os.path.join(entry, 'labels.npy'))
+        return counts, terms, labels, True
+
+    import pandas as pd
+    df = pd.read_csv(path, usecols=[text_column, label_column])
+    counter = CountVectorizer(**tokenizer_settings)
+    counts = counter.fit_transform(df[text_column].fillna('')).tocsr()
+    terms = counter.get_feature_names_out().astype(str)
+    labels = df[label_column].to_numpy().astype(str)
+
+    if use_cache:
+        # Written under a temporary name and renamed, so a crash never
+        # leaves a half-written entry that looks complete
+        tmp = f"{entry}.tmp-{os.getpid()}-{time.time_ns()}"
+        os.makedirs(tmp)
+        sparse.save_npz(os.path.join(tmp, 'counts.npz'), counts, compressed=False)
+        np.save(os.path.join(tmp, 'terms.npy'), terms)
+        np.save(os.path.join(tmp, 'labels.npy'), labels)
+        try:
+            os.rename(tmp, entry)
+        except OSError:
+            pass  # another run cached the same entry first
+    return counts, terms, labels, False
+
+
+def top_terms(term_frequency, max_features=None):
+    """
+    Indexes of the terms CountVectorizer keeps for alphabetically sorted
+    terms: every term that occurs, or the max_features most frequent ones.
+    """
+    present = np.flatnonzero(term_frequency > 0)
+    if max_features is None or len(present) <= max_features:
+        return present
+    # Highest corpus frequency first, ties in alphabetical order (stable sort)
+    return np.sort(present[(-term_frequency[present]).argsort(kind='stable')[:max_features]])
+
+
+def select_vocabulary(counts, max_features=None):
+    """Column indexes CountVectorizer would keep after fitting on these rows"""
+    return top_terms(np.asarray(counts.sum(axis=0)).ravel(), max_features)
+
+
+def build_vectorizer(terms, idf, max_features=None, **vectorizer_settings):
+    """A ready-to-use TfidfVectorizer for a fixed vocabulary and IDF vector"""
+    vectorizer = TfidfVectorizer(max_features=max_features, vocabulary=list(terms), **vectorizer_settings)
+    vectorizer.idf_ = idf
+    return vectorizer
+
+
+def tfidf_from_counts(counts, terms, max_features=None, **vectorizer_settings):
+    """
+    Fit TF-IDF on a training split's term counts.
+
+    Returns (vectorizer, columns, transformer): a TfidfVectorizer equivalent
+    to fitting one on the raw training texts, the count columns it keeps and
+    the fitted TfidfTransformer, so any split's counts become features with
+    transformer.transform(split_counts[:, columns]) without re-tokenizing.
+    """
+    columns = select_vocabulary(counts, max_features)
+    transformer = TfidfTransformer(
+        norm=vectorizer_settings.get('norm', 'l2'),
+        use_idf=vectorizer_settings.get('use_idf', True),
+        smooth_idf=vectorizer_settings.get('smooth_idf', True),
+        sublinear_tf=vectorizer_settings.get('sublinear_tf', False)
+    ).fit(counts[:, columns])
+    vectorizer = build_vectorizer(terms[columns].tolist(), transformer.idf_, max_features, **vectorizer_settings)
+    return vectorizer, columns, transformer
@@ -0,0 +1,243 @@
+"""
+Out-of-core training for corpora that don't fit in memory
+
+The CSV is read as raw blocks of `chunk_rows` records (cut at record
+boundaries, quoted newlines included), and each block is parsed and
+tokenized by a worker process. Only aggregates come back to the parent,
+and at most `2 * workers` blocks are in flight, so peak memory is bounded
+by the chunk size and the vocabulary, never by the corpus.
+
+Three streaming passes:
+
+1. Term frequencies, document frequencies and class counts of the
+   training rows, merged incrementally into one growing vocabulary.
+2. With the vocabulary and IDF fixed, per-class sums of the TF-IDF
+   features of the training rows (MultinomialNB's sufficient statistics).
+3. A confusion matrix over the held-out rows.
+
+The train/test split is a hash of the row number (`test_size` of the
+rows), so it is the same for any chunk size or worker count. The result is
+the same TfidfVectorizer + MultinomialNB pair train_model.py writes.
+"""
+
+import io
+import os
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.naive_bayes import MultinomialNB
+
+from training_cache import build_vectorizer, top_terms
+
+DEFAULT_CHUNK_ROWS = 50_000
+
+# Per-process state set by the pool initializer
+_WORKER = {}
+
+
+def iter_csv_blocks(path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Yield (header, block, first_row) with up to chunk_rows records per block.
+
+    A line with an odd number of quotes opens or closes a quoted field, so
+    records spanning several lines are never split between blocks.
+    """
+    with open(path, encoding='utf-8', newline='') as f:
+        header = f.readline()
+        lines, rows, first_row, in_quotes = [], 0, 0, False
+        for line in f:
+            lines.append(line)
+            if line.count('"') % 2:
+                in_quotes = not in_quotes
+            if not in_quotes:
+                rows += 1
+                if rows == chunk_rows:
+                    yield header, ''.join(lines), first_row
+                    first_row += rows
+                    lines, rows = [], 0
+        if lines:
+            yield header, ''.join(lines), first_row
+
+
+def test_mask(first_row, n_rows, test_size=0.2):
+    """Held-out rows of a block: a multiplicative hash of the global row number"""
+    rows = np.arange(first_row, first_row + n_rows, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        hashed = (rows * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(40)
+    return hashed < np.uint64(test_size * (1 << 24))
+
+
+def bounded_map(executor, fn, items, max_in_flight):
+    """Like executor.map, in order, but only pulls max_in_flight items ahead"""
+    pending = deque()
+    for item in items:
+        if len(pending) >= max_in_flight:
+            yield pending.popleft().result()
+        pending.append(executor.submit(fn, *item))
+    while pending:
+        yield pending.popleft().result()
+
+
+def _init_worker(text_column, label_column, test_size, tokenizer_settings, vectorizer=None, model=None):
+    _WORKER.update(
+        text_column=text_column, label_column=label_column, test_size=test_size,
+        tokenizer_settings=tokenizer_settings, vectorizer=vectorizer, model=model
+    )
+
+
+def _parse_block(header, block, first_row):
+    df = pd.read_csv(
+        io.StringIO(header + block), usecols=[_WORKER['text_column'], _WORKER['label_column']],
+        dtype=str, keep_default_na=False
+    )
+    is_test = test_mask(first_row, len(df), _WORKER['test_size'])
+    return df[_WORKER['text_column']].to_numpy(), df[_WORKER['label_column']].to_numpy(), is_test
+
+
+def _count_block(header, block, first_row):
+    """Pass 1: (terms, term freq, doc freq, train class counts, rows)"""
+    texts, labels, is_test = _parse_block(header, block, first_row)
+    train = ~is_test
+    terms, term_frequency, document_frequency = [], np.zeros(0, np.int64), np.zeros(0, np.int64)
+    if train.any():
+        counter = CountVectorizer(**_WORKER['tokenizer_settings'])
+        try:
+            counts = counter.fit_transform(texts[train]).tocsc()
+        except ValueError:
+            pass  # only stop words in this block
+        else:
+            terms = counter.get_feature_names_out().tolist()
+            term_frequency = np.asarray(counts.sum(axis=0)).ravel().astype(np.int64)
+            document_frequency = np.diff(counts.indptr).astype(np.int64)
+    return terms, term_frequency, document_frequency, Counter(labels[train].tolist()), len(labels)
+
+
+def _feature_sums_block(header, block, first_row):
+    """Pass 2: per-class TF-IDF feature sums of the training rows"""
+    texts, labels, is_test = _parse_block(header, block, first_row)
+    classes = _WORKER['model'].classes_
+    sums = np.zeros((len(classes), len(_WORKER['vectorizer'].idf_)))
+    train = ~is_test
+    if train.any():
+        features = _WORKER['vectorizer'].transform(texts[train])
+        class_index = np.searchsorted(classes, labels[train])
+        for i in np.unique(class_index):
+            sums[i] = np.asarray(features[class_index == i].sum(axis=0)).ravel()
+    return sums
+
+
+def _confusion_block(header, block, first_row):
+    """Pass 3: (true label, predicted label) counts of the held-out rows"""
+    texts, labels, is_test = _parse_block(header, block, first_row)
+    if not is_test.any():
+        return Counter()
+    predicted = _WORKER['model'].predict(_WORKER['vectorizer'].transform(texts[is_test]))
+    return Counter(zip(labels[is_test].tolist(), predicted.tolist()))
+
+
+def _grow(array, size):
+    grown = np.zeros(max(size, 2 * len(array)), dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+def naive_bayes_from_counts(classes, class_count, feature_count, alpha=1.0):
+    """A fitted MultinomialNB from its sufficient statistics (what fit() computes)"""
+    model = MultinomialNB(alpha=alpha)
+    model.classes_ = np.asarray(classes)
+    model.class_count_ = np.asarray(class_count, dtype=np.float64)
+    model.feature_count_ = np.asarray(feature_count, dtype=np.float64)
+    model.n_features_in_ = model.feature_count_.shape[1]
+    smoothed = model.feature_count_ + alpha
+    model.feature_log_prob_ = np.log(smoothed) - np.log(smoothed.sum(axis=1, keepdims=True))
+    model.class_log_prior_ = np.log(model.class_count_) - np.log(model.class_count_.sum())
+    return model
+
+
+def train_out_of_core(path, text_column, label_column, max_features=None, chunk_rows=DEFAULT_CHUNK_ROWS,
+                      workers=None, test_size=0.2, verbose=True, **tokenizer_settings):
+    """
+    Stream-train TF-IDF + MultinomialNB over a CSV of any size.
+
+    Returns (model, vectorizer, accuracy, confusion) where confusion maps
+    (true, predicted) label pairs to counts over the held-out rows.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = 2 * workers
+    init = (text_column, label_column, test_size, tokenizer_settings)
+
+    def blocks():
+        return iter_csv_blocks(path, chunk_rows)
+
+    # Pass 1: vocabulary statistics, merged as blocks complete
+    index = {}
+    term_frequency = np.zeros(1 << 16, np.int64)
+    document_frequency = np.zeros(1 << 16, np.int64)
+    class_count, n_rows = Counter(), 0
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=init) as pool:
+        for terms, tf, df, classes, rows in bounded_map(pool, _count_block, blocks(), max_in_flight):
+            positions = np.fromiter((index.setdefault(term, len(index)) for term in terms),
+                                    dtype=np.int64, count=len(terms))
+            if len(index) > len(term_frequency):
+                term_frequency = _grow(term_frequency, len(index))
+                document_frequency = _grow(document_frequency, len(index))
+            np.add.at(term_frequency, positions, tf)
+            np.add.at(document_frequency, positions, df)
+            class_count.update(classes)
+            n_rows += rows
+            if verbose:
+                print(f"   📥 {n_rows:,} rows, {len(index):,} terms", end='\r')
+    if verbose:
+        print()
+    if not class_count:
+        raise ValueError(f"no training rows in {path}")
+
+    # Vocabulary and IDF, exactly as TfidfVectorizer.fit() would choose them
+    terms = np.array(list(index), dtype=object)
+    order = np.argsort(terms)
+    terms = terms[order]
+    term_frequency = term_frequency[:len(index)][order]
+    document_frequency = document_frequency[:len(index)][order]
+    del index
+    columns = top_terms(term_frequency, max_features)
+    n_train = sum(class_count.values())
+    idf = np.log((1 + n_train) / (1 + document_frequency[columns])) + 1  # smooth_idf=True
+    vectorizer = build_vectorizer(terms[columns].tolist(), idf, max_features, **tokenizer_settings)
+    classes = sorted(class_count)
+    model = naive_bayes_from_counts(classes, [class_count[c] for c in classes],
+                                    np.zeros((len(classes), len(columns))))
+
+    # Pass 2: MultinomialNB feature counts over the training rows
+    feature_count = np.zeros((len(classes), len(columns)))
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=init + (vectorizer, model)) as pool:
+        for sums in bounded_map(pool, _feature_sums_block, blocks(), max_in_flight):
+            feature_count += sums
+    model = naive_bayes_from_counts(classes, model.class_count_, feature_count)
+
+    # Pass 3: evaluate on the held-out rows
+    confusion = Counter()
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=init + (vectorizer, model)) as pool:
+        for block_confusion in bounded_map(pool, _confusion_block, blocks(), max_in_flight):
+            confusion.update(block_confusion)
+    n_test = sum(confusion.values())
+    correct = sum(count for (true, predicted), count in confusion.items() if true == predicted)
+    accuracy = correct / n_test if n_test else float('nan')
+    return model, vectorizer, accuracy, confusion
+
+
+def classification_summary(confusion):
+    """Per-class precision / recall / support table from a confusion Counter"""
+    labels = sorted({label for pair in confusion for label in pair})
+    width = max(len(label) for label in labels) + 2
+    lines = [f"{'':>{width}}{'precision':>10}{'recall':>8}{'support':>10}"]
+    for label in labels:
+        true_positive = confusion.get((label, label), 0)
+        predicted = sum(count for (_, p), count in confusion.items() if p == label)
+        support = sum(count for (t, _), count in confusion.items() if t == label)
+        precision = true_positive / predicted if predicted else 0.0
+        recall = true_positive / support if support else 0.0
+        lines.append(f"{label:>{width}}{precision:>10.2f}{recall:>8.2f}{support:>10}")
+    return '\n'.join(lines)
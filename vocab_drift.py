@@ -0,0 +1,141 @@
+"""
+Vocabulary drift monitoring
+
+Every classified text is run through the vectorizer's analyzer (the same
+lowercasing, token pattern and stop words the model sees) and each token
+is checked against the training vocabulary. Per request that gives the
+out-of-vocabulary (OOV) rate, and a text with no known term at all is an
+empty vector: the model can only answer it with the class prior.
+
+Unseen tokens go into a count-min sketch (`depth` rows of `width`
+counters, preallocated) with a top-k table of the heaviest hitters, so
+memory is fixed no matter how many distinct tokens arrive. An update
+costs O(tokens): one hash pair and `depth` counter increments per unseen
+token. Requests carry a handful of tokens, so the counters are a flat
+array('q') updated in plain Python; numpy's per-call overhead would cost
+more than the arithmetic. Once `window_tokens` unseen tokens have been
+counted the sketch and the top-k estimates are halved, so the ranking
+follows recent traffic rather than everything since startup.
+"""
+
+import threading
+import zlib
+from array import array
+
+MAX_TOKEN_CHARS = 64  # longer tokens are truncated in the top-k table
+
+
+class DriftMonitor:
+    """Thread-safe OOV/empty-vector counters plus a sketch of unseen tokens"""
+
+    def __init__(self, vectorizer, width=2048, depth=4, top_k=50, window_tokens=1_000_000):
+        self.analyzer = vectorizer.build_analyzer()
+        self.vocabulary = vectorizer.vocabulary_
+        self.width = width
+        self.depth = depth
+        self.top_k = top_k
+        self.window_tokens = window_tokens
+        self.requests = 0
+        self.empty_vectors = 0
+        self.tokens = 0
+        self.oov_tokens = 0
+        self._lock = threading.Lock()
+        self._table = array('q', bytes(8 * depth * width))
+        self._offsets = range(0, depth * width, width)
+        self._top = {}  # token -> estimated count
+        self._top_floor = 0  # smallest estimate in a full top-k table
+        self._window_count = 0
+
+    def observe(self, text):
+        """Count one text's tokens; returns (n_tokens, n_oov)"""
+        n_tokens, unseen = self.analyze(text)
+        self.record(n_tokens, unseen)
+        return n_tokens, len(unseen)
+
+    def analyze(self, text):
+        """(n_tokens, unseen tokens) of a text, without counting it"""
+        tokens = self.analyzer(text)
+        return len(tokens), [token for token in tokens if token not in self.vocabulary]
+
+    def record(self, n_tokens, unseen):
+        """Count an analyzed text (analyze() output, possibly a near-duplicate's)"""
+        with self._lock:
+            self.requests += 1
+            self.tokens += n_tokens
+            self.oov_tokens += len(unseen)
+            if len(unseen) == n_tokens:
+                self.empty_vectors += 1
+            if unseen:
+                self._add_unseen(unseen)
+
+    def _cells(self, token):
+        # Double hashing: row i uses column (h1 + i * h2) mod width
+        encoded = token.encode()
+        h1, h2 = zlib.crc32(encoded), zlib.adler32(encoded) | 1
+        width = self.width
+        return [offset + (h1 + i * h2) % width for i, offset in enumerate(self._offsets)]
+
+    def _add_unseen(self, tokens):
+        table = self._table
+        estimates = []
+        for token in tokens:
+            cells = self._cells(token)
+            for cell in cells:
+                table[cell] += 1
+            estimates.append(min(table[cell] for cell in cells))
+
+        for token, estimate in zip(tokens, estimates):
+            token = token[:MAX_TOKEN_CHARS]
+            previous = self._top.get(token)
+            if previous is not None:
+                self._top[token] = estimate
+                # Estimates only grow, so the floor moves only if it was this token
+                if previous > self._top_floor or len(self._top) < self.top_k:
+                    continue
+            elif len(self._top) < self.top_k:
+                self._top[token] = estimate
+                if len(self._top) < self.top_k:
+                    continue
+            elif estimate > self._top_floor:
+                del self._top[min(self._top, key=self._top.get)]
+                self._top[token] = estimate
+            else:
+                continue
+            self._top_floor = min(self._top.values())
+
+        self._window_count += len(tokens)
+        if self._window_count >= self.window_tokens:
+            for cell in range(len(table)):
+                table[cell] >>= 1
+            self._top = {token: count >> 1 for token, count in self._top.items() if count > 1}
+            self._top_floor = min(self._top.values()) if len(self._top) >= self.top_k else 0
+            self._window_count = 0
+
+    def estimate(self, token):
+        """Sketch estimate of how often an unseen token occurred (never an undercount)"""
+        cells = self._cells(token)
+        with self._lock:
+            return min(self._table[cell] for cell in cells)
+
+    def snapshot(self, limit=None):
+        """Counters and the heaviest unseen tokens, most frequent first"""
+        with self._lock:
+            top = sorted(self._top.items(), key=lambda item: (-item[1], item[0]))
+            return {
+                'requests': self.requests,
+                'empty_vectors': self.empty_vectors,
+                'empty_vector_rate': self.empty_vectors / self.requests if self.requests else 0.0,
+                'tokens': self.tokens,
+                'oov_tokens': self.oov_tokens,
+                'oov_rate': self.oov_tokens / self.tokens if self.tokens else 0.0,
+                'top_unseen_tokens': [
+                    {'token': token, 'count': count} for token, count in top[:limit]
+                ],
+                'sketch': {
+                    'width': self.width,
+                    'depth': self.depth,
+                    'top_k': self.top_k,
+                    'window_tokens': self.window_tokens,
+                    'bytes': self._table.itemsize * len(self._table)
+                }
+            }
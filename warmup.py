@@ -0,0 +1,140 @@
+"""
+Warmup of the inference path before a process takes traffic
+
+The first requests after a deploy or worker recycle pay one-off costs:
+lazy imports and first-call setup inside scikit-learn, scipy and numpy,
+the first database connection, and (under gunicorn --preload) the
+copy-on-write page faults of a freshly forked worker. A Warmup runs named
+steps over representative texts before the process is reported ready, so
+those costs land on warmup instead of on customers and on REQUEST_LATENCY.
+
+Readiness is tracked per process: a forked worker is not ready until it
+has run its own warmup, even if the master it was forked from has. Steps
+run in a background thread; `wait()` bounds how long the caller blocks.
+A warmup that outlives its timeout leaves the process serving but not
+ready until the steps actually finish.
+Warmup texts come from the training CSV or from a traffic capture
+(traffic_capture.py); a few built-in texts are used when neither exists.
+"""
+
+import csv
+import logging
+import os
+import threading
+import time
+
+from traffic_capture import read_capture
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_TEXTS = [
+    "The app crashes every time I click on submit.",
+    "Please add an option to export my data as a spreadsheet.",
+    "The subscription cost is too high for the features offered.",
+    "Amazing experience! The app runs smoothly and looks great.",
+    "I was charged twice this month and support has not replied."
+]
+
+
+def load_texts(source, limit=64):
+    """Up to `limit` texts spread evenly over a CSV or a traffic capture"""
+    texts = []
+    try:
+        if os.path.isdir(source) or source.endswith('.ndjson'):
+            for record in read_capture([source], limit=limit * 10):
+                body = record.get('body', {})
+                texts.extend(body.get('texts') or [body.get('text')])
+        elif os.path.isfile(source):
+            with open(source, newline='', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                next(reader, None)  # header
+                texts = [row[0] for row in reader if row]
+    except Exception as e:
+        logger.warning(f"Could not read warmup texts from {source}: {e}")
+    texts = [text for text in texts if isinstance(text, str) and text.strip()]
+    if not texts:
+        return list(FALLBACK_TEXTS)
+    # Evenly spaced rather than the first rows: the CSV is grouped by category
+    step = max(1, len(texts) // limit)
+    return texts[::step][:limit]
+
+
+class Warmup:
+    """Named warmup steps, run once per process in a background thread"""
+
+    def __init__(self, texts, timeout=10.0):
+        self.texts = texts
+        self.timeout = timeout
+        self._pid = None  # process whose warmup has started
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._report = {}
+
+    @property
+    def started(self):
+        return self._pid == os.getpid()
+
+    @property
+    def ready(self):
+        return self._pid == os.getpid() and self._done.is_set()
+
+    def start(self, steps):
+        """Run (name, fn(texts)) steps in order in a background thread
+
+        Does nothing if this process has already started its warmup;
+        returns whether it started one. A step that fails is logged and
+        skipped. The process becomes ready once every step has returned.
+        """
+        pid = os.getpid()
+        with self._lock:
+            if self._pid == pid:
+                return False
+            self._pid = pid
+            done = self._done = threading.Event()
+            report = self._report = {'pid': pid, 'texts': len(self.texts), 'steps': {},
+                                     'finished': False, 'timed_out': False}
+        start = time.perf_counter()
+
+        def run_steps():
+            for name, step in steps:
+                step_start = time.perf_counter()
+                try:
+                    step(self.texts)
+                    status = 'ok'
+                except Exception as e:
+                    status = f'failed: {e}'
+                    logger.warning(f"⚠️ Warmup step {name} failed: {e}")
+                report['steps'][name] = {
+                    'status': status,
+                    'seconds': round(time.perf_counter() - step_start, 4)
+                }
+            with self._lock:
+                report['seconds'] = round(time.perf_counter() - start, 4)
+                report['finished_at'] = time.time()
+                report['finished'] = True
+                done.set()
+            if report['timed_out']:
+                logger.info(f"✅ Warmup finished after {report['seconds']:.1f}s, past its timeout - now ready")
+
+        threading.Thread(target=run_steps, name='warmup', daemon=True).start()
+        return True
+
+    def wait(self, timeout=None):
+        """Block until this process's warmup finishes, at most `timeout` (default self.timeout)
+
+        Returns True if it finished. On timeout the report is marked
+        `timed_out` and the process stays not ready until the steps finish.
+        """
+        if self._done.wait(self.timeout if timeout is None else timeout):
+            return True
+        with self._lock:
+            self._report['timed_out'] = True
+        logger.warning(f"⚠️ Warmup did not finish within {self.timeout}s - serving, but not ready until it does")
+        return False
+
+    def snapshot(self):
+        """The warmup of this process so far (empty before it started)"""
+        with self._lock:
+            if self._report.get('pid') != os.getpid():
+                return {}
+            return dict(self._report, steps=dict(self._report['steps']))